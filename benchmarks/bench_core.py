@@ -0,0 +1,162 @@
+import os
+import random
+import shutil
+import tempfile
+
+import lineflow
+from lineflow import Dataset, TextDataset
+from lineflow.core import ConcatDataset, IterableDataset, ZipDataset
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def _write_lines(path, n):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(f'line {i} of the synthetic benchmark corpus .\n')
+
+
+def _shuffled_indices(n):
+    indices = list(range(n))
+    random.Random(0).shuffle(indices)
+    return indices
+
+
+def _iterate(dataset):
+    for _ in dataset:
+        pass
+
+
+def _random_access(dataset, indices):
+    for i in indices:
+        dataset[i]
+
+
+class MapSuite:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.data = Dataset(list(range(size))).map(lambda x: x + 1).map(lambda x: x * 2)
+        self.indices = _shuffled_indices(size)
+
+    def time_iterate(self, size):
+        _iterate(self.data)
+
+    def time_random_access(self, size):
+        _random_access(self.data, self.indices)
+
+
+class ConcatSuite:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        shard = list(range(100))
+        self.data = ConcatDataset(*[shard] * (size // len(shard)))
+        self.indices = _shuffled_indices(len(self.data))
+
+    def time_iterate(self, size):
+        _iterate(self.data)
+
+    def time_random_access(self, size):
+        _random_access(self.data, self.indices)
+
+
+class ZipSuite:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        base = list(range(size))
+        self.data = ZipDataset(base, base, base)
+        self.indices = _shuffled_indices(size)
+
+    def time_iterate(self, size):
+        _iterate(self.data)
+
+    def time_random_access(self, size):
+        _random_access(self.data, self.indices)
+
+
+class WindowSuite:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.data = Dataset(list(range(size)))
+
+    def time_window(self, size):
+        lineflow.window(self.data, 32, 8)
+
+    def peakmem_window_len(self, size):
+        len(self.data.window(32))
+
+
+class IterableSuite:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.base = Dataset(list(range(size)))
+
+    def time_materialize_filter(self, size):
+        len(self.base.filter(lambda x: x % 2 == 0))
+
+    def time_materialize_flat_map(self, size):
+        len(self.base.flat_map(lambda x: (x, x)))
+
+    def time_random_access_after_materialize(self, size):
+        data = IterableDataset(iter(range(size)))
+        _random_access(data, range(size))
+
+
+class TextSuite:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'corpus.txt')
+        _write_lines(self.path, size)
+        self.indices = _shuffled_indices(size)
+
+    def teardown(self, size):
+        shutil.rmtree(self.temp_dir)
+
+    def time_iterate(self, size):
+        _iterate(TextDataset(self.path).map(str.split))
+
+    def time_random_access(self, size):
+        _random_access(TextDataset(self.path).map(str.split), self.indices)
+
+    def peakmem_random_access(self, size):
+        _random_access(TextDataset(self.path), self.indices)
+
+
+class CacheSuite:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = Dataset(list(range(size))).map(lambda x: {'id': x, 'text': f'example {x}'})
+        self.saved = os.path.join(self.temp_dir, 'saved.pkl')
+        self.data.save(self.saved)
+
+    def teardown(self, size):
+        shutil.rmtree(self.temp_dir)
+
+    def _save(self):
+        path = os.path.join(self.temp_dir, 'cache.pkl')
+        self.data.save(path)
+        os.remove(path)
+
+    def time_save(self, size):
+        self._save()
+
+    def peakmem_save(self, size):
+        self._save()
+
+    def time_load(self, size):
+        lineflow.load(self.saved)
@@ -0,0 +1,41 @@
+import statistics
+import subprocess
+import sys
+import time
+
+STATEMENTS = {
+    'lineflow': 'import lineflow',
+    'lineflow.datasets': 'import lineflow.datasets',
+    'lineflow.datasets.Imdb': 'import lineflow.datasets; lineflow.datasets.Imdb',
+}
+
+
+class ImportSuite:
+    """Import time of the package in a fresh interpreter (asv ``timeraw`` benchmarks)."""
+
+    def timeraw_import_lineflow(self):
+        return STATEMENTS['lineflow']
+
+    def timeraw_import_datasets(self):
+        return STATEMENTS['lineflow.datasets']
+
+    def timeraw_access_dataset(self):
+        return STATEMENTS['lineflow.datasets.Imdb']
+
+
+def measure(statement: str, repeat: int = 5) -> float:
+    """Returns the median wall time in seconds of running ``statement`` in a new interpreter,
+    minus the time of starting a bare interpreter."""
+
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        return time.perf_counter() - start
+
+    baseline = statistics.median(run('pass') for _ in range(repeat))
+    return statistics.median(run(statement) for _ in range(repeat)) - baseline
+
+
+if __name__ == '__main__':
+    for name, statement in STATEMENTS.items():
+        print(f'{name}: {measure(statement) * 1000:.1f} ms')
@@ -0,0 +1,100 @@
+"""Runs the benchmarks without asv.
+
+The suites follow the asv conventions (``time_*``, ``timeraw_*`` and ``peakmem_*`` methods,
+``params``, ``setup`` and ``teardown``), so they can also be run by asv. This runner only needs the
+standard library and works offline::
+
+    python -m benchmarks.run            # all suites
+    python -m benchmarks.run Map Text   # suites whose name contains one of the words
+"""
+import contextlib
+import importlib
+import inspect
+import io
+import itertools
+import pkgutil
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Iterator, List, Tuple
+
+import benchmarks
+from benchmarks.bench_import import measure
+
+
+def _suites() -> Iterator[type]:
+    for module_info in pkgutil.iter_modules(benchmarks.__path__):
+        if not module_info.name.startswith('bench_'):
+            continue
+        module = importlib.import_module(f'{benchmarks.__name__}.{module_info.name}')
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ == module.__name__ and cls.__name__.endswith('Suite'):
+                yield cls
+
+
+def _param_grid(cls: type) -> List[Tuple[Any, ...]]:
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    if not params or not isinstance(params[0], (list, tuple)):
+        params = [params]
+    return list(itertools.product(*params))
+
+
+def _time(func: Callable[[], Any]) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def _peakmem(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _format(kind: str, value: float) -> str:
+    if kind == 'peakmem':
+        return f'{value / 2 ** 20:10.2f} MiB'
+    return f'{value * 1000:10.3f} ms'
+
+
+def run(patterns: List[str]) -> None:
+    for cls in _suites():
+        if patterns and not any(p in cls.__name__ for p in patterns):
+            continue
+        methods = [name for name, _ in inspect.getmembers(cls, inspect.isfunction)
+                   if name.split('_', 1)[0] in ('time', 'timeraw', 'peakmem')]
+        for args in _param_grid(cls):
+            suite = cls()
+            # Keep progress messages such as those of ``Dataset.save`` out of the report.
+            with contextlib.redirect_stdout(io.StringIO()):
+                if hasattr(suite, 'setup'):
+                    suite.setup(*args)
+            try:
+                for name in methods:
+                    kind = name.split('_', 1)[0]
+                    method = getattr(suite, name)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        if kind == 'timeraw':
+                            value = measure(method(*args))
+                            kind = 'time'
+                        elif kind == 'time':
+                            value = _time(lambda: method(*args))
+                        else:
+                            value = _peakmem(lambda: method(*args))
+                    label = f'{cls.__name__}.{name}'
+                    if args:
+                        label += f'({", ".join(map(repr, args))})'
+                    print(f'{label:<60}{_format(kind, value)}', flush=True)
+            finally:
+                if hasattr(suite, 'teardown'):
+                    suite.teardown(*args)
+
+
+if __name__ == '__main__':
+    run(sys.argv[1:])
@@ -11,7 +11,11 @@ from lineflow.cross_validation import split_dataset  # NOQA
 from lineflow.cross_validation import split_dataset_n  # NOQA
 from lineflow.cross_validation import split_dataset_n_random  # NOQA
 from lineflow.cross_validation import split_dataset_random  # NOQA
+from lineflow.profiling import profile  # NOQA
+from lineflow.sampling import interleave  # NOQA
 from lineflow.text import CsvDataset  # NOQA
 from lineflow.text import TextDataset  # NOQA
 from lineflow.utils import apply  # NOQA
 from lineflow.utils import apply_all  # NOQA
+from lineflow.utils import apply_all_batch  # NOQA
+from lineflow.utils import apply_batch  # NOQA
@@ -1,15 +1,20 @@
 import bisect
+import os
 import pickle
+import shutil
+import sys
 from abc import ABCMeta, abstractmethod
 from collections import deque
 from functools import lru_cache
 from itertools import accumulate, chain, islice, tee
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Callable, Iterable, Iterator, List, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence as SequenceType, Tuple, Union
 
-import arrayfiles
 from _collections_abc import Sequence, _check_methods
 
+from lineflow import profiling
+
 
 class DatasetMixin(metaclass=ABCMeta):
 
@@ -18,16 +23,16 @@ class DatasetMixin(metaclass=ABCMeta):
     def __getitem__(self, index: Union[int, slice]) -> Union[Any, List[Any]]:
         if isinstance(index, slice):
             start, stop, step = index.indices(len(self))
-            return [self.get_example(i) for i in range(start, stop, step)]
+            return self.get_examples(range(start, stop, step))
 
-        if index >= 0:
-            if index >= len(self):
-                raise IndexError(f'{self.__class__.__name__} object index out of range')
-        else:
-            if index < - len(self):
-                raise IndexError(f'{self.__class__.__name__} object index out of range')
-            index += len(self)
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(f'{self.__class__.__name__} object index out of range')
 
+        # Bounds are checked here once; ``get_example`` and the stages below it
+        # only see valid non-negative indices.
         return self.get_example(index)
 
     @abstractmethod
@@ -43,15 +48,35 @@ class DatasetMixin(metaclass=ABCMeta):
     def __len__(self) -> int:
         return 0
 
+    def get_examples(self, indices: SequenceType[int]) -> List[Any]:
+        """Reads the examples at ``indices`` at once.
+
+        Like ``get_example``, it expects valid non-negative indices. Subclasses override it to
+        fetch a batch faster than one ``get_example`` call per index.
+        """
+        get_example = self.get_example
+        return [get_example(i) for i in indices]
+
+    def __getitems__(self, indices: SequenceType[int]) -> List[Any]:
+        # Batch counterpart of ``__getitem__``, e.g. used by PyTorch's DataLoader for batched fetches.
+        length = len(self)
+        indices = [i + length if i < 0 else i for i in indices]
+        if indices and (min(indices) < 0 or max(indices) >= length):
+            raise IndexError(f'{self.__class__.__name__} object index out of range')
+        return self.get_examples(indices)
+
     @classmethod
     def __subclasshook__(cls, C):
         if cls is DatasetMixin:
+            # arrayfiles is imported on demand, so its classes can only exist once it is loaded.
+            arrayfiles = sys.modules.get('arrayfiles')
+            if arrayfiles is not None and issubclass(C, arrayfiles.TextFile):
+                return True
             return _check_methods(C, '__iter__', 'get_example', '__len__')
         return NotImplemented
 
 
 DatasetMixin.register(Sequence)
-DatasetMixin.register(arrayfiles.TextFile)
 
 
 class Dataset(DatasetMixin):
@@ -61,18 +86,34 @@ class Dataset(DatasetMixin):
         dataset (DatasetMixin): ``Sequence``, ``arrayfiles.TextFile``, or ``arrayfiles.CsvFile`` object.
     """
 
+    _stats = ()
+
     def __init__(self,
                  dataset: DatasetMixin) -> None:
         assert isinstance(dataset, DatasetMixin)
 
+        profiler = profiling.get_profiler()
+        if profiler is not None and not isinstance(dataset, (Dataset, profiling.ProfiledSource)):
+            dataset = profiler.wrap_source(dataset, f'source({type(dataset).__name__})')
+        if isinstance(dataset, profiling.ProfiledSource):
+            # The source is read before the stage, e.g. the function of a ``MapDataset``.
+            self._stats = (dataset._stats,) + self._stats
+
         self._dataset = dataset
+        self._get = _unchecked_getter(dataset)
         self._length = None
 
     def __iter__(self) -> Iterator[Any]:
         yield from self._dataset
 
     def get_example(self, i: int) -> Any:
-        return self._dataset[i]
+        return self._get(i)
+
+    def get_examples(self, indices: SequenceType[int]) -> List[Any]:
+        if type(self).get_example is not Dataset.get_example:
+            # A subclass transforming the examples in ``get_example`` should see the batch too.
+            return super(Dataset, self).get_examples(indices)
+        return _get_examples(self._dataset, indices)
 
     def __len__(self) -> int:
         if self._length is None:
@@ -82,6 +123,55 @@ class Dataset(DatasetMixin):
     def __add__(self, other: 'Dataset') -> 'ConcatDataset':
         return ConcatDataset(self, other)
 
+    def _parents(self) -> List['Dataset']:
+        return [self._dataset] if isinstance(self._dataset, Dataset) else []
+
+    def _plan_parents(self) -> List['Dataset']:
+        return self._parents()
+
+    def _describe(self) -> str:
+        if isinstance(self._dataset, Dataset):
+            return type(self).__name__
+        return f'{type(self).__name__}({type(self._dataset).__name__})'
+
+    def explain(self) -> str:
+        """Describes the stages evaluated to produce the examples of this dataset.
+
+        Consecutive maps are shown as the single fused stage that is actually run.
+
+        Returns (str):
+            The stages, one per line, with the parents of a stage indented below it.
+        """
+        lines = []
+
+        def visit(dataset, depth):
+            lines.append('  ' * depth + dataset._describe())
+            for parent in dataset._plan_parents():
+                visit(parent, depth + 1)
+
+        visit(self, 0)
+        return '\n'.join(lines)
+
+    def stats(self) -> List[profiling.StageStats]:
+        """Collects the statistics of the stages of this pipeline built under ``lineflow.profile``.
+
+        Returns (List[profiling.StageStats]):
+            The statistics of the instrumented stages, from the sources to this dataset.
+        """
+        visited = set()
+        stats = []
+
+        def visit(dataset):
+            if id(dataset) in visited:
+                return
+            visited.add(id(dataset))
+            for parent in dataset._parents():
+                visit(parent)
+            stats.extend(dataset._stats)
+
+        visit(self)
+        return stats
+
     def map(self, map_func: Callable[[Any], Any]) -> 'MapDataset':
         """Applies a function across the examples of this dataset.
 
@@ -102,18 +192,165 @@ class Dataset(DatasetMixin):
         Returns ('IterableDataset'):
             The dataset applied the function and flattened.
         """
-        return IterableDataset(lineflow_flat_map(map_func, self, lazy=True))
+        return FlatMapDataset(self, map_func)
 
-    def filter(self, predicate: Callable[[Any], bool]) -> 'IterableDataset':
+    def filter(self, predicate: Callable[[Any], bool], independent: bool = False) -> 'Dataset':
         """Filters this dataset by a predicate function.
 
         Args:
             predicate (Callable[[Any], bool]): A predicate function.
+            independent (bool, optional): If ``True``, ``predicate`` gives the same result before and
+                after the preceding ``map`` stages, so it is evaluated before them and the maps skip
+                the examples filtered out.
 
-        Returns ('IterableDataset'):
+        Returns ('Dataset'):
             The dataset containing the examples for which ``predicate`` returns ``True``.
         """
-        return IterableDataset(lineflow_filter(predicate, self, lazy=True))
+        if independent and type(self) is MapDataset:
+            parent = self._dataset
+            if not isinstance(parent, Dataset):
+                # The source is a plain sequence or file, without ``filter``.
+                parent = Dataset(parent)
+            return MapDataset(parent.filter(predicate, independent=True), self._map_func)
+        return FilterDataset(self, predicate)
+
+    def select(self, fields: SequenceType[Union[int, str]]) -> 'Dataset':
+        """Keeps only the given fields of the examples.
+
+        Dict examples keep the given keys and tuple or list examples the given positions, in the
+        given order. Datasets whose storage can read a subset of the fields (e.g. ``CsvDataset``)
+        do it there, so the other fields are never built.
+
+        Args:
+            fields (Sequence[Union[int, str]]): The keys or positions to keep.
+
+        Returns (Dataset):
+            The projected dataset.
+        """
+        return MapDataset(self, _Projection(fields, keep=True))
+
+    def drop(self, fields: SequenceType[Union[int, str]]) -> 'Dataset':
+        """Removes the given fields from the examples. It is the complement of ``select``.
+
+        Args:
+            fields (Sequence[Union[int, str]]): The keys or positions to remove.
+
+        Returns (Dataset):
+            The projected dataset.
+        """
+        return MapDataset(self, _Projection(fields, keep=False))
+
+    def index_by(self, key_func: Callable[[Any], Any], path: str = None) -> 'Dataset':
+        """Builds a hash index from the keys of the examples to their positions in one pass.
+
+        Args:
+            key_func (Callable[[Any], Any]): The function to extract the key of an example,
+                e.g. ``lambda x: x['id']``.
+            path (str, optional): The file to keep the index in, memory-mapped on later runs.
+
+        Returns (lineflow.hashing.KeyIndexedDataset):
+            The dataset, with ``lookup(key)`` and ``lookup_many(keys)``.
+        """
+        from lineflow.hashing import KeyIndexedDataset
+
+        return KeyIndexedDataset(self, key_func, path)
+
+    def join(self,
+             other: DatasetMixin,
+             key: Callable[[Any], Any],
+             other_key: Callable[[Any], Any] = None,
+             how: str = 'inner',
+             memory_limit: int = None) -> 'IterableDataset':
+        """Pairs the examples of this dataset with the examples of ``other`` with equal keys.
+
+        The join streams its output. Beyond ``memory_limit`` examples of ``other``, both datasets
+        are partitioned to disk by key (see ``lineflow.external``).
+
+        Args:
+            other (DatasetMixin): The dataset to join with.
+            key (Callable[[Any], Any]): The function to extract the key of an example,
+                e.g. ``lambda x: x['id']``.
+            other_key (Callable[[Any], Any], optional): The function to extract the key of an
+                example of ``other``. It defaults to ``key``.
+            how (str, optional): ``'inner'``, ``'left'``, ``'right'`` or ``'outer'``.
+            memory_limit (int, optional): The number of examples of ``other`` held in memory.
+
+        Returns (lineflow.external.JoinDataset):
+            The dataset of the ``(example, other_example)`` pairs. In outer joins, the examples
+            without a match are paired with ``None``.
+        """
+        from lineflow.external import JoinDataset
+
+        return JoinDataset(self, other, key, other_key, how, memory_limit)
+
+    def group_by(self, key: Callable[[Any], Any], memory_limit: int = None) -> 'IterableDataset':
+        """Groups the examples with equal keys.
+
+        Args:
+            key (Callable[[Any], Any]): The function to extract the key of an example.
+            memory_limit (int, optional): The number of examples held in memory before they are
+                partitioned to disk by key.
+
+        Returns (lineflow.external.GroupByDataset):
+            The dataset of the ``(key, examples)`` pairs.
+        """
+        from lineflow.external import GroupByDataset
+
+        return GroupByDataset(self, key, memory_limit)
+
+    def sort_by(self,
+                key: Callable[[Any], Any],
+                memory_limit: int = None,
+                reverse: bool = False,
+                path: str = None) -> 'Dataset':
+        """Sorts the examples by a key with an external merge sort.
+
+        Runs of ``memory_limit`` examples are sorted and spilled to temporary files under the
+        lineflow cache directory, then merged (see ``lineflow.external.sort_dataset``).
+
+        Args:
+            key (Callable[[Any], Any]): The function to extract the sort key of an example,
+                e.g. ``lambda x: len(x['en'])``.
+            memory_limit (int, optional): The number of examples held in memory.
+            reverse (bool, optional): If ``True``, the examples are sorted in descending order.
+            path (str, optional): The directory to store the sorted examples in, loaded on later runs.
+
+        Returns (Dataset):
+            The sorted dataset, with random access.
+        """
+        from lineflow.external import sort_dataset
+
+        return sort_dataset(self, key, memory_limit, reverse, path)
+
+    def dedup(self,
+              key: Callable[[Any], Any] = None,
+              mode: str = 'exact',
+              num_partitions: int = None,
+              num_perm: int = 128,
+              bands: int = 16,
+              ngram: int = 5) -> 'IterableDataset':
+        """Removes duplicated examples, keeping the first one of each (see ``lineflow.dedup``).
+
+        Args:
+            key (Callable[[Any], Any], optional): The function to extract the key of an example.
+                It defaults to the example itself.
+            mode (str, optional): ``'exact'`` compares the 64-bit hashes of the keys, and
+                ``'minhash'`` finds near-duplicate texts with MinHash and LSH bands.
+            num_partitions (int, optional): In ``'exact'`` mode, the number of partitions the
+                hashes are spilled to disk in, to bound memory. The dataset is then iterated twice,
+                so it should yield the same examples in the same order both times: a shuffled or
+                sampled upstream gives wrong results.
+            num_perm (int, optional): In ``'minhash'`` mode, the length of the signatures.
+            bands (int, optional): In ``'minhash'`` mode, the number of bands of the signatures.
+            ngram (int, optional): In ``'minhash'`` mode, the number of words in a shingle.
+
+        Returns (lineflow.dedup.DedupDataset):
+            The deduplicated dataset. Its ``removed`` is the number of examples removed, and stays
+            ``None`` until an iteration has gone through the whole dataset.
+        """
+        from lineflow.dedup import DedupDataset
+
+        return DedupDataset(self, key, mode, num_partitions, num_perm, bands, ngram)
 
     def window(self, window_size: int, shift: int = None) -> 'IterableDataset':
         """Combines input examples into a dataset of windows.
@@ -125,15 +362,49 @@ class Dataset(DatasetMixin):
         Returns ('IterableDataset'):
             The dataset of windows.
         """
-        return IterableDataset(lineflow_window(self, window_size, shift, lazy=True))
+        return WindowDataset(self, window_size, shift)
+
+    def token_blocks(self,
+                     block_size: int,
+                     stride: int = None,
+                     drop_last: bool = True,
+                     path: str = None,
+                     typecode: str = 'i') -> 'Dataset':
+        """Concatenates the sequences of token ids of the dataset and splits them into blocks.
+
+        Args:
+            block_size (int): The number of tokens in a block.
+            stride (int, optional): The distance between the starts of consecutive blocks.
+                It defaults to ``block_size``; smaller values make the blocks overlap.
+            drop_last (bool, optional): If ``False``, the tokens after the last full block make
+                a shorter last block.
+            path (str, optional): The file to cache the tokens in, memory-mapped when reloaded.
+            typecode (str, optional): The ``array`` type code of the token ids.
+
+        Returns (lineflow.storage.TokenBlockDataset):
+            The dataset of blocks, each one a zero-copy ``memoryview`` of the tokens.
+        """
+        # lineflow.storage imports this module.
+        from lineflow.storage import TokenBlockDataset
 
-    def all(self) -> List[Any]:
+        return TokenBlockDataset.from_dataset(self, block_size, stride, drop_last, path, typecode)
+
+    def all(self, num_workers: int = None) -> List[Any]:
         """Takes all examples from the dataset.
 
+        Args:
+            num_workers (int, optional): If it is given, the examples are evaluated in chunks by
+                this many processes (see ``lineflow.parallel.evaluate``).
+
         Returns (List[Any]):
             The list of the examples in the dataset.
         """
-        return list(self)
+        if num_workers is None:
+            return list(self)
+        # lineflow.parallel imports this module.
+        from lineflow import parallel
+
+        return parallel.evaluate(self, num_workers)
 
     def take(self, n: int) -> List[Any]:
         """Takes the first n examples from the dataset.
@@ -154,11 +425,63 @@ class Dataset(DatasetMixin):
         """
         return next(iter(self))
 
-    def save(self, filename: str) -> 'CacheDataset':
+    def iter_from(self, state: Dict[str, Any] = None) -> 'ResumableIterator':
+        """Iterates the dataset with an iterator whose position can be saved and restored.
+
+        Random-access pipelines seek directly to the saved position. Lazy ``filter``, ``flat_map``
+        and ``window`` stages save the state of their parent with their own (e.g. the window being
+        filled), so they resume without replaying the examples before the position either.
+
+        Args:
+            state (Dict[str, Any], optional): A state returned by ``ResumableIterator.state_dict``
+                of an iterator of the same pipeline. If it is not given, the iteration starts from
+                the first example.
+
+        Returns (ResumableIterator):
+            The iterator.
+
+        Examples:
+            >>> it = ds.iter_from()
+            >>> next(it)
+            >>> state = it.state_dict()
+            >>> it = ds.iter_from(state)  # e.g. after a restart
+        """
+        return self._iter_from(state)
+
+    def _iter_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        if _is_random_access(self):
+            return _IndexIterator(self, state)
+        if type(self) is Dataset:
+            return self._dataset._iter_from(state)
+        return _SkipIterator(self, state)
+
+    def save_columns(self, path: str, schema: Dict[Union[int, str], str] = None) -> 'Dataset':
+        """Evaluates the dataset and saves its records column by column, or loads them if saved.
+
+        Unlike ``save``, the records are not kept as Python objects: each ``str``, ``int`` or
+        ``float`` field is stored as one packed column and the records are rebuilt on access.
+
+        Args:
+            path (str): The directory of the columns.
+            schema (Dict[Union[int, str], str], optional): The type (``'str'``, ``'int'`` or
+                ``'float'``) of each field. It is inferred from the values if it is not given.
+                The values of a declared field should be of its type, or ``TypeError`` is raised.
+
+        Returns (lineflow.storage.ColumnDataset):
+            The stored dataset.
+        """
+        from lineflow.storage import ColumnDataset
+
+        return ColumnDataset.build(self, path, schema)
+
+    def save(self, filename: str, num_workers: int = None) -> 'CacheDataset':
         """Evaluates the datasets and save it as pickle.
 
         Args:
             filename (str): The name of the pickle file.
+            num_workers (int, optional): If it is given, the examples are evaluated in chunks by
+                this many processes. The chunks are kept in ``filename + '.partial'`` until the
+                pickle file is written, so an interrupted evaluation resumes where it stopped.
 
         Returns ('CacheDataset'):
             The evaluated dataset.
@@ -172,13 +495,23 @@ class Dataset(DatasetMixin):
             if not path.parent.exists():
                 path.parent.mkdir(parents=True)
             print(f'Saving data to {filename}...')
-            cache = list(self)
+            if num_workers is None:
+                cache = list(self)
+            else:
+                from lineflow import parallel
+
+                partial_dir = f'{filename}.partial'
+                cache = parallel.evaluate(self, num_workers, partial_dir=partial_dir)
             with path.open('wb') as f:
                 pickle.dump(cache, f)
+            if num_workers is not None:
+                shutil.rmtree(partial_dir, ignore_errors=True)
         return CacheDataset(cache)
 
 
 class IterableDataset(Dataset):
+    _parent = None
+
     def __init__(self, iterable: Iterable) -> None:
         self._length = None
         self._iterable = iterable
@@ -201,7 +534,10 @@ class IterableDataset(Dataset):
             yield from iterable
 
     def get_example(self, i: int) -> Any:
-        return super(IterableDataset, self).get_example(i)
+        return self._dataset[i]
+
+    def get_examples(self, indices: SequenceType[int]) -> List[Any]:
+        return _take(self._dataset, indices)
 
     def __len__(self) -> int:
         return super(IterableDataset, self).__len__()
@@ -212,63 +548,338 @@ class IterableDataset(Dataset):
             out = Dataset(out)
         return out
 
+    def _parents(self) -> List[Dataset]:
+        return [self._parent] if isinstance(self._parent, Dataset) else []
+
+    @property
+    def _random_access(self) -> bool:
+        return self._computed
+
+    def _iter_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        if self._random_access:
+            return _IndexIterator(self, state)
+        return self._iter_lazily_from(state)
+
+    def _iter_lazily_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        # An arbitrary iterable can only be resumed by skipping the examples before the position.
+        return _SkipIterator(self, state)
+
+    def _describe(self) -> str:
+        return type(self).__name__
+
+
+class FilterDataset(IterableDataset):
+    def __init__(self,
+                 dataset: DatasetMixin,
+                 predicate: Callable[[Any], bool]) -> None:
+        assert callable(predicate)
+
+        profiler = profiling.get_profiler()
+        if profiler is not None:
+            stats = profiler.stage(f'filter({_func_name(predicate)})')
+            predicate = profiler.wrap_filter(predicate, stats)
+            self._stats = (stats,)
+
+        self._parent = dataset
+        self._predicate = predicate
+
+        super(FilterDataset, self).__init__(lineflow_filter(predicate, dataset, lazy=True))
+
+    def _describe(self) -> str:
+        return f'FilterDataset({_func_name(self._predicate)})'
+
+    def _iter_lazily_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        return _FilterIterator(self, state)
+
+
+class FlatMapDataset(IterableDataset):
+    def __init__(self,
+                 dataset: DatasetMixin,
+                 map_func: Callable[[Any], Iterable[Any]]) -> None:
+        assert callable(map_func)
+
+        profiler = profiling.get_profiler()
+        if profiler is not None:
+            stats = profiler.stage(f'flat_map({_func_name(map_func)})')
+            map_func = profiler.wrap_flat_map(map_func, stats)
+            self._stats = (stats,)
+
+        self._parent = dataset
+        self._map_func = map_func
+
+        super(FlatMapDataset, self).__init__(lineflow_flat_map(map_func, dataset, lazy=True))
+
+    def _describe(self) -> str:
+        return f'FlatMapDataset({_func_name(self._map_func)})'
+
+    def _iter_lazily_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        return _FlatMapIterator(self, state)
+
+
+class WindowDataset(IterableDataset):
+    """Dataset of the windows of ``lineflow_window``.
+
+    Over a random-access parent, it is a view: its length is computed from the length of the parent
+    and the ``i``-th window is read from the examples ``[i * shift, i * shift + window_size)`` of the
+    parent on demand, so the windows are never materialized.
+    """
+
+    def __init__(self,
+                 dataset: DatasetMixin,
+                 window_size: int,
+                 shift: int = None) -> None:
+        self._parent = dataset
+        self._window_size = window_size
+        self._shift = shift or window_size
+        self._view = _is_random_access(dataset)
+        self._parent_length = None
+
+        iterable = dataset
+        profiler = profiling.get_profiler()
+        if profiler is not None:
+            stats = profiler.stage(f'window({window_size}, {self._shift})')
+            iterable = profiler.count_items(dataset, stats, 'items_in')
+            self._stats = (stats,)
+
+        iterator = lineflow_window(iterable, window_size, shift, lazy=True)
+        if profiler is not None:
+            iterator = profiler.count_items(iterator, stats, 'items_out')
+
+        super(WindowDataset, self).__init__(iterator)
+
+    @property
+    def _random_access(self) -> bool:
+        return self._view or self._computed
+
+    def _get_parent_length(self) -> int:
+        if self._parent_length is None:
+            self._parent_length = len(self._parent)
+        return self._parent_length
+
+    def get_example(self, i: int) -> Tuple[Any, ...]:
+        if not self._view:
+            return super(WindowDataset, self).get_example(i)
+        start = i * self._shift
+        stop = min(start + self._window_size, self._get_parent_length())
+        return tuple(_get_examples(self._parent, range(start, stop)))
+
+    def get_examples(self, indices: SequenceType[int]) -> List[Tuple[Any, ...]]:
+        if not self._view:
+            return super(WindowDataset, self).get_examples(indices)
+        get_example = self.get_example
+        return [get_example(i) for i in indices]
+
+    def __len__(self) -> int:
+        if not self._view:
+            return super(WindowDataset, self).__len__()
+        if self._length is None:
+            n = self._get_parent_length()
+            window_size = self._window_size
+            shift = self._shift
+            if n < window_size:
+                # The generator yields the only, possibly empty, window.
+                self._length = 1
+            else:
+                rest = (n - window_size) % shift
+                # The last window is partial when examples are left after the last full one.
+                self._length = (n - window_size) // shift + 1 + (1 if rest and shift - rest < window_size else 0)
+        return self._length
+
+    def _describe(self) -> str:
+        return f'WindowDataset(window_size={self._window_size}, shift={self._shift})'
+
+    def _iter_lazily_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        return _WindowIterator(self, state)
+
 
 class ConcatDataset(Dataset):
-    def __init__(self, *datasets: List[DatasetMixin]) -> None:
+    """Dataset concatenating datasets end to end.
+
+    The lengths of the children are discovered lazily: a child is asked for its length only when an
+    index beyond the children before it is accessed.
+
+    Args:
+        datasets (List[DatasetMixin]): The datasets to concatenate.
+        lengths (List[int], optional): The known lengths of the children, e.g. from a manifest.
+            If they are given, ``len`` is never called on the children.
+    """
+
+    def __init__(self, *datasets: List[DatasetMixin], lengths: List[int] = None) -> None:
         assert all(isinstance(d, DatasetMixin) for d in datasets)
 
-        self._datasets = datasets
+        self._datasets = _profile_sources(self, datasets)
+        self._getters = [_unchecked_getter(d) for d in self._datasets]
         self._length = None
-
-    @lru_cache()
-    def _get_lengths(self) -> List[int]:
-        return list(accumulate(len(d) for d in self._datasets))
+        # ``_starts[j]`` and ``_ends[j]`` are the global index range of the j-th child,
+        # known for the children discovered so far.
+        self._starts = []
+        self._ends = []
+        self._current = 0
+
+        if lengths is not None:
+            if len(lengths) != len(datasets):
+                raise ValueError(f'{len(lengths)} lengths are given for {len(datasets)} datasets.')
+            self._ends = list(accumulate(lengths))
+            self._starts = [0] + self._ends[:-1]
+
+    def _discover(self, i: int) -> None:
+        """Discovers the lengths of the children until the one containing the index ``i``."""
+        starts = self._starts
+        ends = self._ends
+        datasets = self._datasets
+        while len(ends) < len(datasets) and (not ends or ends[-1] <= i):
+            start = ends[-1] if ends else 0
+            starts.append(start)
+            ends.append(start + len(datasets[len(ends)]))
 
     @property
     def _lengths(self) -> List[int]:
-        return self._get_lengths()
-
-    @lru_cache()
-    def _get_offsets(self) -> List[int]:
-        offsets = [0]
-        offsets.extend(self._lengths[:-1])
-        return offsets
+        self._discover(sys.maxsize)
+        return self._ends
 
     @property
     def _offsets(self) -> List[int]:
-        return self._get_offsets()
+        self._discover(sys.maxsize)
+        return self._starts
 
     def __iter__(self) -> Iterator[Any]:
         for d in self._datasets:
             yield from d
 
+    def __getitem__(self, index: Union[int, slice]) -> Union[Any, List[Any]]:
+        if self._length is None and isinstance(index, int) and index >= 0:
+            # Avoids the len() of the bounds check, which would discover every child.
+            self._discover(index)
+            if not self._ends or index >= self._ends[-1]:
+                raise IndexError(f'{self.__class__.__name__} object index out of range')
+            return self.get_example(index)
+        return super(ConcatDataset, self).__getitem__(index)
+
     def get_example(self, i: int) -> Any:
-        j = bisect.bisect_right(self._lengths, i)
-        return self._datasets[j][i - self._offsets[j]]
+        j = self._current
+        starts = self._starts
+        ends = self._ends
+        # Sequential access usually stays in the child of the previous access.
+        if j >= len(ends) or not starts[j] <= i < ends[j]:
+            if not ends or ends[-1] <= i:
+                self._discover(i)
+            j = self._current = bisect.bisect_right(ends, i)
+        return self._getters[j](i - starts[j])
+
+    def get_examples(self, indices: SequenceType[int]) -> List[Any]:
+        if not indices:
+            return []
+        self._discover(max(indices))
+        # Groups the indices by child so that each child is read with one batch call.
+        starts = self._starts
+        ends = self._ends
+        getters = self._getters
+        bisect_right = bisect.bisect_right
+        groups = {}
+        for k, i in enumerate(indices):
+            groups.setdefault(bisect_right(ends, i), []).append(k)
+
+        examples = [None] * len(indices)
+        for j, positions in groups.items():
+            offset = starts[j]
+            if len(positions) == 1:
+                k = positions[0]
+                examples[k] = getters[j](indices[k] - offset)
+                continue
+            values = _get_examples(self._datasets[j], [indices[k] - offset for k in positions])
+            for k, x in zip(positions, values):
+                examples[k] = x
+        return examples
 
     def __len__(self) -> int:
         if self._length is None:
-            self._length = self._lengths[-1]
+            lengths = self._lengths
+            self._length = lengths[-1] if lengths else 0
         return self._length
 
+    def _parents(self) -> List[Dataset]:
+        return [d for d in self._datasets if isinstance(d, Dataset)]
+
+    def _iter_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        if _is_random_access(self):
+            return _IndexIterator(self, state)
+        return _ConcatIterator(self, state)
+
 
 class ZipDataset(Dataset):
-    def __init__(self, *datasets: List[DatasetMixin]) -> None:
+    """Dataset zipping datasets example by example.
+
+    Args:
+        datasets (List[DatasetMixin]): The datasets to zip.
+        aligned (bool, optional): If ``True``, the datasets are checked once to have the same
+            length, e.g. the parallel columns of a corpus, instead of the length being the minimum.
+    """
+
+    def __init__(self, *datasets: List[DatasetMixin], aligned: bool = False) -> None:
         assert all(isinstance(d, DatasetMixin) for d in datasets)
-        self._datasets = datasets
+        self._datasets = _profile_sources(self, datasets)
+        self._getters = [_unchecked_getter(d) for d in self._datasets]
         self._length = None
 
+        if aligned:
+            lengths = sorted({len(d) for d in self._datasets})
+            if len(lengths) > 1:
+                raise ValueError(f'aligned datasets should have the same length, but {lengths} are given.')
+            self._length = lengths[0] if lengths else 0
+
     def __iter__(self) -> Iterator[Tuple[Any]]:
         yield from zip(*self._datasets)
 
     def get_example(self, i: int) -> Tuple[Any]:
-        return tuple(d[i] for d in self._datasets)
+        getters = self._getters
+        # Pairs, the common case, skip building the intermediate list.
+        if len(getters) == 2:
+            return (getters[0](i), getters[1](i))
+        return tuple([get(i) for get in getters])
+
+    def get_examples(self, indices: SequenceType[int]) -> List[Tuple[Any]]:
+        return list(zip(*self.get_columns(indices)))
+
+    def get_columns(self, indices: SequenceType[int]) -> Tuple[List[Any], ...]:
+        """Reads the examples at ``indices`` as one list per zipped dataset.
+
+        Each dataset is read with one batch call, e.g. one slice per run of consecutive lines of
+        an ``arrayfiles.TextFile``, and no tuple is built per example.
+
+        Args:
+            indices (Sequence[int]): Valid non-negative indices.
+
+        Returns (Tuple[List[Any], ...]):
+            The columns, in the order of the datasets.
+        """
+        return tuple(_get_examples(d, indices) for d in self._datasets)
+
+    def iter_columns(self, batch_size: int) -> Iterator[Tuple[List[Any], ...]]:
+        """Iterates the dataset as columns of ``batch_size`` consecutive examples.
+
+        Args:
+            batch_size (int): The number of examples in each batch. The last one may be shorter.
+
+        Returns (Iterator[Tuple[List[Any], ...]]):
+            The columns of each batch, as returned by ``get_columns``.
+        """
+        length = len(self)
+        for start in range(0, length, batch_size):
+            yield self.get_columns(range(start, min(start + batch_size, length)))
 
     def __len__(self) -> int:
         if self._length is None:
             self._length = min(len(d) for d in self._datasets)
         return self._length
 
+    def _parents(self) -> List[Dataset]:
+        return [d for d in self._datasets if isinstance(d, Dataset)]
+
+    def _iter_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        if _is_random_access(self):
+            return _IndexIterator(self, state)
+        return _ZipIterator(self, state)
+
 
 class MapDataset(Dataset):
     def __init__(self,
@@ -276,15 +887,56 @@ class MapDataset(Dataset):
                  map_func: Callable[[Any], Any]) -> None:
         assert callable(map_func)
 
+        profiler = profiling.get_profiler()
+        if isinstance(map_func, profiling.ProfiledFunction):
+            # The stage is rebuilt, e.g. above a pushed down filter, and keeps its statistics.
+            self._stats = (map_func.stats,)
+        elif profiler is not None:
+            stats = profiler.stage(f'map({_func_name(map_func)})')
+            map_func = profiler.wrap_map(map_func, stats)
+            self._stats = (stats,)
+
         self._map_func = map_func
 
         super(MapDataset, self).__init__(dataset)
 
+        # Consecutive maps are fused: the dataset reads from the first non-map stage
+        # and applies all the functions in one call.
+        if type(self._dataset) is MapDataset:
+            self._source = self._dataset._source
+            self._map_funcs = self._dataset._map_funcs + (map_func,)
+        else:
+            self._source = self._dataset
+            self._map_funcs = (map_func,)
+        self._fused_func = _compose(self._map_funcs)
+        self._source_get = _unchecked_getter(self._source)
+
     def __iter__(self) -> Iterator[Any]:
-        yield from map(self._map_func, self._dataset)
+        # Nested built-in maps iterate faster than the composed Python function.
+        iterator = iter(self._source)
+        for f in self._map_funcs:
+            iterator = map(f, iterator)
+        yield from iterator
 
     def get_example(self, i: int) -> Any:
-        return self._map_func(self._dataset[i])
+        return self._fused_func(self._source_get(i))
+
+    def get_examples(self, indices: SequenceType[int]) -> List[Any]:
+        iterator = _get_examples(self._source, indices)
+        for f in self._map_funcs:
+            iterator = map(f, iterator)
+        return list(iterator)
+
+    def _plan_parents(self) -> List[Dataset]:
+        return [self._source] if isinstance(self._source, Dataset) else []
+
+    def _describe(self) -> str:
+        return f'MapDataset({", ".join(_func_name(f) for f in self._map_funcs)})'
+
+    def _iter_from(self, state: Optional[Dict[str, Any]]) -> 'ResumableIterator':
+        if _is_random_access(self):
+            return _IndexIterator(self, state)
+        return _MapIterator(self, state)
 
 
 class CacheDataset(Dataset):
@@ -294,12 +946,341 @@ class CacheDataset(Dataset):
         self._length = len(cache)
 
 
-def lineflow_concat(*datasets: List[DatasetMixin]) -> ConcatDataset:
-    return ConcatDataset(*datasets)
+class ResumableIterator(metaclass=ABCMeta):
+    """Iterator returned by ``Dataset.iter_from``.
 
+    ``state_dict`` returns a picklable state to pass to ``iter_from`` to continue from the next
+    example.
+    """
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
 
-def lineflow_zip(*datasets: List[DatasetMixin]) -> ZipDataset:
-    return ZipDataset(*datasets)
+    @abstractmethod
+    def __next__(self) -> Any:
+        pass
+
+    @abstractmethod
+    def state_dict(self) -> Dict[str, Any]:
+        pass
+
+
+class _IndexIterator(ResumableIterator):
+
+    def __init__(self, dataset: DatasetMixin, state: Optional[Dict[str, Any]]) -> None:
+        self._get = _unchecked_getter(dataset)
+        self._length = len(dataset)
+        self._position = state['position'] if state else 0
+
+    def __next__(self) -> Any:
+        i = self._position
+        if i >= self._length:
+            raise StopIteration
+        x = self._get(i)
+        self._position = i + 1
+        return x
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {'position': self._position}
+
+
+class _SkipIterator(ResumableIterator):
+
+    def __init__(self, dataset: DatasetMixin, state: Optional[Dict[str, Any]]) -> None:
+        self._position = state['position'] if state else 0
+        self._iterator = islice(dataset, self._position, None)
+
+    def __next__(self) -> Any:
+        x = next(self._iterator)
+        self._position += 1
+        return x
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {'position': self._position}
+
+
+class _MapIterator(ResumableIterator):
+
+    def __init__(self, dataset: 'MapDataset', state: Optional[Dict[str, Any]]) -> None:
+        self._parent = _resumable_iter(dataset._source, state)
+        self._func = dataset._fused_func
+
+    def __next__(self) -> Any:
+        return self._func(next(self._parent))
+
+    def state_dict(self) -> Dict[str, Any]:
+        return self._parent.state_dict()
+
+
+class _FilterIterator(ResumableIterator):
+
+    def __init__(self, dataset: FilterDataset, state: Optional[Dict[str, Any]]) -> None:
+        self._parent = _resumable_iter(dataset._parent, state and state['parent'])
+        self._predicate = dataset._predicate
+
+    def __next__(self) -> Any:
+        predicate = self._predicate
+        for x in self._parent:
+            if predicate(x):
+                return x
+        raise StopIteration
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {'parent': self._parent.state_dict()}
+
+
+class _FlatMapIterator(ResumableIterator):
+
+    def __init__(self, dataset: FlatMapDataset, state: Optional[Dict[str, Any]]) -> None:
+        self._parent = _resumable_iter(dataset._parent, state and state['parent'])
+        self._map_func = dataset._map_func
+        # The parent state before the example being flattened and the offset into its outputs.
+        self._parent_state = self._parent.state_dict()
+        self._items = []
+        self._offset = 0
+        if state and state['offset']:
+            self._load()
+            self._offset = state['offset']
+
+    def _load(self) -> None:
+        self._parent_state = self._parent.state_dict()
+        self._items = list(self._map_func(next(self._parent)))
+        self._offset = 0
+
+    def __next__(self) -> Any:
+        while self._offset >= len(self._items):
+            self._load()
+        x = self._items[self._offset]
+        self._offset += 1
+        return x
+
+    def state_dict(self) -> Dict[str, Any]:
+        if self._offset >= len(self._items):
+            return {'parent': self._parent.state_dict(), 'offset': 0}
+        return {'parent': self._parent_state, 'offset': self._offset}
+
+
+class _WindowIterator(ResumableIterator):
+    """Resumable counterpart of the generator in ``lineflow_window``."""
+
+    def __init__(self, dataset: WindowDataset, state: Optional[Dict[str, Any]]) -> None:
+        self._parent = _resumable_iter(dataset._parent, state and state['parent'])
+        self._window_size = dataset._window_size
+        self._shift = dataset._shift
+        self._window = deque(state['window'] if state else [], self._window_size)
+        self._i = state['i'] if state else 0
+        # 0: the first window is being filled, 1: windows are being shifted, 2: exhausted.
+        self._phase = state['phase'] if state else 0
+
+    def __next__(self) -> Tuple[Any, ...]:
+        window = self._window
+        if self._phase == 0:
+            for _, x in zip(range(self._window_size - len(window)), self._parent):
+                window.append(x)
+            self._phase = 1
+            return tuple(window)
+        if self._phase == 1:
+            shift = self._shift
+            for x in self._parent:
+                window.append(x)
+                self._i = (self._i + 1) % shift
+                if self._i == 0:
+                    return tuple(window)
+            self._phase = 2
+            if self._i and shift - self._i < self._window_size:
+                for _ in range(shift - self._i):
+                    window.popleft()
+                return tuple(window)
+        raise StopIteration
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {'parent': self._parent.state_dict(),
+                'window': list(self._window),
+                'i': self._i,
+                'phase': self._phase}
+
+
+class _ConcatIterator(ResumableIterator):
+
+    def __init__(self, dataset: ConcatDataset, state: Optional[Dict[str, Any]]) -> None:
+        self._datasets = dataset._datasets
+        self._j = state['dataset'] if state else 0
+        self._iterator = None
+        if self._j < len(self._datasets):
+            self._iterator = _resumable_iter(self._datasets[self._j], state and state['state'])
+
+    def __next__(self) -> Any:
+        while self._iterator is not None:
+            for x in self._iterator:
+                return x
+            self._j += 1
+            self._iterator = None
+            if self._j < len(self._datasets):
+                self._iterator = _resumable_iter(self._datasets[self._j], None)
+        raise StopIteration
+
+    def state_dict(self) -> Dict[str, Any]:
+        if self._iterator is None:
+            return {'dataset': self._j, 'state': None}
+        return {'dataset': self._j, 'state': self._iterator.state_dict()}
+
+
+class _ZipIterator(ResumableIterator):
+
+    def __init__(self, dataset: ZipDataset, state: Optional[Dict[str, Any]]) -> None:
+        states = state['states'] if state else [None] * len(dataset._datasets)
+        self._iterators = [_resumable_iter(d, s) for d, s in zip(dataset._datasets, states)]
+
+    def __next__(self) -> Tuple[Any, ...]:
+        # A generator expression would turn the StopIteration of a child into a RuntimeError.
+        values = []
+        for iterator in self._iterators:
+            values.append(next(iterator))
+        return tuple(values)
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {'states': [iterator.state_dict() for iterator in self._iterators]}
+
+
+def _is_random_access(dataset: DatasetMixin) -> bool:
+    """Tells if the examples of ``dataset`` can be read by index without evaluating a lazy stage."""
+    if isinstance(dataset, IterableDataset):
+        return dataset._random_access
+    if isinstance(dataset, Dataset):
+        return all(_is_random_access(parent) for parent in dataset._parents())
+    return True
+
+
+def _resumable_iter(dataset: DatasetMixin, state: Optional[Dict[str, Any]]) -> ResumableIterator:
+    if isinstance(dataset, Dataset):
+        return dataset._iter_from(state)
+    return _IndexIterator(dataset, state)
+
+
+def _unchecked_getter(dataset: DatasetMixin) -> Callable[[int], Any]:
+    """Returns a function that reads the example at a valid non-negative index of ``dataset``.
+
+    Stages call it instead of ``dataset[i]`` so that the bounds are not checked again at every level.
+    """
+    get_example = getattr(dataset, 'get_example', None)
+    if get_example is not None:
+        return get_example
+    arrayfiles = sys.modules.get('arrayfiles')
+    if arrayfiles is not None and type(dataset) is arrayfiles.TextFile:
+        return dataset.getline
+    return dataset.__getitem__
+
+
+def _take(sequence: SequenceType[Any], indices: SequenceType[int]) -> List[Any]:
+    if len(indices) > 1:
+        return list(itemgetter(*indices)(sequence))
+    return [sequence[i] for i in indices]
+
+
+def _read_lines(text_file: Any, indices: SequenceType[int]) -> List[str]:
+    """Reads lines of an ``arrayfiles.TextFile``, decoding each run of consecutive indices in one slice."""
+    if os.linesep != '\n':
+        return [text_file.getline(i) for i in indices]
+
+    offsets = text_file._offsets
+    mm = text_file._mm
+    encoding = text_file._encoding
+    lines = []
+    n = len(indices)
+    start = 0
+    while start < n:
+        end = start + 1
+        while end < n and indices[end] == indices[end - 1] + 1:
+            end += 1
+        first = indices[start]
+        count = end - start
+        chunk = mm[offsets[first]:offsets[first + count]].decode(encoding)
+        lines.extend(chunk.split('\n', count)[:count])
+        start = end
+    return lines
+
+
+def _get_examples(dataset: DatasetMixin, indices: SequenceType[int]) -> List[Any]:
+    """Batch counterpart of ``_unchecked_getter``."""
+    get_examples = getattr(dataset, 'get_examples', None)
+    if get_examples is not None:
+        return get_examples(indices)
+    if isinstance(dataset, (list, tuple)):
+        return _take(dataset, indices)
+    arrayfiles = sys.modules.get('arrayfiles')
+    if arrayfiles is not None and type(dataset) is arrayfiles.TextFile:
+        return _read_lines(dataset, indices)
+    get = _unchecked_getter(dataset)
+    return [get(i) for i in indices]
+
+
+class _Composed:
+    """Picklable composition of the functions of fused maps, applied from the first one."""
+
+    def __init__(self, funcs: Tuple[Callable[[Any], Any], ...]) -> None:
+        self._funcs = funcs
+
+    def __call__(self, x: Any) -> Any:
+        for f in self._funcs:
+            x = f(x)
+        return x
+
+
+def _compose(funcs: Tuple[Callable[[Any], Any], ...]) -> Callable[[Any], Any]:
+    if len(funcs) == 1:
+        return funcs[0]
+    return _Composed(funcs)
+
+
+class _Projection:
+    """Picklable map function keeping or dropping fields of dict, tuple or list examples."""
+
+    def __init__(self, fields: SequenceType[Union[int, str]], keep: bool) -> None:
+        self._fields = list(fields)
+        self._keep = keep
+        self.__qualname__ = f'{"select" if keep else "drop"}({self._fields!r})'
+
+    def __call__(self, x: Union[Tuple, List, Dict]) -> Union[Tuple, List, Dict]:
+        fields = self._fields
+        if isinstance(x, dict):
+            if self._keep:
+                return {k: x[k] for k in fields}
+            dropped = set(fields)
+            return {k: v for k, v in x.items() if k not in dropped}
+        if isinstance(x, (tuple, list)):
+            if self._keep:
+                values = [x[i] for i in fields]
+            else:
+                n = len(x)
+                dropped = {i % n for i in fields if -n <= i < n}
+                values = [v for i, v in enumerate(x) if i not in dropped]
+            return tuple(values) if isinstance(x, tuple) else values
+        raise TypeError('Passed argument should be tuple, list or dict',
+                        f'but {type(x)} is passed.')
+
+
+def _func_name(func: Callable) -> str:
+    return getattr(func, '__qualname__', None) or type(func).__name__
+
+
+def _profile_sources(dataset: Dataset, datasets: Tuple[DatasetMixin, ...]) -> Tuple[DatasetMixin, ...]:
+    profiler = profiling.get_profiler()
+    if profiler is None:
+        return datasets
+
+    datasets = tuple(d if isinstance(d, (Dataset, profiling.ProfiledSource))
+                     else profiler.wrap_source(d, f'source({type(d).__name__})')
+                     for d in datasets)
+    dataset._stats = tuple(d._stats for d in datasets if isinstance(d, profiling.ProfiledSource))
+    return datasets
+
+
+def lineflow_concat(*datasets: List[DatasetMixin], lengths: List[int] = None) -> ConcatDataset:
+    return ConcatDataset(*datasets, lengths=lengths)
+
+
+def lineflow_zip(*datasets: List[DatasetMixin], aligned: bool = False) -> ZipDataset:
+    return ZipDataset(*datasets, aligned=aligned)
 
 
 def lineflow_filter(
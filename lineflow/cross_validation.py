@@ -1,7 +1,8 @@
 import random
-from typing import Any, Iterator, List, Tuple
+from typing import Any, Iterator, List, Sequence, Tuple
 
 from lineflow import Dataset
+from lineflow.core import _get_examples, _unchecked_getter
 
 
 class SubDataset(Dataset):
@@ -13,6 +14,7 @@ class SubDataset(Dataset):
         if start < 0 or end > len(dataset):
             raise ValueError('subset overruns the base dataset.')
         self._dataset = dataset
+        self._get = _unchecked_getter(dataset)
         self._start = start
         self._end = end
         self._size = end - start
@@ -26,11 +28,17 @@ class SubDataset(Dataset):
         return self._size
 
     def __iter__(self) -> Iterator[Any]:
+        get = self._get
         for index in self._indices[self._start: self._end]:
-            yield self._dataset[index]
+            yield get(index)
 
     def get_example(self, i: int) -> Any:
-        return self._dataset[self._indices[self._start + i]]
+        return self._get(self._indices[self._start + i])
+
+    def get_examples(self, indices: Sequence[int]) -> List[Any]:
+        offset = self._start
+        base_indices = self._indices
+        return _get_examples(self._dataset, [base_indices[offset + i] for i in indices])
 
 
 def split_dataset(dataset: Dataset,
@@ -1,15 +1,59 @@
-from .cnn_dailymail import CnnDailymail, get_cnn_dailymail  # NOQA
-from .commonsenseqa import CommonsenseQA, get_commonsenseqa  # NOQA
-from .conll2000 import Conll2000, get_conll2000  # NOQA
-from .imdb import Imdb, get_imdb  # NOQA
-from .msr_paraphrase import MsrParaphrase, get_msr_paraphrase  # NOQA
-from .penn_treebank import PennTreebank, get_penn_treebank  # NOQA
-from .scitldr import SciTLDR, get_scitldr  # NOQA
-from .small_parallel_enja import SmallParallelEnJa  # NOQA
-from .small_parallel_enja import get_small_parallel_enja  # NOQA
-from .snli import Snli, get_snli  # NOQA
-from .squad import Squad, get_squad  # NOQA
-from .text_classification import get_text_classification_dataset  # NOQA
-from .text_classification import (AgNews, AmazonReviewFull, AmazonReviewPolarity, Dbpedia, SogouNews,  # NOQA
-                                  YahooAnswers, YelpReviewFull, YelpReviewPolarity)
-from .wikitext import WikiText2, WikiText103, get_wikitext  # NOQA
+import importlib
+import sys
+
+# Dataset modules are imported on first attribute access (PEP 562),
+# so ``import lineflow.datasets`` stays cheap.
+_attributes = {
+    'CnnDailymail': 'cnn_dailymail',
+    'get_cnn_dailymail': 'cnn_dailymail',
+    'CommonsenseQA': 'commonsenseqa',
+    'get_commonsenseqa': 'commonsenseqa',
+    'Conll2000': 'conll2000',
+    'get_conll2000': 'conll2000',
+    'Imdb': 'imdb',
+    'get_imdb': 'imdb',
+    'MsrParaphrase': 'msr_paraphrase',
+    'get_msr_paraphrase': 'msr_paraphrase',
+    'PennTreebank': 'penn_treebank',
+    'get_penn_treebank': 'penn_treebank',
+    'SciTLDR': 'scitldr',
+    'get_scitldr': 'scitldr',
+    'SmallParallelEnJa': 'small_parallel_enja',
+    'get_small_parallel_enja': 'small_parallel_enja',
+    'Snli': 'snli',
+    'get_snli': 'snli',
+    'Squad': 'squad',
+    'get_squad': 'squad',
+    'get_text_classification_dataset': 'text_classification',
+    'AgNews': 'text_classification',
+    'AmazonReviewFull': 'text_classification',
+    'AmazonReviewPolarity': 'text_classification',
+    'Dbpedia': 'text_classification',
+    'SogouNews': 'text_classification',
+    'YahooAnswers': 'text_classification',
+    'YelpReviewFull': 'text_classification',
+    'YelpReviewPolarity': 'text_classification',
+    'WikiText2': 'wikitext',
+    'WikiText103': 'wikitext',
+    'get_wikitext': 'wikitext',
+}
+
+__all__ = list(_attributes)
+
+
+def __getattr__(name):
+    if name not in _attributes:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module = importlib.import_module(f'{__name__}.{_attributes[name]}')
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    for _name in __all__:
+        globals()[_name] = __getattr__(_name)
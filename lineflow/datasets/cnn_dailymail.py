@@ -3,22 +3,24 @@ import os
 import pickle
 import tarfile
 from functools import lru_cache
-from typing import Dict, Tuple
-
-import arrayfiles
-import gdown
+from typing import TYPE_CHECKING, Dict, Tuple
 
 from lineflow import download
 from lineflow.core import ZipDataset
 
+if TYPE_CHECKING:
+    import arrayfiles
+
 
-def get_cnn_dailymail() -> Dict[str, Tuple[arrayfiles.TextFile]]:
+def get_cnn_dailymail() -> Dict[str, Tuple['arrayfiles.TextFile']]:
 
     url = 'https://s3.amazonaws.com/opennmt-models/Summary/cnndm.tar.gz'
     root = download.get_cache_directory(os.path.join('datasets', 'cnn_dailymail'))
 
     def creator(path):
-        archive_path = gdown.cached_download(url)
+        import arrayfiles
+
+        archive_path = download.cached_download(url)
         target_path = os.path.join(root, 'raw')
         with tarfile.open(archive_path, 'r') as archive:
             print(f'Extracting to {target_path}')
@@ -54,4 +56,4 @@ class CnnDailymail(ZipDataset):
             raise ValueError(f"only 'train', 'dev' and 'test' are valid for 'split', but '{split}' is given.")
 
         raw = cached_get_cnn_dailymail()
-        super(CnnDailymail, self).__init__(*raw[split])
+        super(CnnDailymail, self).__init__(*raw[split], aligned=True)
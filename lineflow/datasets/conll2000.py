@@ -5,8 +5,6 @@ import pickle
 from functools import lru_cache
 from typing import Dict, List
 
-import gdown
-
 from lineflow import download
 from lineflow.core import Dataset
 
@@ -19,7 +17,7 @@ def get_conll2000() -> Dict[str, List[str]]:
     def creator(path):
         dataset = {}
         for split in ('train', 'test'):
-            data_path = gdown.cached_download(url.format(split))
+            data_path = download.cached_download(url.format(split))
             with gzip.open(data_path) as f:
                 data = f.read().decode('utf-8').split('\n\n')
 
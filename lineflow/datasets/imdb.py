@@ -1,14 +1,18 @@
 import io
+import mmap
 import os
 import pickle
+import struct
 import tarfile
+from array import array
 from functools import lru_cache
-from typing import Dict, List, Tuple
-
-import gdown
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 
 from lineflow import download
-from lineflow.core import MapDataset
+from lineflow.core import DatasetMixin, MapDataset
+
+_PACKED_MAGIC = b'LFIMDB01'
+_PACKED_HEADER = struct.Struct('<8sQ')
 
 
 def get_imdb() -> Dict[str, List[str]]:
@@ -17,7 +21,7 @@ def get_imdb() -> Dict[str, List[str]]:
     root = download.get_cache_directory(os.path.join('datasets'))
 
     def creator(path):
-        archive_path = gdown.cached_download(url)
+        archive_path = download.cached_download(url)
         with tarfile.open(archive_path, 'r') as archive:
             print(f'Extracting to {root}...')
             archive.extractall(root)
@@ -55,11 +59,130 @@ def _imdb_loader(path: str) -> Tuple[str, int]:
     return (string, label)
 
 
+def _pack_imdb(paths: List[str], path: str) -> None:
+    """Packs the review files into a single file.
+
+    The layout is a header (magic and the number of examples), ``n + 1`` int64 offsets,
+    ``n`` int8 labels and then the UTF-8 encoded texts back to back.
+    """
+
+    n = len(paths)
+    offsets = array('q', [0])
+    labels = array('b')
+    blob_start = _PACKED_HEADER.size + (n + 1) * offsets.itemsize + n * labels.itemsize
+
+    with io.open(path, 'wb') as f:
+        f.seek(blob_start)
+        for p in paths:
+            with io.open(p, 'rb') as g:
+                data = g.read()
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+            labels.append(0 if os.path.basename(os.path.dirname(p)) == 'pos' else 1)
+        f.seek(0)
+        f.write(_PACKED_HEADER.pack(_PACKED_MAGIC, n))
+        offsets.tofile(f)
+        labels.tofile(f)
+
+
+def get_imdb_packed(split: str) -> str:
+    root = download.get_cache_directory(os.path.join('datasets', 'aclImdb'))
+
+    def creator(path):
+        # The list of the review files is only loaded when the packed file is missing.
+        raw = cached_get_imdb()
+        print(f'Packing {split} split to {path}...')
+        _pack_imdb(raw[split], path)
+        return path
+
+    def loader(path):
+        return path
+
+    packed_path = os.path.join(root, f'imdb.{split}.packed')
+    download.cache_or_load_file(packed_path, creator, loader)
+    return packed_path
+
+
+class PackedImdbFile(DatasetMixin):
+    """Memory-mapped view of a file written by ``_pack_imdb``.
+
+    Args:
+        path (str): The path to the packed file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._open()
+
+    def _open(self) -> None:
+        with io.open(self._path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n = _PACKED_HEADER.unpack_from(self._mm)
+        if magic != _PACKED_MAGIC:
+            raise ValueError(f'{self._path} is not a packed IMDB file.')
+
+        view = memoryview(self._mm)
+        start = _PACKED_HEADER.size
+        end = start + (n + 1) * 8
+        self._offsets = view[start:end].cast('q')
+        self._labels = view[end:end + n].cast('b')
+        self._blob_start = end + n
+        self._length = n
+
+    @property
+    def labels(self) -> memoryview:
+        return self._labels
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        for i in range(self._length):
+            yield self.get_example(i)
+
+    def get_example(self, i: int) -> Tuple[str, int]:
+        base = self._blob_start
+        start = base + self._offsets[i]
+        end = base + self._offsets[i + 1]
+        return (self._mm[start:end].decode('utf-8'), self._labels[i])
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'_path': self._path}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._open()
+
+
+def _packed_example(x: Tuple[str, int]) -> Tuple[str, int]:
+    # Packed examples are read ready to use.
+    return x
+
+
 class Imdb(MapDataset):
-    def __init__(self, split: str = 'train', loader=_imdb_loader) -> None:
+    """IMDB movie review dataset.
+
+    Args:
+        split (str, optional): ``'train'`` or ``'test'``.
+        loader (Callable[[str], Any], optional): A function to read an example from its file path.
+            If it is not given, the examples are read from a packed file built on the first use.
+    """
+
+    def __init__(self, split: str = 'train', loader: Callable[[str], Any] = None) -> None:
         if split not in {'train', 'test'}:
             raise ValueError(f"only 'train' and 'test' are valid for 'split', but '{split}' is given.")
 
-        raw = cached_get_imdb()
+        if loader is None:
+            super().__init__(PackedImdbFile(get_imdb_packed(split)), _packed_example)
+        else:
+            super().__init__(cached_get_imdb()[split], loader)
+
+    @property
+    def labels(self) -> memoryview:
+        """The labels of all examples (``0`` for positive and ``1`` for negative).
 
-        super().__init__(raw[split], loader)
+        With the packed file they are returned as a zero-copy view without reading the texts.
+        """
+        if isinstance(self._dataset, PackedImdbFile):
+            return self._dataset.labels
+        return memoryview(array('b', (label for _, label in self)))
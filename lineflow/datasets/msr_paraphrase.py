@@ -5,8 +5,6 @@ import pickle
 from functools import lru_cache
 from typing import Dict, List
 
-import gdown
-
 from lineflow import Dataset, download
 
 
@@ -19,7 +17,7 @@ def get_msr_paraphrase() -> Dict[str, List[Dict[str, str]]]:
         dataset = {}
         fieldnames = ('quality', 'id1', 'id2', 'string1', 'string2')
         for split in ('train', 'test'):
-            data_path = gdown.cached_download(url.format(split))
+            data_path = download.cached_download(url.format(split))
             with io.open(data_path, 'r', encoding='utf-8') as f:
                 f.readline()  # skip header
                 reader = csv.DictReader(f, delimiter='\t', fieldnames=fieldnames)
@@ -4,8 +4,6 @@ import pickle
 from functools import lru_cache
 from typing import Dict, List
 
-import gdown
-
 from lineflow import Dataset, download
 
 
@@ -17,7 +15,7 @@ def get_penn_treebank() -> Dict[str, List[str]]:
     def creator(path):
         dataset = {}
         for split in ('train', 'dev', 'test'):
-            data_path = gdown.cached_download(url.format(split if split != 'dev' else 'valid'))
+            data_path = download.cached_download(url.format(split if split != 'dev' else 'valid'))
             with io.open(data_path, 'rt') as f:
                 dataset[split] = [line.rstrip(os.linesep) for line in f]
 
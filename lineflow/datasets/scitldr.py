@@ -4,8 +4,6 @@ import pickle
 from functools import lru_cache
 from typing import Any, Dict
 
-import gdown
-
 from lineflow import Dataset, download
 
 
@@ -22,7 +20,7 @@ def get_scitldr(mode: str = "a") -> Dict[str, Any]:
     def creator(path):
         dataset = {}
         for split in ("train", "test", "dev"):
-            d_path = gdown.cached_download(url.format(split))
+            d_path = download.cached_download(url.format(split))
             dataset[split] = []
             with open(d_path, "r") as _f:
                 for line in _f.readlines():
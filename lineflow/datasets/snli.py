@@ -6,8 +6,6 @@ import zipfile
 from functools import lru_cache
 from typing import Dict, List
 
-import gdown
-
 from lineflow import Dataset, download
 
 
@@ -17,7 +15,7 @@ def get_snli() -> Dict[str, List[str]]:
     root = download.get_cache_directory(os.path.join('datasets', 'snli'))
 
     def creator(path):
-        archive_path = gdown.cached_download(url)
+        archive_path = download.cached_download(url)
         with zipfile.ZipFile(archive_path, 'r') as archive:
             dataset = {}
             path2key = {
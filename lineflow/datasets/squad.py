@@ -3,14 +3,43 @@ import json
 import os
 import pickle
 from functools import lru_cache
-from typing import Dict, List
-
-import gdown
+from typing import Any, Dict, Iterator, List
 
 from lineflow import Dataset, download
-
-
-def get_squad(version: int) -> Dict[str, List]:
+from lineflow.core import DatasetMixin
+
+
+def _join_squad(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    examples = []
+    for x in data:
+        title = x['title']
+        for paragraph in x['paragraphs']:
+            context = paragraph['context']
+            for qa in paragraph['qas']:
+                qa['title'] = title
+                qa['context'] = context
+                examples.append(qa)
+    return examples
+
+
+def _normalize_squad(data: List[Dict[str, Any]]) -> Dict[str, List]:
+    """Keeps each title and context once, referenced from the questions by ``context_id``."""
+    titles = []
+    contexts = []
+    qas = []
+    for x in data:
+        title = x['title']
+        for paragraph in x['paragraphs']:
+            context_id = len(contexts)
+            titles.append(title)
+            contexts.append(paragraph['context'])
+            for qa in paragraph['qas']:
+                qa['context_id'] = context_id
+                qas.append(qa)
+    return {'qas': qas, 'titles': titles, 'contexts': contexts}
+
+
+def get_squad(version: int, normalized: bool = False) -> Dict[str, Any]:
     version_str = 'v1.1' if version == 1 else 'v2.0'
 
     train_url = f'https://raw.githubusercontent.com/rajpurkar/SQuAD-explorer/master/dataset/train-{version_str}.json'
@@ -18,24 +47,15 @@ def get_squad(version: int) -> Dict[str, List]:
     root = download.get_cache_directory(os.path.join('datasets', 'squad'))
 
     def creator(path):
-        train_path = gdown.cached_download(train_url)
-        dev_path = gdown.cached_download(dev_url)
+        train_path = download.cached_download(train_url)
+        dev_path = download.cached_download(dev_url)
 
         dataset = {}
         for split in ('train', 'dev'):
             data_path = train_path if split == 'train' else dev_path
             with io.open(data_path, 'rt', encoding='utf-8') as f:
                 data = json.load(f)['data']
-            temp = []
-            for x in data:
-                title = x['title']
-                for paragraph in x['paragraphs']:
-                    context = paragraph['context']
-                    for qa in paragraph['qas']:
-                        qa['title'] = title
-                        qa['context'] = context
-                        temp.append(qa)
-            dataset[split] = temp
+            dataset[split] = _normalize_squad(data) if normalized else _join_squad(data)
 
         with io.open(path, 'wb') as f:
             pickle.dump(dataset, f)
@@ -45,24 +65,73 @@ def get_squad(version: int) -> Dict[str, List]:
         with io.open(path, 'rb') as f:
             return pickle.load(f)
 
-    pkl_path = os.path.join(root, f'squad.{version_str}.pkl')
+    suffix = '.normalized' if normalized else ''
+    pkl_path = os.path.join(root, f'squad.{version_str}{suffix}.pkl')
     return download.cache_or_load_file(pkl_path, creator, loader)
 
 
+class SquadQuestions(DatasetMixin):
+    """Questions of a normalized SQuAD split, joined with their title and context on access.
+
+    Args:
+        qas (List[Dict[str, Any]]): The questions, each with the ``context_id`` of its paragraph.
+        titles (List[str]): The titles of the paragraphs.
+        contexts (List[str]): The contexts of the paragraphs.
+    """
+
+    def __init__(self, qas: List[Dict[str, Any]], titles: List[str], contexts: List[str]) -> None:
+        self._qas = qas
+        self._titles = titles
+        self._contexts = contexts
+
+    @property
+    def contexts(self) -> List[str]:
+        return self._contexts
+
+    def _join(self, qa: Dict[str, Any]) -> Dict[str, Any]:
+        qa = qa.copy()
+        context_id = qa.pop('context_id')
+        qa['title'] = self._titles[context_id]
+        qa['context'] = self._contexts[context_id]
+        return qa
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        yield from map(self._join, self._qas)
+
+    def get_example(self, i: int) -> Dict[str, Any]:
+        return self._join(self._qas[i])
+
+    def __len__(self) -> int:
+        return len(self._qas)
+
+
 cached_get_squad = lru_cache()(get_squad)
 
 
 class Squad(Dataset):
 
+    """SQuAD question answering dataset.
+
+    Args:
+        split (str, optional): ``'train'`` or ``'dev'``.
+        version (int, optional): ``1`` or ``2``.
+        normalized (bool, optional): If ``True``, each context is stored once instead of on every
+            question and is joined to the question when it is read.
+    """
+
     def __init__(self,
                  split: str = 'train',
-                 version: int = 1) -> None:
+                 version: int = 1,
+                 normalized: bool = False) -> None:
         if version != 1 and version != 2:
             raise ValueError(f"only 1 and 2 are valid for 'version', but {version} is given.")
 
         if split not in {'train', 'dev'}:
             raise ValueError(f"only 'train' and 'dev' are valid for 'split', but '{split}' is given.")
 
-        raw = cached_get_squad(version)
+        if normalized:
+            dataset = SquadQuestions(**cached_get_squad(version, normalized=True)[split])
+        else:
+            dataset = cached_get_squad(version)[split]
 
-        super().__init__(raw[split])
+        super().__init__(dataset)
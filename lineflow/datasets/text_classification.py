@@ -5,13 +5,13 @@ import pickle
 import sys
 import tarfile
 from functools import lru_cache
-from typing import Dict, List, Union
-
-import arrayfiles
-import gdown
+from typing import TYPE_CHECKING, Dict, List, Union
 
 from lineflow import Dataset, download
 
+if TYPE_CHECKING:
+    import arrayfiles
+
 urls = {
     'ag_news': 'https://drive.google.com/uc?export=download&id=0Bz8a_Dbh9QhbUDNpeUdjb0wxRms',
     'sogou_news': 'https://drive.google.com/uc?export=download&id=0Bz8a_Dbh9QhbUkVqNEszd0pHaFE',
@@ -24,14 +24,14 @@ urls = {
 }
 
 
-def get_text_classification_dataset(key) -> Dict[str, Union[List, arrayfiles.CsvFile]]:
+def get_text_classification_dataset(key) -> Dict[str, Union[List, 'arrayfiles.CsvFile']]:
 
     url = urls[key]
     root = download.get_cache_directory(os.path.join('datasets', 'text_classification', key))
 
     def list_creator(path):
         dataset = {}
-        archive_path = gdown.cached_download(url)
+        archive_path = download.cached_download(url)
 
         maxsize = sys.maxsize
         while True:
@@ -55,8 +55,10 @@ def get_text_classification_dataset(key) -> Dict[str, Union[List, arrayfiles.Csv
         return dataset
 
     def easyfile_creator(path):
+        import arrayfiles
+
         dataset = {}
-        archive_path = gdown.cached_download(url)
+        archive_path = download.cached_download(url)
 
         with tarfile.open(archive_path, 'r') as archive:
             print(f'Extracting to {root}...')
@@ -3,22 +3,22 @@ import os
 import pickle
 import zipfile
 from functools import lru_cache
-from typing import Dict, List, Union
-
-import arrayfiles
-import gdown
+from typing import TYPE_CHECKING, Dict, List, Union
 
 from lineflow import download
 from lineflow.core import Dataset
 
+if TYPE_CHECKING:
+    import arrayfiles
+
 
-def get_wikitext(name: str) -> Dict[str, Union[arrayfiles.TextFile, List]]:
+def get_wikitext(name: str) -> Dict[str, Union['arrayfiles.TextFile', List]]:
 
     url = f'https://s3.amazonaws.com/research.metamind.io/wikitext/{name}-v1.zip'
     root = download.get_cache_directory(os.path.join('datasets', 'wikitext'))
 
     def list_creator(path):
-        archive_path = gdown.cached_download(url)
+        archive_path = download.cached_download(url)
         with zipfile.ZipFile(archive_path, 'r') as archive:
             dataset = {}
             path2key = {f'{name}/wiki.train.tokens': 'train',
@@ -35,7 +35,9 @@ def get_wikitext(name: str) -> Dict[str, Union[arrayfiles.TextFile, List]]:
         return dataset
 
     def easyfile_creator(path):
-        archive_path = gdown.cached_download(url)
+        import arrayfiles
+
+        archive_path = download.cached_download(url)
         with zipfile.ZipFile(archive_path, 'r') as archive:
             print(f'Extracting to {root}...')
             archive.extractall(root)
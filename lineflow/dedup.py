@@ -0,0 +1,193 @@
+"""Removal of exact and near duplicates with bounded memory.
+
+Exact duplicates are found by the 64-bit hashes of their keys in a ``HashTable``, about 32 bytes
+per distinct example. With partitions, the hashes are first written to files under the lineflow
+cache directory and deduplicated one partition at a time. Near duplicates are found with MinHash
+signatures and locality-sensitive hashing: an example is dropped if one band of its signature
+equals a band of an example kept before.
+"""
+import hashlib
+import heapq
+import io
+import os
+import random
+from array import array
+from typing import Any, Callable, Dict, Hashable, Iterator, List
+
+from lineflow import download
+from lineflow.core import DatasetMixin, _func_name
+from lineflow.external import _ExternalDataset, _Rerunnable, _spill_directory
+from lineflow.hashing import HashTable, key_hash
+
+_MODES = ('exact', 'minhash')
+
+# The Mersenne prime of the universal hash functions of MinHash.
+_MERSENNE_PRIME = (1 << 61) - 1
+_MINHASH_SEED = 1
+
+
+def _shingles(text: str, ngram: int) -> List[bytes]:
+    tokens = text.split()
+    if len(tokens) <= ngram:
+        return [' '.join(tokens).encode('utf-8')]
+    return [' '.join(tokens[i:i + ngram]).encode('utf-8') for i in range(len(tokens) - ngram + 1)]
+
+
+class MinHash:
+    """MinHash signatures of texts, computed from their word n-grams.
+
+    Args:
+        num_perm (int, optional): The number of hash functions, i.e. the length of a signature.
+        ngram (int, optional): The number of words in a shingle.
+    """
+
+    def __init__(self, num_perm: int = 128, ngram: int = 5) -> None:
+        rng = random.Random(_MINHASH_SEED)
+        self.num_perm = num_perm
+        self.ngram = ngram
+        self._params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME))
+                        for _ in range(num_perm)]
+
+    def signature(self, text: str) -> array:
+        """Returns the signature of ``text`` as an array of unsigned 64-bit integers."""
+        hs = [int.from_bytes(hashlib.blake2b(s, digest_size=8).digest(), 'little') & _MERSENNE_PRIME
+              for s in set(_shingles(text, self.ngram))]
+        p = _MERSENNE_PRIME
+        return array('Q', [min((a * h + b) % p for h in hs) for a, b in self._params])
+
+    def band_hashes(self, signature: array, bands: int) -> List[int]:
+        """Hashes each of the ``bands`` bands of ``signature`` together with its position."""
+        rows = self.num_perm // bands
+        return [key_hash(j.to_bytes(4, 'little') + signature[j * rows:(j + 1) * rows].tobytes())
+                for j in range(bands)]
+
+
+def _dedup_exact(dataset: DatasetMixin, key: Callable[[Any], Hashable], stats: Dict[str, int]) -> Iterator[Any]:
+    table = HashTable()
+    for x in dataset:
+        if table.add(key_hash(key(x))):
+            yield x
+        else:
+            stats['removed'] += 1
+
+
+def _kept_positions(path: str) -> Iterator[int]:
+    # A partition holds (hash, position) pairs in the order of the positions.
+    pairs = array('q')
+    with io.open(path, 'rb') as f:
+        pairs.frombytes(f.read())
+    table = HashTable(len(pairs))
+    for j in range(0, len(pairs), 2):
+        if table.add(pairs[j]):
+            yield pairs[j + 1]
+
+
+def _dedup_partitioned(dataset: DatasetMixin,
+                       key: Callable[[Any], Hashable],
+                       num_partitions: int,
+                       stats: Dict[str, int]) -> Iterator[Any]:
+    with download.tempdir(dir=_spill_directory()) as temp_dir:
+        paths = [os.path.join(temp_dir, f'{p:04d}.bin') for p in range(num_partitions)]
+        files = [io.open(path, 'wb') for path in paths]
+        try:
+            for i, x in enumerate(dataset):
+                h = key_hash(key(x))
+                files[h % num_partitions].write(array('q', (h, i)).tobytes())
+        finally:
+            for f in files:
+                f.close()
+
+        # Each partition keeps the first position of each hash, so the merged positions are the
+        # first occurrences in order. The examples are read again to yield them.
+        kept = heapq.merge(*[_kept_positions(path) for path in paths])
+        next_kept = next(kept, None)
+        for i, x in enumerate(dataset):
+            if i == next_kept:
+                yield x
+                next_kept = next(kept, None)
+            else:
+                stats['removed'] += 1
+
+
+def _dedup_minhash(dataset: DatasetMixin,
+                   key: Callable[[Any], str],
+                   minhash: MinHash,
+                   bands: int,
+                   stats: Dict[str, int]) -> Iterator[Any]:
+    table = HashTable()
+    for x in dataset:
+        hs = minhash.band_hashes(minhash.signature(key(x)), bands)
+        if any(h in table for h in hs):
+            stats['removed'] += 1
+            continue
+        for h in hs:
+            table.add(h)
+        yield x
+
+
+def _identity(x: Any) -> Any:
+    return x
+
+
+class DedupDataset(_ExternalDataset):
+    """Dataset of the examples of a dataset without duplicates, in their order.
+
+    The first example with each key is kept. The number of examples removed by the last complete
+    iteration is in ``removed``, which is ``None`` until an iteration has finished.
+
+    Args:
+        dataset (DatasetMixin): The dataset to deduplicate.
+        key (Callable[[Any], Any], optional): The function to extract the key of an example. It
+            defaults to the example itself. In ``'minhash'`` mode, the key is a text.
+        mode (str, optional): ``'exact'`` removes the examples whose key hashes to the 64-bit hash
+            of an earlier key. ``'minhash'`` removes the near duplicates of earlier texts.
+        num_partitions (int, optional): In ``'exact'`` mode, the number of partitions to write the
+            hashes to, so only one partition is held in memory at a time. The dataset is then
+            iterated twice and should be deterministic: a shuffled or sampled upstream gives wrong
+            results.
+        num_perm (int, optional): In ``'minhash'`` mode, the length of the signatures.
+        bands (int, optional): In ``'minhash'`` mode, the number of bands of the signatures. More
+            bands remove texts that are less similar.
+        ngram (int, optional): In ``'minhash'`` mode, the number of words in a shingle.
+    """
+
+    def __init__(self,
+                 dataset: DatasetMixin,
+                 key: Callable[[Any], Hashable] = None,
+                 mode: str = 'exact',
+                 num_partitions: int = None,
+                 num_perm: int = 128,
+                 bands: int = 16,
+                 ngram: int = 5) -> None:
+        if mode not in _MODES:
+            raise ValueError(f"'mode' should be one of {_MODES}, but {mode!r} is given.")
+        if mode == 'minhash':
+            if num_partitions is not None:
+                raise ValueError("'num_partitions' is only supported in 'exact' mode.")
+            if num_perm % bands:
+                raise ValueError(f"'num_perm' ({num_perm}) should be a multiple of 'bands' ({bands}).")
+        key = key or _identity
+
+        self._parent = dataset
+        self._key = key
+        self._mode = mode
+        self.removed = None
+
+        if mode == 'minhash':
+            minhash = MinHash(num_perm, ngram)
+
+        def dedup():
+            stats = {'removed': 0}
+            if mode == 'minhash':
+                iterator = _dedup_minhash(dataset, key, minhash, bands, stats)
+            elif num_partitions:
+                iterator = _dedup_partitioned(dataset, key, num_partitions, stats)
+            else:
+                iterator = _dedup_exact(dataset, key, stats)
+            yield from iterator
+            self.removed = stats['removed']
+
+        super(DedupDataset, self).__init__(_Rerunnable(dedup))
+
+    def _describe(self) -> str:
+        return f'DedupDataset({self._mode}, {_func_name(self._key)})'
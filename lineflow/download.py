@@ -40,6 +40,13 @@ def get_cache_directory(cache_name: str,
     return path
 
 
+def cached_download(url: str) -> str:
+    # gdown pulls in requests and bs4, so it is imported on the first download only.
+    import gdown
+
+    return gdown.cached_download(url)
+
+
 def cache_or_load_file(path, creator, loader):
     if os.path.exists(path):
         return loader(path)
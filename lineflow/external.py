@@ -0,0 +1,405 @@
+"""Join, group-by and sort stages for inputs that do not fit in memory.
+
+The examples are held in memory up to a budget counted in examples. Beyond it, joins and groups
+partition their inputs by the hash of their keys into files under the lineflow cache directory (a
+grace hash join) and process the partitions one by one, partitioning them again if they are still
+too large. Sorts write sorted runs there and merge them.
+"""
+import heapq
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Tuple
+
+from lineflow import download
+from lineflow.core import CacheDataset, Dataset, DatasetMixin, IterableDataset, _func_name
+from lineflow.hashing import key_hash
+from lineflow.storage import SegmentDataset, SegmentStore
+
+DEFAULT_MEMORY_LIMIT = 1000000
+
+_FANOUT_BITS = 4
+_FANOUT = 1 << _FANOUT_BITS
+# Each level of partitioning uses the next bits of the 64-bit key hashes.
+_MAX_LEVEL = 64 // _FANOUT_BITS
+
+_JOIN_TYPES = ('inner', 'left', 'right', 'outer')
+
+
+def _spill_directory() -> str:
+    return download.get_cache_directory('tmp')
+
+
+def _read_pickles(path: str) -> Iterator[Any]:
+    with io.open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                break
+
+
+class _Partitions:
+    """Files of pickled ``(hash, key, example)`` triples partitioned by the hash of the key."""
+
+    def __init__(self, directory: str, name: str, level: int) -> None:
+        self._paths = [os.path.join(directory, f'{name}-{p:02d}.pkl') for p in range(_FANOUT)]
+        self._files = [None] * _FANOUT
+        self._shift = _FANOUT_BITS * level
+        self.sizes = [0] * _FANOUT
+        # The hash of the first item of each partition, and whether the others all have it.
+        self._first_hashes = [None] * _FANOUT
+        self._single_hash = [True] * _FANOUT
+
+    def add(self, item: Tuple[int, Hashable, Any]) -> None:
+        h = item[0]
+        p = (h >> self._shift) & (_FANOUT - 1)
+        f = self._files[p]
+        if f is None:
+            f = self._files[p] = io.open(self._paths[p], 'wb')
+            self._first_hashes[p] = h
+        elif h != self._first_hashes[p]:
+            self._single_hash[p] = False
+        self.sizes[p] += 1
+        pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+
+    def splittable(self, p: int) -> bool:
+        """Tells if partitioning the ``p``-th partition again can make it smaller.
+
+        It cannot when all its items have the same hash, e.g. the rows of one hot key.
+        """
+        return not self._single_hash[p] and self.sizes[p] < sum(self.sizes)
+
+    def close(self) -> None:
+        for f in self._files:
+            if f is not None:
+                f.close()
+
+    def read(self, p: int) -> Iterator[Tuple[int, Hashable, Any]]:
+        if self._files[p] is not None:
+            yield from _read_pickles(self._paths[p])
+
+
+def _keyed(dataset: Iterable[Any], key_func: Callable[[Any], Hashable]) -> Iterator[Tuple[int, Hashable, Any]]:
+    for x in dataset:
+        k = key_func(x)
+        yield key_hash(k), k, x
+
+
+def _probe(left: Iterable[Tuple[int, Hashable, Any]],
+           table: Dict[Hashable, List[Any]],
+           how: str) -> Iterator[Tuple[Any, Any]]:
+    matched = set() if how in ('right', 'outer') else None
+    for _, k, x in left:
+        ys = table.get(k)
+        if ys is None:
+            if how in ('left', 'outer'):
+                yield x, None
+            continue
+        if matched is not None:
+            matched.add(k)
+        for y in ys:
+            yield x, y
+    if matched is not None:
+        for k, ys in table.items():
+            if k not in matched:
+                for y in ys:
+                    yield None, y
+
+
+def _hash_join(left: Iterable[Tuple[int, Hashable, Any]],
+               right: Iterable[Tuple[int, Hashable, Any]],
+               how: str,
+               memory_limit: int,
+               level: int = 0) -> Iterator[Tuple[Any, Any]]:
+    right = iter(right)
+    table = OrderedDict()
+    count = 0
+    for h, k, y in right:
+        table.setdefault(k, []).append((h, y))
+        count += 1
+        if count > memory_limit and level < _MAX_LEVEL:
+            break
+    else:
+        yield from _probe(left, {k: [y for _, y in ys] for k, ys in table.items()}, how)
+        return
+
+    with download.tempdir(dir=_spill_directory()) as temp_dir:
+        right_partitions = _Partitions(temp_dir, 'right', level)
+        for k, ys in table.items():
+            for h, y in ys:
+                right_partitions.add((h, k, y))
+        del table
+        for item in right:
+            right_partitions.add(item)
+        right_partitions.close()
+
+        left_partitions = _Partitions(temp_dir, 'left', level)
+        for item in left:
+            left_partitions.add(item)
+        left_partitions.close()
+
+        for p in range(_FANOUT):
+            if right_partitions.sizes[p] > memory_limit and not right_partitions.splittable(p):
+                # Partitioning again would only copy the same rows, so the partition is joined
+                # block by block from disk instead.
+                yield from _block_join(lambda: left_partitions.read(p), right_partitions.read(p), how, memory_limit)
+            else:
+                yield from _hash_join(left_partitions.read(p), right_partitions.read(p), how, memory_limit, level + 1)
+
+
+def _block_join(left: Callable[[], Iterator[Tuple[int, Hashable, Any]]],
+                right: Iterable[Tuple[int, Hashable, Any]],
+                how: str,
+                memory_limit: int) -> Iterator[Tuple[Any, Any]]:
+    """Block nested loop join: ``left()`` is read again for each block of ``memory_limit`` right rows."""
+    # One flag per left row, for the left rows without a match in any block.
+    matched_left = bytearray() if how in ('left', 'outer') else None
+    right = iter(right)
+    while True:
+        table = OrderedDict()
+        for _, k, y in islice(right, memory_limit):
+            table.setdefault(k, []).append(y)
+        if not table:
+            break
+        matched_right = set()
+        for i, (_, k, x) in enumerate(left()):
+            if matched_left is not None and i == len(matched_left):
+                matched_left.append(0)
+            ys = table.get(k)
+            if ys is None:
+                continue
+            if matched_left is not None:
+                matched_left[i] = 1
+            matched_right.add(k)
+            for y in ys:
+                yield x, y
+        if how in ('right', 'outer'):
+            for k, ys in table.items():
+                if k not in matched_right:
+                    for y in ys:
+                        yield None, y
+    if matched_left is not None:
+        for i, (_, _, x) in enumerate(left()):
+            if i >= len(matched_left) or not matched_left[i]:
+                yield x, None
+
+
+def _group(items: Iterable[Tuple[int, Hashable, Any]],
+           memory_limit: int,
+           level: int = 0) -> Iterator[Tuple[Hashable, List[Any]]]:
+    items = iter(items)
+    groups = OrderedDict()
+    count = 0
+    for h, k, x in items:
+        groups.setdefault(k, (h, []))[1].append(x)
+        count += 1
+        if count > memory_limit and level < _MAX_LEVEL:
+            break
+    else:
+        for k, (_, xs) in groups.items():
+            yield k, xs
+        return
+
+    with download.tempdir(dir=_spill_directory()) as temp_dir:
+        partitions = _Partitions(temp_dir, 'group', level)
+        for k, (h, xs) in groups.items():
+            for x in xs:
+                partitions.add((h, k, x))
+        del groups
+        for item in items:
+            partitions.add(item)
+        partitions.close()
+
+        for p in range(_FANOUT):
+            if partitions.sizes[p] > memory_limit and not partitions.splittable(p):
+                # The rows of one key form one group, which is held in memory anyway.
+                yield from _group(partitions.read(p), partitions.sizes[p], level + 1)
+            else:
+                yield from _group(partitions.read(p), memory_limit, level + 1)
+
+
+class _Rerunnable:
+    # Runs the stage again on each iteration instead of buffering its output.
+
+    def __init__(self, func: Callable[[], Iterator[Any]]) -> None:
+        self._func = func
+
+    def __iter__(self) -> Iterator[Any]:
+        return self._func()
+
+
+class _ExternalDataset(IterableDataset):
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._computed:
+            yield from self._dataset
+        else:
+            yield from self._iterable
+
+
+class JoinDataset(_ExternalDataset):
+    """Dataset of the pairs of examples of two datasets with equal keys.
+
+    The examples of ``other`` are hashed in memory and the examples of ``dataset`` stream through,
+    so the pairs come in the order of ``dataset`` unless the inputs were spilled to disk.
+
+    Args:
+        dataset (DatasetMixin): The left dataset.
+        other (DatasetMixin): The right dataset.
+        key (Callable[[Any], Hashable]): The function to extract the key of a left example.
+        other_key (Callable[[Any], Hashable], optional): The function to extract the key of a right
+            example. It defaults to ``key``.
+        how (str, optional): ``'inner'``, ``'left'``, ``'right'`` or ``'outer'``. The examples
+            without a match in an outer join are paired with ``None``.
+        memory_limit (int, optional): The number of right examples held in memory before both
+            inputs are partitioned to disk.
+    """
+
+    def __init__(self,
+                 dataset: DatasetMixin,
+                 other: DatasetMixin,
+                 key: Callable[[Any], Hashable],
+                 other_key: Callable[[Any], Hashable] = None,
+                 how: str = 'inner',
+                 memory_limit: int = None) -> None:
+        if how not in _JOIN_TYPES:
+            raise ValueError(f"'how' should be one of {_JOIN_TYPES}, but {how!r} is given.")
+        other_key = other_key or key
+        memory_limit = memory_limit or DEFAULT_MEMORY_LIMIT
+
+        self._parent = dataset
+        self._other = other
+        self._how = how
+
+        def join():
+            return _hash_join(_keyed(dataset, key), _keyed(other, other_key), how, memory_limit)
+
+        super(JoinDataset, self).__init__(_Rerunnable(join))
+
+    def _parents(self) -> List[Dataset]:
+        return [d for d in (self._parent, self._other) if isinstance(d, Dataset)]
+
+    def _describe(self) -> str:
+        return f'JoinDataset({self._how})'
+
+
+class GroupByDataset(_ExternalDataset):
+    """Dataset of the ``(key, examples)`` pairs of the groups of examples with equal keys.
+
+    The groups come in the order of their first examples unless the input was spilled to disk.
+
+    Args:
+        dataset (DatasetMixin): The dataset to group.
+        key (Callable[[Any], Hashable]): The function to extract the key of an example.
+        memory_limit (int, optional): The number of examples held in memory before the input is
+            partitioned to disk. A single group is always held in memory.
+    """
+
+    def __init__(self,
+                 dataset: DatasetMixin,
+                 key: Callable[[Any], Hashable],
+                 memory_limit: int = None) -> None:
+        memory_limit = memory_limit or DEFAULT_MEMORY_LIMIT
+
+        self._parent = dataset
+        self._key = key
+
+        def group():
+            return _group(_keyed(dataset, key), memory_limit)
+
+        super(GroupByDataset, self).__init__(_Rerunnable(group))
+
+    def _describe(self) -> str:
+        return f'GroupByDataset({_func_name(self._key)})'
+
+
+def _write_run(path: str, examples: List[Any]) -> None:
+    with io.open(path, 'wb') as f:
+        for x in examples:
+            pickle.dump(x, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _merge_sort(runs: List[List[Any]],
+                iterator: Iterator[Any],
+                key: Callable[[Any], Any],
+                memory_limit: int,
+                reverse: bool,
+                store_path: str) -> None:
+    # ``runs`` holds the first sorted run, which is released once it is written.
+    with download.tempdir(dir=_spill_directory()) as temp_dir:
+        paths = []
+        while len(runs[-1]) == memory_limit:
+            paths.append(os.path.join(temp_dir, f'run-{len(paths):08d}.pkl'))
+            _write_run(paths[-1], runs.pop())
+            runs.append(sorted(islice(iterator, memory_limit), key=key, reverse=reverse))
+        if paths:
+            print(f'Merging {len(paths) + bool(runs[-1])} sorted runs...')
+            runs.extend(_read_pickles(path) for path in paths)
+            # Runs are merged in the order they were read, so the sort stays stable.
+            runs.append(runs.pop(0))
+        SegmentStore(store_path).append(heapq.merge(*runs, key=key, reverse=reverse))
+
+
+def sort_dataset(dataset: DatasetMixin,
+                 key: Callable[[Any], Any],
+                 memory_limit: int = None,
+                 reverse: bool = False,
+                 path: str = None) -> Dataset:
+    """Sorts a dataset with an external merge sort.
+
+    The examples are read in runs of ``memory_limit``, and each run is sorted and written to a
+    temporary file. The runs are then merged with a heap into a ``SegmentStore``, so the sorted
+    examples are read from disk on access. The sort is stable.
+
+    Args:
+        dataset (DatasetMixin): The dataset to sort.
+        key (Callable[[Any], Any]): The function to extract the sort key of an example.
+        memory_limit (int, optional): The number of examples held in memory.
+        reverse (bool, optional): If ``True``, the examples are sorted in descending order.
+        path (str, optional): The directory to store the sorted examples in. If it exists, they are
+            loaded from there instead of being sorted again. Without it, a dataset that fits in
+            memory is sorted there, and a larger one is stored in a temporary directory removed
+            with the returned dataset. That dataset cannot be pickled, since a copy in another
+            process would reopen the directory by path after it may have been removed; give
+            ``path`` to send it to spawned workers. Forked workers keep reading the open files.
+
+    Returns (Dataset):
+        The sorted examples, with random access.
+    """
+    if path is not None and os.path.exists(path):
+        print(f'Loading data from {path}...')
+        return SegmentStore(path).snapshot()
+
+    memory_limit = memory_limit or DEFAULT_MEMORY_LIMIT
+    iterator = iter(dataset)
+    runs = [sorted(islice(iterator, memory_limit), key=key, reverse=reverse)]
+
+    if path is not None:
+        def creator(temp_path):
+            print(f'Sorting data to {path}...')
+            _merge_sort(runs, iterator, key, memory_limit, reverse, temp_path)
+
+        download.cache_or_load_file(path, creator, lambda _: None)
+        return SegmentStore(path).snapshot()
+
+    if len(runs[0]) < memory_limit:
+        return CacheDataset(runs[0])
+    store_path = tempfile.mkdtemp(dir=_spill_directory())
+    _merge_sort(runs, iterator, key, memory_limit, reverse, store_path)
+    sorted_dataset = _TemporarySortedDataset(SegmentStore(store_path).snapshot()._dataset._datasets)
+    weakref.finalize(sorted_dataset, shutil.rmtree, store_path, ignore_errors=True)
+    return sorted_dataset
+
+
+class _TemporarySortedDataset(SegmentDataset):
+    """The segments of a sort without ``path``, removed with this dataset."""
+
+    def __getstate__(self) -> Dict[str, Any]:
+        raise TypeError("the result of sort_by without 'path' cannot be pickled, since its temporary "
+                        "files are removed with it. Give 'path' to send it to other processes.")
@@ -0,0 +1,266 @@
+"""Compact 64-bit hash tables and the key index built on them."""
+import hashlib
+import io
+import mmap
+import numbers
+import os
+import struct
+from array import array
+from itertools import chain
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Sequence
+
+from lineflow.core import Dataset, DatasetMixin, _is_random_access
+
+_TABLE_MAGIC = b'LFHASH02'
+# magic, capacity, number of entries, the length of the indexed dataset and its fingerprint.
+_TABLE_HEADER = struct.Struct('<8sQQQq')
+# The number of examples whose keys are part of the fingerprint of an indexed dataset.
+_FINGERPRINT_SAMPLES = 16
+
+
+def _key_bytes(key: Any) -> bytes:
+    if isinstance(key, str):
+        return b's' + key.encode('utf-8')
+    if isinstance(key, bytes):
+        return b'b' + key
+    if isinstance(key, numbers.Real):
+        # Equal numbers are equal keys, e.g. 1, 1.0 and True.
+        if not isinstance(key, numbers.Integral):
+            key = float(key)
+            if not key.is_integer():
+                return b'f' + repr(key).encode('utf-8')
+        return b'i' + repr(int(key)).encode('utf-8')
+    if isinstance(key, tuple):
+        items = [_key_bytes(k) for k in key]
+        return b't' + b''.join(len(item).to_bytes(8, 'little') + item for item in items)
+    return b'r' + repr(key).encode('utf-8')
+
+
+def key_hash(key: Any) -> int:
+    """Hashes a key to a signed 64-bit integer that is stable across processes and runs.
+
+    Keys should be strings, bytes, numbers or tuples of them. Numbers are hashed by their value
+    as in a dict, so ``1``, ``1.0`` and ``True`` have the same hash. Other keys are hashed by
+    their ``repr``.
+    """
+    return int.from_bytes(hashlib.blake2b(_key_bytes(key), digest_size=8).digest(), 'little', signed=True)
+
+
+class HashTable:
+    """Open-addressing table from 64-bit hashes to non-negative integers, stored in one int64 array.
+
+    Each slot is a pair of the hash and the value plus one, so that zero marks an empty slot.
+    The table doubles when it is half full.
+
+    Args:
+        capacity (int, optional): The initial number of slots, rounded up to a power of two.
+    """
+
+    def __init__(self, capacity: int = 8) -> None:
+        size = 8
+        while size < capacity:
+            size *= 2
+        self._slots = array('q', bytes(16 * size))
+        self._capacity = size
+        self._count = 0
+        self._path = None
+        self.length = 0
+        self.fingerprint = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _grow(self) -> None:
+        slots = self._slots
+        self._slots = array('q', bytes(32 * self._capacity))
+        self._capacity *= 2
+        self._count = 0
+        for j in range(0, len(slots), 2):
+            if slots[j + 1]:
+                self.insert(slots[j], slots[j + 1] - 1)
+
+    def insert(self, h: int, value: int) -> None:
+        """Inserts an entry, after the entries of the same hash."""
+        if 2 * (self._count + 1) > self._capacity:
+            self._grow()
+        slots = self._slots
+        mask = self._capacity - 1
+        j = h & mask
+        while slots[2 * j + 1]:
+            j = (j + 1) & mask
+        slots[2 * j] = h
+        slots[2 * j + 1] = value + 1
+        self._count += 1
+
+    def add(self, h: int) -> bool:
+        """Inserts ``h`` as a set member.
+
+        Returns (bool):
+            ``False`` if ``h`` was already in the table.
+        """
+        for _ in self.find(h):
+            return False
+        self.insert(h, 0)
+        return True
+
+    def find(self, h: int) -> Iterator[int]:
+        """Yields the values of the entries of the hash ``h`` in insertion order."""
+        slots = self._slots
+        mask = self._capacity - 1
+        j = h & mask
+        while slots[2 * j + 1]:
+            if slots[2 * j] == h:
+                yield slots[2 * j + 1] - 1
+            j = (j + 1) & mask
+
+    def __contains__(self, h: int) -> bool:
+        for _ in self.find(h):
+            return True
+        return False
+
+    def save(self, path: str, length: int = 0, fingerprint: int = 0) -> None:
+        """Writes the table, with the ``length`` and the ``fingerprint`` of the indexed data.
+
+        They are recorded to check that the table is not stale when it is loaded.
+        """
+        temp_path = f'{path}.tmp'
+        with io.open(temp_path, 'wb') as f:
+            f.write(_TABLE_HEADER.pack(_TABLE_MAGIC, self._capacity, self._count, length, fingerprint))
+            self._slots.tofile(f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'HashTable':
+        """Memory-maps a table written by ``save``. It is read-only."""
+        self = cls.__new__(cls)
+        self._path = path
+        self._open()
+        return self
+
+    def _open(self) -> None:
+        with io.open(self._path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) < _TABLE_HEADER.size:
+            raise ValueError(f'{self._path} is not a hash table file.')
+        magic, self._capacity, self._count, self.length, self.fingerprint = _TABLE_HEADER.unpack_from(mm)
+        if magic != _TABLE_MAGIC:
+            raise ValueError(f'{self._path} is not a hash table file.')
+        self._slots = memoryview(mm)[_TABLE_HEADER.size:].cast('q')
+
+    def __getstate__(self) -> Dict[str, Any]:
+        if self._path is None:
+            return self.__dict__.copy()
+        return {'_path': self._path}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if self._path is not None and '_slots' not in state:
+            self._open()
+
+
+def _source_files(dataset: DatasetMixin) -> List[str]:
+    """Finds the files read by the sources of a pipeline, e.g. ``arrayfiles.TextFile`` objects."""
+    paths = []
+    visited = set()
+    stack = [dataset]
+    while stack:
+        d = stack.pop()
+        if id(d) in visited:
+            continue
+        visited.add(id(d))
+        if isinstance(d, Dataset):
+            stack.extend(d._parents())
+        # Plain attributes only, so that no lazy stage is evaluated.
+        attributes = getattr(d, '__dict__', {})
+        path = attributes.get('_path')
+        if isinstance(path, str) and os.path.isfile(path):
+            paths.append(path)
+        for name in ('_dataset', '_source', '_parent', '_file'):
+            if name in attributes:
+                stack.append(attributes[name])
+        stack.extend(attributes.get('_datasets', ()))
+    return sorted(set(paths))
+
+
+def _fingerprint(dataset: DatasetMixin, key_func: Callable[[Any], Hashable], length: int) -> int:
+    """Hashes the sizes and the modification times of the source files and some keys.
+
+    The keys are read only if it does not evaluate a lazy stage.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for path in _source_files(dataset):
+        stat = os.stat(path)
+        h.update(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0'.encode('utf-8'))
+    if length and _is_random_access(dataset):
+        get = dataset.get_example
+        for i in chain(range(0, length, max(1, length // _FINGERPRINT_SAMPLES)), [length - 1]):
+            h.update(_key_bytes(key_func(get(i))))
+    return int.from_bytes(h.digest(), 'little', signed=True)
+
+
+class KeyIndexedDataset(Dataset):
+    """Dataset with a hash index from the keys of its examples to their positions.
+
+    Lookups check the key of the example found, so hash collisions never return a wrong example.
+    When several examples have the same key, the first one is returned.
+
+    Args:
+        dataset (DatasetMixin): The dataset to index.
+        key_func (Callable[[Any], Hashable]): The function to extract the key of an example.
+        path (str, optional): The file to keep the index in. If it exists and was built for the
+            same data, it is memory-mapped instead of being built again. The data is compared by
+            its length, the sizes and modification times of the files it is read from, and the
+            keys of some of its examples.
+    """
+
+    def __init__(self,
+                 dataset: DatasetMixin,
+                 key_func: Callable[[Any], Hashable],
+                 path: str = None) -> None:
+        super(KeyIndexedDataset, self).__init__(dataset)
+        self._key_func = key_func
+
+        table = None
+        if path is not None:
+            fingerprint = _fingerprint(self, key_func, len(self))
+            if os.path.exists(path):
+                try:
+                    table = HashTable.load(path)
+                except ValueError:
+                    table = None
+                if table is None or (table.length, table.fingerprint) != (len(self), fingerprint):
+                    print(f'Rebuilding the stale index {path}...')
+                    table = None
+        if table is None:
+            table = HashTable(2 * len(self))
+            for i, x in enumerate(self._dataset):
+                table.insert(key_hash(key_func(x)), i)
+            if path is not None:
+                table.save(path, len(self), fingerprint)
+                table = HashTable.load(path)
+        self._table = table
+
+    def position(self, key: Hashable) -> int:
+        """Returns the position of the first example with ``key``.
+
+        Raises:
+            KeyError: If no example has ``key``.
+        """
+        get = self._get
+        key_func = self._key_func
+        for i in self._table.find(key_hash(key)):
+            if key_func(get(i)) == key:
+                return i
+        raise KeyError(key)
+
+    def lookup(self, key: Hashable) -> Any:
+        """Returns the first example with ``key``.
+
+        Raises:
+            KeyError: If no example has ``key``.
+        """
+        return self._get(self.position(key))
+
+    def lookup_many(self, keys: Sequence[Hashable]) -> List[Any]:
+        """Returns the first example with each key."""
+        return self.get_examples([self.position(key) for key in keys])
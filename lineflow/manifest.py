@@ -0,0 +1,141 @@
+"""Manifests of corpora split into line-oriented text shards.
+
+A manifest is a small JSON file listing the shards with their numbers of lines, sizes and
+checksums, so a corpus can be opened without scanning its shards. Build one with::
+
+    python -m lineflow.manifest -o corpus.manifest.json data/*.txt
+"""
+import argparse
+import bisect
+import hashlib
+import io
+import json
+import os
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+MANIFEST_VERSION = 1
+
+_CHUNK_SIZE = 1 << 20
+
+
+def _scan(path: str, checksum: bool) -> Dict[str, Any]:
+    digest = hashlib.sha256() if checksum else None
+    lines = 0
+    size = 0
+    last = b''
+    with io.open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            lines += chunk.count(b'\n')
+            size += len(chunk)
+            last = chunk[-1:]
+            if digest is not None:
+                digest.update(chunk)
+    # A last line without a newline is a line too, as in ``arrayfiles.TextFile``.
+    if last and last != b'\n':
+        lines += 1
+    shard = {'path': path, 'lines': lines, 'bytes': size}
+    if digest is not None:
+        shard['sha256'] = digest.hexdigest()
+    return shard
+
+
+class Manifest:
+    """Shards of a corpus with their numbers of lines.
+
+    Args:
+        shards (List[Dict[str, Any]]): The shards. Each one has ``path``, ``lines``, ``bytes`` and
+            optionally ``sha256``.
+        root (str, optional): The directory that relative shard paths are relative to.
+    """
+
+    def __init__(self, shards: List[Dict[str, Any]], root: str = '.') -> None:
+        self.shards = shards
+        self.root = root
+        self._ends = list(accumulate(shard['lines'] for shard in shards))
+
+    @property
+    def paths(self) -> List[str]:
+        return [os.path.join(self.root, shard['path']) for shard in self.shards]
+
+    @property
+    def lengths(self) -> List[int]:
+        return [shard['lines'] for shard in self.shards]
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def locate(self, i: int) -> Tuple[int, int]:
+        """Maps a global line index to the index of its shard and its line index in the shard."""
+        if not 0 <= i < len(self):
+            raise IndexError('Manifest index out of range')
+        j = bisect.bisect_right(self._ends, i)
+        return j, i - (self._ends[j - 1] if j else 0)
+
+    def verify(self, j: int, checksum: bool = False) -> None:
+        """Checks that the ``j``-th shard has not changed since the manifest was built.
+
+        Raises:
+            ValueError: If the size (or the checksum, when ``checksum`` is ``True``) differs.
+        """
+        shard = self.shards[j]
+        path = self.paths[j]
+        if os.path.getsize(path) != shard['bytes']:
+            raise ValueError(f'{path} does not match the manifest: the size has changed.')
+        if checksum and 'sha256' in shard:
+            if _scan(path, checksum=True)['sha256'] != shard['sha256']:
+                raise ValueError(f'{path} does not match the manifest: the checksum has changed.')
+
+    @classmethod
+    def build(cls, paths: List[str], checksum: bool = True) -> 'Manifest':
+        """Scans the shards once to build their manifest.
+
+        Args:
+            paths (List[str]): The paths to the shards.
+            checksum (bool, optional): If ``True``, SHA-256 checksums are recorded.
+        """
+        return cls([_scan(path, checksum) for path in paths])
+
+    def save(self, path: str) -> None:
+        """Writes the manifest as JSON, with the shard paths relative to its directory."""
+        root = os.path.dirname(os.path.abspath(path))
+        shards = []
+        for shard, shard_path in zip(self.shards, self.paths):
+            shard = dict(shard)
+            shard['path'] = os.path.relpath(os.path.abspath(shard_path), root)
+            shards.append(shard)
+        temp_path = f'{path}.tmp'
+        with io.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'shards': shards}, f, indent=1)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'Manifest':
+        with io.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"{path} has an unsupported manifest version {data.get('version')}.")
+        return cls(data['shards'], root=os.path.dirname(os.path.abspath(path)))
+
+
+def build_manifest(paths: List[str], output: str, checksum: bool = True) -> Manifest:
+    """Builds the manifest of the shards and writes it to ``output``."""
+    manifest = Manifest.build(paths, checksum)
+    manifest.save(output)
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m lineflow.manifest',
+                                     description='Builds the manifest of line-oriented text shards.')
+    parser.add_argument('paths', nargs='+', help='the shard files')
+    parser.add_argument('-o', '--output', required=True, help='the manifest file to write')
+    parser.add_argument('--no-checksum', action='store_true', help='skip the SHA-256 checksums')
+    args = parser.parse_args(argv)
+
+    manifest = build_manifest(args.paths, args.output, checksum=not args.no_checksum)
+    print(f'Wrote {args.output}: {len(manifest.shards)} shards, {len(manifest)} lines.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Evaluation of random-access pipelines in a process pool.
+
+The index range of the pipeline is split into chunks which the workers evaluate with
+``get_examples``. When a directory for partial results is given, each chunk is written there as
+soon as it is done, so an interrupted evaluation only recomputes the missing chunks.
+"""
+import io
+import multiprocessing
+import os
+import pickle
+from itertools import chain
+from typing import Any, Callable, List, Optional, Tuple
+
+from lineflow.core import Dataset, DatasetMixin, FilterDataset, FlatMapDataset, _get_examples, _is_random_access
+
+_MAX_CHUNK_SIZE = 10000
+
+_worker_dataset = None
+
+
+def _plan(dataset: Dataset) -> Optional[Tuple[DatasetMixin, Callable[[List[Any]], List[Any]]]]:
+    """Returns the random-access dataset to split and the function applied to each of its chunks.
+
+    ``filter`` and ``flat_map`` over a random-access parent are evaluated chunk by chunk as well,
+    since they keep the order of the parent. ``None`` is returned for sequential pipelines.
+    """
+    if isinstance(dataset, FilterDataset) and not dataset._computed and _is_random_access(dataset._parent):
+        predicate = dataset._predicate
+        return dataset._parent, lambda examples: list(filter(predicate, examples))
+    if isinstance(dataset, FlatMapDataset) and not dataset._computed and _is_random_access(dataset._parent):
+        map_func = dataset._map_func
+        return dataset._parent, lambda examples: list(chain.from_iterable(map(map_func, examples)))
+    if _is_random_access(dataset):
+        return dataset, None
+    return None
+
+
+def _init_worker(dataset: Dataset) -> None:
+    global _worker_dataset
+    _worker_dataset = dataset
+
+
+def _evaluate_chunk(task: Tuple[int, int, Optional[str]]) -> Any:
+    start, stop, path = task
+    source, func = _plan(_worker_dataset)
+    examples = _get_examples(source, range(start, stop))
+    if func is not None:
+        examples = func(examples)
+    if path is None:
+        return examples
+
+    temp_path = f'{path}.tmp'
+    with io.open(temp_path, 'wb') as f:
+        pickle.dump(examples, f)
+    os.replace(temp_path, path)
+    return stop - start
+
+
+def _get_context() -> Any:
+    # With fork, the workers inherit the pipeline, so lambdas and local functions work as stages.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def evaluate(dataset: Dataset,
+             num_workers: int,
+             chunk_size: int = None,
+             partial_dir: str = None,
+             progress: bool = True) -> List[Any]:
+    """Evaluates all examples of a pipeline in ``num_workers`` processes, keeping their order.
+
+    Pipelines that can only be iterated sequentially are evaluated in this process.
+
+    Args:
+        dataset (Dataset): The pipeline to evaluate.
+        num_workers (int): The number of worker processes.
+        chunk_size (int, optional): The number of source examples per chunk.
+        partial_dir (str, optional): The directory to keep the evaluated chunks in. The chunks
+            already there are reused instead of being evaluated again.
+        progress (bool, optional): If ``True``, the number of evaluated examples is printed.
+
+    Returns (List[Any]):
+        The examples of the pipeline.
+    """
+    if num_workers < 1:
+        raise ValueError(f"'num_workers' should be positive, but {num_workers} is given.")
+
+    plan = _plan(dataset)
+    if plan is None:
+        return list(dataset)
+
+    n = len(plan[0])
+    if chunk_size is None:
+        chunk_size = max(1, min(_MAX_CHUNK_SIZE, -(-n // (num_workers * 4))))
+    ranges = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+    if partial_dir is None:
+        paths = [None] * len(ranges)
+    else:
+        os.makedirs(partial_dir, exist_ok=True)
+        # The range is in the name, so chunks left by an evaluation with another chunk size are not reused.
+        paths = [os.path.join(partial_dir, f'{start:012d}-{stop:012d}.pkl') for start, stop in ranges]
+    tasks = [(start, stop, path) for (start, stop), path in zip(ranges, paths)
+             if path is None or not os.path.exists(path)]
+
+    done = n - sum(stop - start for start, stop, _ in tasks)
+    examples = []
+    if tasks:
+        context = _get_context()
+        with context.Pool(num_workers, initializer=_init_worker, initargs=(dataset,)) as pool:
+            if partial_dir is None:
+                results = pool.imap(_evaluate_chunk, tasks)
+            else:
+                results = pool.imap_unordered(_evaluate_chunk, tasks)
+            for (start, stop, _), result in zip(tasks, results):
+                if partial_dir is None:
+                    examples.extend(result)
+                    done += stop - start
+                else:
+                    # Unordered results are the numbers of examples written.
+                    done += result
+                if progress:
+                    print(f'\rEvaluated {done}/{n} examples', end='', flush=True)
+        if progress:
+            print()
+
+    if partial_dir is not None:
+        for path in paths:
+            with io.open(path, 'rb') as f:
+                examples.extend(pickle.load(f))
+    return examples
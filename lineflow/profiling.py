@@ -0,0 +1,255 @@
+import contextlib
+from functools import update_wrapper
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+_profiler = None
+
+
+class StageStats:
+    """Counters recorded for one stage of a pipeline.
+
+    ``time`` and ``bytes_read`` are measured on the sampled calls only and extrapolated to all calls.
+    """
+
+    __slots__ = ('name', 'calls', 'sampled', 'sampled_time', 'sampled_bytes', 'items_in', 'items_out')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.sampled = 0
+        self.sampled_time = 0.
+        self.sampled_bytes = 0
+        self.items_in = 0
+        self.items_out = 0
+
+    @property
+    def time(self) -> float:
+        if not self.sampled:
+            return 0.
+        return self.sampled_time * self.calls / self.sampled
+
+    @property
+    def bytes_read(self) -> int:
+        if not self.sampled:
+            return 0
+        return round(self.sampled_bytes * self.calls / self.sampled)
+
+    @property
+    def selectivity(self) -> Optional[float]:
+        if not self.items_in:
+            return None
+        return self.items_out / self.items_in
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'name': self.name,
+                'calls': self.calls,
+                'time': self.time,
+                'items_in': self.items_in,
+                'items_out': self.items_out,
+                'selectivity': self.selectivity,
+                'bytes_read': self.bytes_read}
+
+    def __repr__(self) -> str:
+        return (f'StageStats(name={self.name!r}, calls={self.calls}, time={self.time:.6f}, '
+                f'items_in={self.items_in}, items_out={self.items_out}, bytes_read={self.bytes_read})')
+
+
+def _sizeof(x: Any) -> int:
+    if isinstance(x, str):
+        return len(x.encode('utf-8'))
+    if isinstance(x, (bytes, bytearray, memoryview)):
+        return len(x)
+    if isinstance(x, (tuple, list)):
+        return sum(_sizeof(y) for y in x)
+    if isinstance(x, dict):
+        return sum(_sizeof(y) for y in x.values())
+    return 0
+
+
+class Profiler:
+    """Collects the statistics of the stages built while it is active.
+
+    Args:
+        sample_rate (float, optional): The fraction of calls that are timed and measured.
+            Call and item counts are always exact.
+    """
+
+    def __init__(self, sample_rate: float = 1.) -> None:
+        if not 0. < sample_rate <= 1.:
+            raise ValueError(f"'sample_rate' should be in (0, 1], but {sample_rate} is given.")
+
+        self._period = max(1, round(1 / sample_rate))
+        self.stages = []
+
+    def stage(self, name: str) -> StageStats:
+        stats = StageStats(name)
+        self.stages.append(stats)
+        return stats
+
+    def wrap_map(self, func: Callable[[Any], Any], stats: StageStats) -> 'ProfiledFunction':
+        return _ProfiledMap(func, stats, self._period)
+
+    def wrap_filter(self, predicate: Callable[[Any], bool], stats: StageStats) -> 'ProfiledFunction':
+        return _ProfiledFilter(predicate, stats, self._period)
+
+    def wrap_flat_map(self, func: Callable[[Any], Iterable[Any]], stats: StageStats) -> 'ProfiledFunction':
+        return _ProfiledFlatMap(func, stats, self._period)
+
+    def count_items(self, iterable: Iterable[Any], stats: StageStats, attr: str) -> Iterator[Any]:
+        for x in iterable:
+            setattr(stats, attr, getattr(stats, attr) + 1)
+            yield x
+
+    def wrap_source(self, dataset: Any, name: str) -> 'ProfiledSource':
+        return ProfiledSource(dataset, self.stage(name), self._period)
+
+    def report(self) -> str:
+        header = f'{"stage":<40}{"calls":>10}{"time [s]":>12}{"in":>10}{"out":>10}{"bytes":>14}'
+        lines = [header]
+        for s in self.stages:
+            lines.append(f'{s.name[:39]:<40}{s.calls:>10}{s.time:>12.4f}'
+                         f'{s.items_in:>10}{s.items_out:>10}{s.bytes_read:>14}')
+        return '\n'.join(lines)
+
+
+class ProfiledFunction:
+    """Wraps the function of a stage to count its calls and time the sampled ones.
+
+    It is a picklable object rather than a closure, so profiled pipelines can be sent to worker
+    processes. The function it wraps is ``func``.
+    """
+
+    def __init__(self, func: Callable, stats: StageStats, period: int) -> None:
+        update_wrapper(self, func, updated=())
+        self.func = func
+        self.stats = stats
+        self._period = period
+
+    def _call(self, x: Any) -> Any:
+        stats = self.stats
+        stats.calls += 1
+        stats.items_in += 1
+        if stats.calls % self._period:
+            return self.func(x)
+        start = perf_counter()
+        y = self.func(x)
+        stats.sampled_time += perf_counter() - start
+        stats.sampled += 1
+        return y
+
+
+class _ProfiledMap(ProfiledFunction):
+
+    def __call__(self, x: Any) -> Any:
+        y = self._call(x)
+        self.stats.items_out += 1
+        return y
+
+
+class _ProfiledFilter(ProfiledFunction):
+
+    def __call__(self, x: Any) -> bool:
+        result = self._call(x)
+        if result:
+            self.stats.items_out += 1
+        return result
+
+
+class _ProfiledFlatMap(ProfiledFunction):
+
+    def _flat_map(self, x: Any) -> Iterable[Any]:
+        y = self.func(x)
+        if not hasattr(y, '__len__'):
+            y = list(y)
+        return y
+
+    def __call__(self, x: Any) -> Iterable[Any]:
+        stats = self.stats
+        stats.calls += 1
+        stats.items_in += 1
+        if stats.calls % self._period:
+            y = self._flat_map(x)
+        else:
+            start = perf_counter()
+            y = self._flat_map(x)
+            stats.sampled_time += perf_counter() - start
+            stats.sampled += 1
+        stats.items_out += len(y)
+        return y
+
+
+def unwrap(func: Callable) -> Callable:
+    """Returns the function wrapped by ``ProfiledFunction``, or ``func`` if it is not profiled."""
+    return func.func if isinstance(func, ProfiledFunction) else func
+
+
+class ProfiledSource:
+    """Wraps the storage under a pipeline to count the examples and the bytes read from it."""
+
+    def __init__(self, dataset: Any, stats: StageStats, period: int) -> None:
+        self._dataset = dataset
+        self._stats = stats
+        self._period = period
+
+    def _record(self, x: Any) -> Any:
+        stats = self._stats
+        stats.calls += 1
+        stats.items_out += 1
+        if not stats.calls % self._period:
+            stats.sampled += 1
+            stats.sampled_bytes += _sizeof(x)
+        return x
+
+    def __iter__(self) -> Iterator[Any]:
+        record = self._record
+        for x in self._dataset:
+            yield record(x)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Any, List[Any]]:
+        if isinstance(index, slice):
+            return [self._record(x) for x in self._dataset[index]]
+        return self._record(self._dataset[index])
+
+    def get_example(self, i: int) -> Any:
+        return self[i]
+
+    def __len__(self) -> int:
+        return len(self._dataset)
+
+    def rewrap(self, dataset: Any) -> 'ProfiledSource':
+        """Wraps ``dataset`` into the same stage, e.g. a projection read in place of this source."""
+        return ProfiledSource(dataset, self._stats, self._period)
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+@contextlib.contextmanager
+def profile(sample_rate: float = 1.) -> Iterator[Profiler]:
+    """Instruments the datasets built inside the block.
+
+    Each stage (source, ``map``, ``filter``, ``flat_map`` and ``window``) records its call count,
+    the time spent in its function, the items in and out and, for sources, the bytes read.
+    The statistics keep accumulating after the block exits whenever the pipeline is evaluated.
+    Pipelines built outside the block are not instrumented and pay no overhead.
+
+    Args:
+        sample_rate (float, optional): The fraction of calls that are timed.
+            Lower it to keep the instrumentation on in production.
+
+    Examples:
+        >>> with lineflow.profile(sample_rate=0.01) as profiler:
+        ...     ds = lineflow.TextDataset('/path/to/text').map(str.split).filter(bool)
+        >>> ds.all()
+        >>> print(profiler.report())
+    """
+
+    global _profiler
+    previous = _profiler
+    _profiler = Profiler(sample_rate)
+    try:
+        yield _profiler
+    finally:
+        _profiler = previous
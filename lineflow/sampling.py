@@ -0,0 +1,479 @@
+"""Sampling of examples across and within datasets."""
+import heapq
+import io
+import math
+import pickle
+import random
+from abc import ABCMeta, abstractmethod
+from array import array
+from itertools import cycle, islice
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Sequence, Tuple
+
+from lineflow import download
+from lineflow.core import Dataset, DatasetMixin, _get_examples, _profile_sources, _unchecked_getter
+
+_INTERLEAVE_MODES = ('weighted', 'round_robin')
+
+_END = object()
+
+
+def _check_weights(weights: Sequence[float]) -> None:
+    if not len(weights) or any(w < 0 for w in weights) or sum(weights) <= 0:
+        raise ValueError(f'weights should be non-negative with a positive sum, but {list(weights)} are given.')
+
+
+def temperature_weights(weights: Sequence[float], temperature: float = 1.0) -> List[float]:
+    """Scales sampling weights by a temperature and normalizes them.
+
+    The probability of the ``i``-th item is proportional to ``weights[i] ** (1 / temperature)``:
+    ``1`` keeps the weights, larger temperatures flatten them towards uniform sampling.
+    """
+    if temperature <= 0:
+        raise ValueError(f"'temperature' should be positive, but {temperature} is given.")
+    _check_weights(weights)
+    scaled = [w ** (1 / temperature) for w in weights]
+    total = sum(scaled)
+    return [w / total for w in scaled]
+
+
+class AliasTable:
+    """Walker's alias method: draws the index ``i`` with probability ``weights[i] / sum(weights)``.
+
+    Building the table takes O(n) and each draw takes O(1) with one random number.
+
+    Args:
+        weights (Sequence[float]): The non-negative weights, with a positive sum.
+    """
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        _check_weights(weights)
+        n = len(weights)
+        total = sum(weights)
+
+        prob = [w * n / total for w in weights]
+        alias = list(range(n))
+        small = [i for i, p in enumerate(prob) if p < 1]
+        large = [i for i, p in enumerate(prob) if p >= 1]
+        while small and large:
+            s = small.pop()
+            g = large.pop()
+            alias[s] = g
+            prob[g] -= 1 - prob[s]
+            (small if prob[g] < 1 else large).append(g)
+        # What is left is 1 up to rounding errors.
+        for i in small + large:
+            prob[i] = 1.0
+
+        self._n = n
+        self._prob = array('d', prob)
+        self._alias = array('q', alias)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def draw(self, rng: random.Random) -> int:
+        u = rng.random() * self._n
+        i = int(u)
+        return i if u - i < self._prob[i] else self._alias[i]
+
+
+class InterleaveDataset(Dataset):
+    """Dataset interleaving the examples of several datasets.
+
+    In ``'weighted'`` mode, each example comes from a child drawn at random by its weight, and each
+    child yields its examples in order, starting over when it runs out. In ``'round_robin'`` mode,
+    the children take turns, and the exhausted ones are skipped until all of them are, so each
+    example appears once per pass.
+
+    An epoch is ``length`` examples. Iterating draws the children lazily in O(1) per example, and
+    indexing reads the same examples from the plan of the epoch, built once per epoch. Call
+    ``set_epoch`` for a new order.
+
+    Args:
+        datasets (Sequence[DatasetMixin]): The datasets to interleave.
+        weights (Sequence[float], optional): The mixing weights of the datasets. They default to
+            the lengths of the datasets.
+        seed (int, optional): The seed of the draws.
+        temperature (float, optional): The temperature applied to the weights
+            (see ``temperature_weights``).
+        mode (str, optional): ``'weighted'`` or ``'round_robin'``.
+        length (int, optional): The number of examples of an epoch. It defaults to the total
+            length of the datasets.
+    """
+
+    def __init__(self,
+                 datasets: Sequence[DatasetMixin],
+                 weights: Sequence[float] = None,
+                 seed: int = None,
+                 temperature: float = 1.0,
+                 mode: str = 'weighted',
+                 length: int = None) -> None:
+        assert all(isinstance(d, DatasetMixin) for d in datasets)
+        if mode not in _INTERLEAVE_MODES:
+            raise ValueError(f"'mode' should be one of {_INTERLEAVE_MODES}, but {mode!r} is given.")
+        if not datasets:
+            raise ValueError('no datasets are given.')
+        if weights is not None and len(weights) != len(datasets):
+            raise ValueError(f'{len(weights)} weights are given for {len(datasets)} datasets.')
+
+        self._datasets = _profile_sources(self, tuple(datasets))
+        self._getters = [_unchecked_getter(d) for d in self._datasets]
+        self._mode = mode
+        self._seed = random.randrange(1 << 32) if seed is None else seed
+        self._epoch = 0
+        self._plan = None
+
+        lengths = [len(d) for d in self._datasets]
+        self._lengths = lengths
+        self._length = sum(lengths) if length is None else length
+        if self._length and not sum(lengths):
+            raise ValueError('all datasets are empty.')
+        if mode == 'weighted':
+            weights = temperature_weights(lengths if weights is None else weights, temperature)
+            if any(w > 0 and not n for w, n in zip(weights, lengths)):
+                raise ValueError('datasets with positive weights should not be empty.')
+            self.weights = weights
+            self._table = AliasTable(weights)
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch, which the draws of the weighted mode depend on with the seed."""
+        if epoch != self._epoch:
+            self._epoch = epoch
+            self._plan = None
+
+    def _rng(self) -> random.Random:
+        return random.Random(f'{self._seed}:{self._epoch}')
+
+    def _round_robin_pass(self) -> Iterator[Tuple[int, int]]:
+        lengths = self._lengths
+        for i in range(max(lengths)):
+            for j, n in enumerate(lengths):
+                if i < n:
+                    yield j, i
+
+    def plan(self) -> Tuple[array, array]:
+        """Returns the child and the index in the child of each example of the current epoch."""
+        if self._plan is not None:
+            return self._plan
+
+        children = array('q')
+        positions = array('q')
+        if self._mode == 'weighted':
+            rng = self._rng()
+            draw = self._table.draw
+            lengths = self._lengths
+            counts = [0] * len(lengths)
+            for _ in range(self._length):
+                j = draw(rng)
+                children.append(j)
+                positions.append(counts[j] % lengths[j])
+                counts[j] += 1
+        elif self._length:
+            for j, i in islice(cycle(self._round_robin_pass()), self._length):
+                children.append(j)
+                positions.append(i)
+        self._plan = children, positions
+        return self._plan
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._mode == 'weighted':
+            yield from self._iter_weighted()
+        else:
+            yield from self._iter_round_robin()
+
+    def _iter_weighted(self) -> Iterator[Any]:
+        datasets = self._datasets
+        iterators = [iter(d) for d in datasets]
+        rng = self._rng()
+        draw = self._table.draw
+        for _ in range(self._length):
+            j = draw(rng)
+            x = next(iterators[j], _END)
+            if x is _END:
+                iterators[j] = iter(datasets[j])
+                x = next(iterators[j])
+            yield x
+
+    def _iter_round_robin(self) -> Iterator[Any]:
+        remaining = self._length
+        while remaining > 0:
+            iterators = [iter(d) for d in self._datasets]
+            while iterators and remaining > 0:
+                for it in list(iterators):
+                    x = next(it, _END)
+                    if x is _END:
+                        iterators.remove(it)
+                        continue
+                    yield x
+                    remaining -= 1
+                    if not remaining:
+                        return
+
+    def get_example(self, i: int) -> Any:
+        children, positions = self.plan()
+        return self._getters[children[i]](positions[i])
+
+    def get_examples(self, indices: Sequence[int]) -> List[Any]:
+        children, positions = self.plan()
+        getters = self._getters
+        return [getters[children[i]](positions[i]) for i in indices]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _parents(self) -> List[Dataset]:
+        return [d for d in self._datasets if isinstance(d, Dataset)]
+
+    def _describe(self) -> str:
+        return f'InterleaveDataset({self._mode})'
+
+
+def interleave(datasets: Sequence[DatasetMixin],
+               weights: Sequence[float] = None,
+               seed: int = None,
+               temperature: float = 1.0,
+               mode: str = 'weighted',
+               length: int = None) -> InterleaveDataset:
+    """Interleaves the examples of datasets by mixing weights (see ``InterleaveDataset``).
+
+    Examples:
+        >>> mixture = lineflow.interleave([wikitext, domain], weights=[0.7, 0.3], seed=0)
+    """
+    return InterleaveDataset(datasets, weights, seed, temperature, mode, length)
+
+
+class LabelArray:
+    """The labels of the examples of a dataset, extracted once as an array of class ids.
+
+    Args:
+        classes (List[Hashable]): The labels, in the order of their ids.
+        ids (array): The class id of each example.
+    """
+
+    def __init__(self, classes: List[Hashable], ids: array) -> None:
+        self.classes = classes
+        self.ids = ids
+        self.counts = array('q', bytes(8 * len(classes)))
+        for c in ids:
+            self.counts[c] += 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_dataset(cls,
+                     dataset: DatasetMixin,
+                     label_func: Callable[[Any], Hashable],
+                     path: str = None) -> 'LabelArray':
+        """Reads the label of each example in one pass.
+
+        Args:
+            dataset (DatasetMixin): The dataset.
+            label_func (Callable[[Any], Hashable]): The function to extract the label of an
+                example, e.g. ``lambda x: x[0]``.
+            path (str, optional): The file to cache the labels in, e.g. next to the cache of the
+                dataset. If it exists, the labels are loaded from it.
+        """
+
+        def creator(temp_path):
+            ids = array('q')
+            classes = {}
+            for x in dataset:
+                ids.append(classes.setdefault(label_func(x), len(classes)))
+            labels = cls(list(classes), ids)
+            if temp_path is not None:
+                with io.open(temp_path, 'wb') as f:
+                    pickle.dump((labels.classes, labels.ids), f)
+            return labels
+
+        def loader(path):
+            with io.open(path, 'rb') as f:
+                return cls(*pickle.load(f))
+
+        if path is None:
+            return creator(None)
+        return download.cache_or_load_file(path, creator, loader)
+
+
+class IndexSampler(metaclass=ABCMeta):
+    """Base of the samplers of example indices.
+
+    A sampler generates the indices of an epoch at once from a seed and the epoch, so it is
+    deterministic and cheap to iterate. It can be passed as the ``sampler`` of a framework's data
+    loader, or applied to a dataset with ``view``.
+
+    Args:
+        num_samples (int): The number of indices of an epoch.
+        seed (int, optional): The seed of the draws.
+    """
+
+    def __init__(self, num_samples: int, seed: int = None) -> None:
+        self.num_samples = num_samples
+        self._seed = random.randrange(1 << 32) if seed is None else seed
+        self._epoch = 0
+        self._indices = None
+
+    def set_epoch(self, epoch: int) -> None:
+        if epoch != self._epoch:
+            self._epoch = epoch
+            self._indices = None
+
+    @abstractmethod
+    def _generate(self, rng: random.Random) -> array:
+        pass
+
+    def indices(self) -> array:
+        """Returns the indices of the current epoch."""
+        if self._indices is None:
+            self._indices = self._generate(random.Random(f'{self._seed}:{self._epoch}'))
+        return self._indices
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.indices())
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def view(self, dataset: DatasetMixin) -> 'SampledDataset':
+        """Returns the examples of ``dataset`` at the indices of the current epoch as a dataset."""
+        return SampledDataset(dataset, self)
+
+
+class RandomSampler(IndexSampler):
+    """Samples indices uniformly.
+
+    Args:
+        n (int): The number of examples.
+        num_samples (int, optional): The number of indices of an epoch. It defaults to ``n``.
+        replacement (bool, optional): If ``True``, indices are drawn with replacement.
+        seed (int, optional): The seed of the draws.
+    """
+
+    def __init__(self, n: int, num_samples: int = None, replacement: bool = False, seed: int = None) -> None:
+        num_samples = n if num_samples is None else num_samples
+        if not replacement and num_samples > n:
+            raise ValueError(f'{num_samples} samples cannot be drawn from {n} examples without replacement.')
+        super(RandomSampler, self).__init__(num_samples, seed)
+        self._n = n
+        self._replacement = replacement
+
+    def _generate(self, rng: random.Random) -> array:
+        if self._replacement:
+            n = self._n
+            r = rng.random
+            return array('q', [int(r() * n) for _ in range(self.num_samples)])
+        indices = array('q', range(self._n))
+        rng.shuffle(indices)
+        return indices[:self.num_samples]
+
+
+class WeightedSampler(IndexSampler):
+    """Samples indices with probabilities proportional to per-example weights.
+
+    With replacement, each index is drawn in O(1) from an ``AliasTable``. Without replacement, the
+    indices are ordered by random keys ``log(u) / weight`` (Efraimidis and Spirakis), which
+    samples the same distribution as drawing them one by one.
+
+    Args:
+        weights (Sequence[float]): The non-negative weight of each example.
+        num_samples (int, optional): The number of indices of an epoch. It defaults to the number
+            of examples.
+        replacement (bool, optional): If ``True``, indices are drawn with replacement.
+        seed (int, optional): The seed of the draws.
+    """
+
+    def __init__(self,
+                 weights: Sequence[float],
+                 num_samples: int = None,
+                 replacement: bool = True,
+                 seed: int = None) -> None:
+        weights = array('d', weights)
+        num_samples = len(weights) if num_samples is None else num_samples
+        if not replacement:
+            positive = sum(w > 0 for w in weights)
+            if num_samples > positive:
+                raise ValueError(f'{num_samples} samples cannot be drawn from {positive} examples '
+                                 'with positive weights without replacement.')
+        super(WeightedSampler, self).__init__(num_samples, seed)
+        self.weights = weights
+        self._replacement = replacement
+        self._table = AliasTable(weights) if replacement else None
+
+    def _generate(self, rng: random.Random) -> array:
+        if self._replacement:
+            draw = self._table.draw
+            return array('q', [draw(rng) for _ in range(self.num_samples)])
+        r = rng.random
+        # log(u) / w orders as u ** (1 / w) without underflowing to 0 for small weights.
+        # 1 - r() is in (0, 1], so its log is defined.
+        log = math.log
+        keys = [(log(1.0 - r()) / w, i) for i, w in enumerate(self.weights) if w > 0]
+        return array('q', [i for _, i in heapq.nlargest(self.num_samples, keys)])
+
+
+class BalancedSampler(WeightedSampler):
+    """Samples indices so that each class is drawn equally often, or by the given class weights.
+
+    Args:
+        labels (LabelArray): The labels of the examples.
+        num_samples (int, optional): The number of indices of an epoch. It defaults to the number
+            of examples.
+        replacement (bool, optional): If ``True``, indices are drawn with replacement.
+        class_weights (Dict[Hashable, float], optional): The weight of each class. The classes
+            default to equal weights.
+        seed (int, optional): The seed of the draws.
+
+    Examples:
+        >>> train = lineflow.datasets.YahooAnswers('train')
+        >>> labels = LabelArray.from_dataset(train, lambda x: x[0], path='/path/to/labels.pkl')
+        >>> sampler = BalancedSampler(labels, seed=0)
+        >>> loader = DataLoader(train, sampler=sampler, batch_size=32)
+    """
+
+    def __init__(self,
+                 labels: LabelArray,
+                 num_samples: int = None,
+                 replacement: bool = True,
+                 class_weights: Dict[Hashable, float] = None,
+                 seed: int = None) -> None:
+        counts = labels.counts
+        if class_weights is None:
+            per_class = [1 / c for c in counts]
+        else:
+            per_class = [class_weights.get(label, 0) / c for label, c in zip(labels.classes, counts)]
+        super(BalancedSampler, self).__init__([per_class[c] for c in labels.ids], num_samples, replacement, seed)
+        self.labels = labels
+
+
+class SampledDataset(Dataset):
+    """View of a dataset at the indices of a sampler, following its epoch.
+
+    Args:
+        dataset (DatasetMixin): The dataset.
+        sampler (IndexSampler): The sampler of its indices.
+    """
+
+    def __init__(self, dataset: DatasetMixin, sampler: IndexSampler) -> None:
+        super(SampledDataset, self).__init__(dataset)
+        self._sampler = sampler
+
+    def set_epoch(self, epoch: int) -> None:
+        self._sampler.set_epoch(epoch)
+
+    def __iter__(self) -> Iterator[Any]:
+        get = self._get
+        for i in self._sampler.indices():
+            yield get(i)
+
+    def get_example(self, i: int) -> Any:
+        return self._get(self._sampler.indices()[i])
+
+    def get_examples(self, indices: Sequence[int]) -> List[Any]:
+        sampled = self._sampler.indices()
+        return _get_examples(self._dataset, [sampled[i] for i in indices])
+
+    def __len__(self) -> int:
+        return len(self._sampler)
+
+    def _describe(self) -> str:
+        return f'SampledDataset({type(self._sampler).__name__})'
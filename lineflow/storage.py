@@ -0,0 +1,568 @@
+"""Datasets stored in binary files and read through memory maps."""
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+
+from lineflow import download
+from lineflow.core import ConcatDataset, Dataset, DatasetMixin
+
+_TOKENS_MAGIC = b'LFTOK001'
+# magic, typecode, padding to keep the tokens 8-byte aligned and the number of tokens.
+_TOKENS_HEADER = struct.Struct('<8sc7xQ')
+
+
+def _write_tokens(dataset: Iterable[Sequence[int]], path: str, typecode: str) -> None:
+    count = 0
+    with io.open(path, 'wb') as f:
+        f.seek(_TOKENS_HEADER.size)
+        for tokens in dataset:
+            tokens = array(typecode, tokens)
+            tokens.tofile(f)
+            count += len(tokens)
+        f.seek(0)
+        f.write(_TOKENS_HEADER.pack(_TOKENS_MAGIC, typecode.encode('ascii'), count))
+
+
+def _open_tokens(path: str) -> memoryview:
+    with io.open(path, 'rb') as f:
+        magic, typecode, count = _TOKENS_HEADER.unpack(f.read(_TOKENS_HEADER.size))
+        if magic != _TOKENS_MAGIC:
+            raise ValueError(f'{path} is not a token file.')
+        typecode = typecode.decode('ascii')
+        if not count:
+            # An empty file cannot be memory-mapped.
+            return memoryview(array(typecode))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    start = _TOKENS_HEADER.size
+    return memoryview(mm)[start:start + count * array(typecode).itemsize].cast(typecode)
+
+
+class TokenBlockDataset(Dataset):
+    """Fixed-length blocks of a token stream stored as one contiguous integer array.
+
+    Each example is a zero-copy ``memoryview`` of ``block_size`` tokens. For language modeling,
+    ``block_size=bptt + 1`` and ``stride=bptt`` give blocks whose inputs and targets are
+    ``block[:-1]`` and ``block[1:]``.
+
+    Args:
+        tokens (Union[array, memoryview]): The one-dimensional integer array of the tokens.
+        block_size (int): The number of tokens in a block.
+        stride (int, optional): The distance between the starts of consecutive blocks.
+            It defaults to ``block_size``; smaller values make the blocks overlap.
+        drop_last (bool, optional): If ``False``, the tokens after the last full block make a
+            shorter last block.
+    """
+
+    def __init__(self,
+                 tokens: Union[array, memoryview],
+                 block_size: int,
+                 stride: int = None,
+                 drop_last: bool = True) -> None:
+        stride = stride or block_size
+        if block_size < 1 or stride < 1:
+            raise ValueError(f"'block_size' and 'stride' should be positive, but {block_size} and "
+                             f'{stride} are given.')
+
+        self._array = tokens if isinstance(tokens, array) else None
+        self._path = None
+        self._dataset = memoryview(tokens)
+        self._block_size = block_size
+        self._stride = stride
+        self._drop_last = drop_last
+
+        n = len(self._dataset)
+        length = (n - block_size) // stride + 1 if n >= block_size else 0
+        if not drop_last:
+            # A shorter block starts after the last full one if it has tokens not covered yet.
+            covered = (length - 1) * stride + block_size if length else 0
+            if length * stride < n and covered < n:
+                length += 1
+        self._length = length
+
+    @classmethod
+    def from_dataset(cls,
+                     dataset: DatasetMixin,
+                     block_size: int,
+                     stride: int = None,
+                     drop_last: bool = True,
+                     path: str = None,
+                     typecode: str = 'i') -> 'TokenBlockDataset':
+        """Concatenates the token ids of the examples of ``dataset`` and splits them into blocks.
+
+        Args:
+            dataset (DatasetMixin): The dataset of sequences of token ids.
+            block_size (int): The number of tokens in a block.
+            stride (int, optional): The distance between the starts of consecutive blocks.
+            drop_last (bool, optional): If ``False``, the tokens after the last full block make a
+                shorter last block.
+            path (str, optional): The file to cache the tokens in. If it exists, the tokens are
+                memory-mapped from it without evaluating ``dataset``.
+            typecode (str, optional): The ``array`` type code of the token ids.
+        """
+        if path is None:
+            tokens = array(typecode)
+            for x in dataset:
+                tokens.extend(x)
+            return cls(tokens, block_size, stride, drop_last)
+
+        def creator(temp_path):
+            print(f'Saving tokens to {path}...')
+            _write_tokens(dataset, temp_path, typecode)
+
+        if not os.path.exists(path):
+            # The tokens are moved there at the end, so a missing directory would fail late.
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        download.cache_or_load_file(path, creator, lambda _: None)
+        self = cls(_open_tokens(path), block_size, stride, drop_last)
+        self._path = path
+        return self
+
+    @property
+    def tokens(self) -> memoryview:
+        """The whole token stream."""
+        return self._dataset
+
+    def __iter__(self) -> Iterator[memoryview]:
+        get_example = self.get_example
+        for i in range(self._length):
+            yield get_example(i)
+
+    def get_example(self, i: int) -> memoryview:
+        start = i * self._stride
+        return self._dataset[start:start + self._block_size]
+
+    def get_examples(self, indices: Sequence[int]) -> List[memoryview]:
+        get_example = self.get_example
+        return [get_example(i) for i in indices]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _describe(self) -> str:
+        return f'TokenBlockDataset(block_size={self._block_size}, stride={self._stride})'
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # Memory views cannot be pickled; the tokens are mapped again from the file or the array.
+        del state['_dataset']
+        if self._path is not None:
+            state['_array'] = None
+        elif self._array is None:
+            state['_array'] = array(self._dataset.format, self._dataset)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if self._path is not None:
+            self._dataset = _open_tokens(self._path)
+        else:
+            self._dataset = memoryview(self._array)
+
+
+_STORE_VERSION = 1
+
+
+class _Segment(DatasetMixin):
+    """An immutable segment of a ``SegmentStore``: pickled examples back to back and their offsets."""
+
+    def __init__(self, path: str, count: int) -> None:
+        self._path = path
+        self._count = count
+        self._open()
+
+    def _open(self) -> None:
+        offsets = array('q')
+        with io.open(f'{self._path}.idx', 'rb') as f:
+            offsets.fromfile(f, self._count + 1)
+        with io.open(f'{self._path}.bin', 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = offsets
+
+    def __iter__(self) -> Iterator[Any]:
+        get_example = self.get_example
+        for i in range(self._count):
+            yield get_example(i)
+
+    def get_example(self, i: int) -> Any:
+        return pickle.loads(self._mm[self._offsets[i]:self._offsets[i + 1]])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'_path': self._path, '_count': self._count}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._open()
+
+
+class SegmentDataset(Dataset):
+    """A snapshot of a ``SegmentStore``.
+
+    Its length and examples do not change when the store is appended to. Copies unpickled in
+    other processes reopen the segment files, which stay in the directory until the second
+    ``compact`` after the snapshot was taken.
+    """
+
+    def __init__(self, segments: List[_Segment]) -> None:
+        super(SegmentDataset, self).__init__(ConcatDataset(*segments, lengths=[len(s) for s in segments]))
+
+    def _describe(self) -> str:
+        return f'SegmentDataset({len(self._dataset._datasets)} segments)'
+
+
+class SegmentStore:
+    """Append-only store of examples in a directory.
+
+    Each ``append`` pickles the new examples into a new immutable segment file and then replaces
+    the index listing the segments in one atomic rename, so an append costs O(new examples) and
+    a reader sees either all of it or none of it. ``compact`` merges the segments into one; the
+    segments it replaces are retired, and removed by the next ``compact``.
+    Only one process should write to a store at a time.
+
+    Args:
+        path (str): The directory of the store. It is created if it does not exist.
+
+    Examples:
+        >>> store = lineflow.storage.SegmentStore('/path/to/store')
+        >>> store.append(new_examples)
+        >>> ds = store.snapshot()
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self._path, 'index.json')
+
+    def _load_index(self) -> Dict[str, Any]:
+        if not os.path.exists(self._index_path):
+            return {'segments': [], 'retired': []}
+        with io.open(self._index_path, 'rt', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != _STORE_VERSION:
+            raise ValueError(f"{self._path} has an unsupported store version {index.get('version')}.")
+        index.setdefault('retired', [])
+        return index
+
+    def _read_index(self) -> List[Dict[str, Any]]:
+        return self._load_index()['segments']
+
+    def _write_index(self, segments: List[Dict[str, Any]], retired: List[str]) -> None:
+        temp_path = f'{self._index_path}.tmp'
+        with io.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump({'version': _STORE_VERSION, 'segments': segments, 'retired': retired}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._index_path)
+
+    def _new_name(self, segments: List[Dict[str, Any]]) -> str:
+        # Names are never reused, so a segment file never changes once it is listed in an index.
+        names = [int(s['name']) for s in segments]
+        names.extend(int(name.split('.')[0]) for name in os.listdir(self._path) if name.split('.')[0].isdigit())
+        return f'{max(names, default=-1) + 1:08d}'
+
+    def _write_segment(self, name: str, chunks: Iterable[bytes]) -> int:
+        path = os.path.join(self._path, name)
+        offsets = array('q', [0])
+        with io.open(f'{path}.bin', 'wb') as f:
+            for data in chunks:
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+            f.flush()
+            os.fsync(f.fileno())
+        with io.open(f'{path}.idx', 'wb') as f:
+            offsets.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(offsets) - 1
+
+    def append(self, examples: Iterable[Any]) -> int:
+        """Appends the examples in a new segment.
+
+        Returns (int):
+            The number of examples appended.
+        """
+        index = self._load_index()
+        segments = index['segments']
+        name = self._new_name(segments)
+        count = self._write_segment(name, (pickle.dumps(x, pickle.HIGHEST_PROTOCOL) for x in examples))
+        if not count:
+            self._remove_segment(name)
+            return 0
+        self._write_index(segments + [{'name': name, 'count': count}], index['retired'])
+        return count
+
+    def _remove_segment(self, name: str) -> None:
+        for ext in ('.bin', '.idx'):
+            path = os.path.join(self._path, name + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def compact(self) -> None:
+        """Merges all segments into one, copying the pickled examples without loading them.
+
+        The merged segments are retired rather than removed, so snapshots taken before, and their
+        copies in other processes, can still open them. The segments retired by the previous
+        ``compact`` are removed, so a snapshot stays valid until the second ``compact`` after it.
+        """
+        index = self._load_index()
+        segments = index['segments']
+        if len(segments) < 2:
+            return
+
+        def chunks():
+            for segment in segments:
+                s = _Segment(os.path.join(self._path, segment['name']), segment['count'])
+                for i in range(len(s)):
+                    yield s._mm[s._offsets[i]:s._offsets[i + 1]]
+
+        name = self._new_name(segments)
+        count = self._write_segment(name, chunks())
+        self._write_index([{'name': name, 'count': count}], [segment['name'] for segment in segments])
+        for retired in index['retired']:
+            self._remove_segment(retired)
+
+    def snapshot(self) -> SegmentDataset:
+        """Opens the segments listed in the index now as a dataset."""
+        try:
+            segments = [_Segment(os.path.join(self._path, s['name']), s['count']) for s in self._read_index()]
+        except FileNotFoundError:
+            # A compact in another process removed segments between reading the index and
+            # opening them. The index read again lists segments that are kept.
+            segments = [_Segment(os.path.join(self._path, s['name']), s['count']) for s in self._read_index()]
+        return SegmentDataset(segments)
+
+    def __len__(self) -> int:
+        return sum(s['count'] for s in self._read_index())
+
+
+_COLUMNS_VERSION = 1
+_COLUMN_TYPES = {str: 'str', int: 'int', float: 'float'}
+_COLUMN_TYPECODES = {'int': 'q', 'float': 'd'}
+
+
+def _column_type(value: Any, name: Union[int, str]) -> str:
+    # bool is a subclass of int but would not come back as bool.
+    column_type = _COLUMN_TYPES.get(type(value))
+    if column_type is None:
+        raise TypeError(f'Field {name!r} has a value of type {type(value).__name__}; '
+                        'only str, int and float fields can be stored in columns.')
+    return column_type
+
+
+class _ColumnWriter:
+    """Accumulates the values of one field in a compact array.
+
+    The values of a declared type should be exactly of that type. An inferred ``'int'`` column is
+    promoted to ``'float'`` by a float value, and an inferred ``'float'`` column takes ints too.
+    """
+
+    def __init__(self, name: Union[int, str], column_type: str, declared: bool = False) -> None:
+        self.name = name
+        self.type = column_type
+        self.declared = declared
+        if column_type == 'str':
+            self.values = bytearray()
+            self.offsets = array('q', [0])
+        else:
+            self.values = array(_COLUMN_TYPECODES[column_type])
+
+    def append(self, value: Any) -> None:
+        value_type = _column_type(value, self.name)
+        if value_type != self.type:
+            if self.declared:
+                raise TypeError(f'Field {self.name!r} is declared as {self.type} '
+                                f'but has a {type(value).__name__} value.')
+            if value_type == 'str' or self.type == 'str':
+                raise TypeError(f'Field {self.name!r} has both {self.type} and {value_type} values.')
+            if self.type == 'int':
+                # Mixed numbers are promoted to float.
+                self.type = 'float'
+                self.values = array('d', self.values)
+        if self.type == 'str':
+            self.values += value.encode('utf-8')
+            self.offsets.append(len(self.values))
+        else:
+            self.values.append(value)
+
+    def write(self, path: str) -> None:
+        with io.open(f'{path}.col', 'wb') as f:
+            f.write(self.values)
+        if self.type == 'str':
+            with io.open(f'{path}.off', 'wb') as f:
+                self.offsets.tofile(f)
+
+
+def _map_file(path: str, typecode: str) -> memoryview:
+    with io.open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            # An empty file cannot be memory-mapped.
+            return memoryview(array(typecode))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode)
+
+
+class ColumnDataset(Dataset):
+    """Records of a fixed schema stored column by column in a directory.
+
+    Numeric fields are arrays of int64 or float64 and string fields are UTF-8 buffers with their
+    offsets, all memory-mapped. Records are rebuilt on access, and whole fields are read with
+    ``column``. Build one with ``ColumnDataset.build`` or ``Dataset.save_columns``.
+
+    Args:
+        path (str): The directory of the columns.
+    """
+
+    def __init__(self, path: str) -> None:
+        with io.open(os.path.join(path, 'schema.json'), 'rt', encoding='utf-8') as f:
+            schema = json.load(f)
+        if schema.get('version') != _COLUMNS_VERSION:
+            raise ValueError(f"{path} has an unsupported column version {schema.get('version')}.")
+
+        self._path = path
+        self._kind = schema['kind']
+        self._length = schema['length']
+        self._fields = schema['fields']
+        self._selected = list(range(len(self._fields)))
+        self._open()
+
+    def _open(self) -> None:
+        self._columns = []
+        for j, field in enumerate(self._fields):
+            path = os.path.join(self._path, str(j))
+            if field['type'] == 'str':
+                self._columns.append((_map_file(f'{path}.col', 'B'), _map_file(f'{path}.off', 'q')))
+            else:
+                self._columns.append(_map_file(f'{path}.col', _COLUMN_TYPECODES[field['type']]))
+        self._dataset = self._columns
+
+    @classmethod
+    def build(cls,
+              dataset: DatasetMixin,
+              path: str,
+              schema: Dict[Union[int, str], str] = None) -> 'ColumnDataset':
+        """Writes the records of ``dataset`` as columns, unless ``path`` already exists.
+
+        Args:
+            dataset (DatasetMixin): The dataset of dicts, tuples or lists with the same fields.
+            path (str): The directory to write.
+            schema (Dict[Union[int, str], str], optional): The type (``'str'``, ``'int'`` or
+                ``'float'``) of each field. It is inferred from the values if it is not given.
+
+        Raises:
+            TypeError: If a value is not of the type declared in ``schema`` for its field, or has
+                a type that cannot be stored.
+        """
+
+        def creator(temp_path):
+            print(f'Saving columns to {path}...')
+            writers = None
+            kind = 'dict'
+            length = 0
+            for x in dataset:
+                if writers is None:
+                    kind = 'dict' if isinstance(x, dict) else 'tuple' if isinstance(x, tuple) else 'list'
+                    names = list(x) if kind == 'dict' else list(range(len(x)))
+                    types = schema or {name: _column_type(x[name], name) for name in names}
+                    writers = [_ColumnWriter(name, types[name], schema is not None) for name in names]
+                if len(x) != len(writers):
+                    raise ValueError(f'Example {length} has {len(x)} fields instead of {len(writers)}.')
+                for writer in writers:
+                    writer.append(x[writer.name])
+                length += 1
+
+            os.makedirs(temp_path)
+            for j, writer in enumerate(writers or []):
+                writer.write(os.path.join(temp_path, str(j)))
+            fields = [{'name': w.name, 'type': w.type} for w in writers or []]
+            with io.open(os.path.join(temp_path, 'schema.json'), 'wt', encoding='utf-8') as f:
+                json.dump({'version': _COLUMNS_VERSION, 'kind': kind, 'length': length, 'fields': fields}, f)
+
+        download.cache_or_load_file(path, creator, lambda _: None)
+        return cls(path)
+
+    def _index(self, name: Union[int, str]) -> int:
+        for j, field in enumerate(self._fields):
+            if field['name'] == name:
+                return j
+        raise KeyError(name)
+
+    def _read(self, j: int, i: int) -> Any:
+        column = self._columns[j]
+        if isinstance(column, tuple):
+            values, offsets = column
+            return str(values[offsets[i]:offsets[i + 1]], 'utf-8')
+        return column[i]
+
+    def column(self, name: Union[int, str]) -> Union[memoryview, List[str]]:
+        """Reads a whole field.
+
+        Returns (Union[memoryview, List[str]]):
+            A zero-copy view of the numbers, or the list of the strings.
+        """
+        column = self._columns[self._index(name)]
+        if not isinstance(column, tuple):
+            return column
+        values, offsets = column
+        text = str(values, 'utf-8')
+        if len(text) == len(values):
+            # ASCII only, so the byte offsets are also the character offsets.
+            return [text[offsets[i]:offsets[i + 1]] for i in range(self._length)]
+        return [str(values[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(self._length)]
+
+    def __iter__(self) -> Iterator[Any]:
+        get_example = self.get_example
+        for i in range(self._length):
+            yield get_example(i)
+
+    def get_example(self, i: int) -> Any:
+        values = [self._read(j, i) for j in self._selected]
+        if self._kind == 'dict':
+            fields = self._fields
+            return {fields[j]['name']: value for j, value in zip(self._selected, values)}
+        return tuple(values) if self._kind == 'tuple' else values
+
+    def get_examples(self, indices: Sequence[int]) -> List[Any]:
+        get_example = self.get_example
+        return [get_example(i) for i in indices]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _project(self, names: List[Union[int, str]]) -> 'ColumnDataset':
+        dataset = self.__class__.__new__(self.__class__)
+        dataset.__dict__.update(self.__dict__)
+        dataset._selected = [self._index(name) for name in names]
+        return dataset
+
+    def select(self, fields: Sequence[Union[int, str]]) -> 'ColumnDataset':
+        """Keeps only the given fields; the other columns are never read."""
+        return self._project(list(fields))
+
+    def drop(self, fields: Sequence[Union[int, str]]) -> 'ColumnDataset':
+        """Removes the given fields, see ``select``."""
+        dropped = set(fields)
+        return self._project([self._fields[j]['name'] for j in self._selected
+                              if self._fields[j]['name'] not in dropped])
+
+    def _describe(self) -> str:
+        return f'ColumnDataset({", ".join(repr(self._fields[j]["name"]) for j in self._selected)})'
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_columns']
+        del state['_dataset']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._open()
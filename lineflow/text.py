@@ -1,9 +1,64 @@
-from typing import List, Union
+import csv
+import io
+import os
+from typing import Any, Dict, Iterator, List, Sequence, Union
 
-import arrayfiles
+from lineflow import Dataset, profiling
+from lineflow.core import ConcatDataset, DatasetMixin, ZipDataset, _read_lines
+from lineflow.manifest import Manifest
 
-from lineflow import Dataset
-from lineflow.core import ConcatDataset, ZipDataset
+
+class _LazyTextFile(DatasetMixin):
+    """An ``arrayfiles.TextFile`` opened, and memory-mapped, on its first read."""
+
+    def __init__(self, path: str, encoding: str) -> None:
+        self._path = path
+        self._encoding = encoding
+        self._file = None
+
+    def _open(self) -> Any:
+        import arrayfiles
+
+        return arrayfiles.TextFile(self._path, self._encoding)
+
+    @property
+    def file(self) -> Any:
+        if self._file is None:
+            self._file = self._open()
+        return self._file
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.file
+
+    def get_example(self, i: int) -> str:
+        return self.file.getline(i)
+
+    def get_examples(self, indices: Sequence[int]) -> List[str]:
+        return _read_lines(self.file, indices)
+
+    def __len__(self) -> int:
+        return len(self.file)
+
+
+class _ManifestShard(_LazyTextFile):
+    """A shard listed in a manifest, opened on its first read."""
+
+    def __init__(self, manifest: Manifest, index: int, encoding: str) -> None:
+        super(_ManifestShard, self).__init__(os.path.join(manifest.root, manifest.shards[index]['path']), encoding)
+        self._manifest = manifest
+        self._index = index
+
+    def _open(self) -> Any:
+        self._manifest.verify(self._index)
+        return super(_ManifestShard, self)._open()
+
+    def __iter__(self) -> Iterator[str]:
+        # Empty shards are never opened since an empty file cannot be memory-mapped.
+        if len(self):
+            yield from self.file
+
+    def __len__(self) -> int:
+        return self._manifest.shards[self._index]['lines']
 
 
 class TextDataset(Dataset):
@@ -13,24 +68,94 @@ class TextDataset(Dataset):
         paths (Union[str, List[str]]): The path to the text file(s).
         encoding (str, optional): The name of the encoding used to decode.
         mode (str, optional): Controls how to combine the text files.
+        lengths (List[int], optional): The numbers of lines of the files. With ``mode='concat'``,
+            the files are not scanned to count their lines.
+
+    With ``mode='concat'``, each file is opened on the first read of its lines, so building the
+    dataset does not touch the files.
     """
 
     def __init__(self,
                  paths: Union[str, List[str]],
                  encoding: str = 'utf-8',
-                 mode: str = 'zip') -> None:
+                 mode: str = 'zip',
+                 lengths: List[int] = None) -> None:
+        import arrayfiles
+
         if isinstance(paths, str):
             dataset = arrayfiles.TextFile(paths, encoding)
         elif isinstance(paths, list):
             if mode == 'zip':
                 dataset = ZipDataset(*[arrayfiles.TextFile(p, encoding) for p in paths])
             elif mode == 'concat':
-                dataset = ConcatDataset(*[arrayfiles.TextFile(p, encoding) for p in paths])
+                dataset = ConcatDataset(*[_LazyTextFile(p, encoding) for p in paths], lengths=lengths)
             else:
                 raise ValueError(f"only 'zip' and 'concat' are valid for 'mode', but '{mode}' is given.")
 
         super().__init__(dataset)
 
+    @classmethod
+    def from_manifest(cls, path: str, encoding: str = 'utf-8') -> 'TextDataset':
+        """Concatenates the shards listed in a manifest built by ``lineflow.manifest``.
+
+        Only the manifest is read here. Each shard is opened, and its size checked against the
+        manifest, on its first read.
+
+        Args:
+            path (str): The path to the manifest.
+            encoding (str, optional): The name of the encoding used to decode.
+        """
+        manifest = Manifest.load(path)
+        shards = [_ManifestShard(manifest, j, encoding) for j in range(len(manifest.shards))]
+        dataset = cls.__new__(cls)
+        Dataset.__init__(dataset, ConcatDataset(*shards, lengths=manifest.lengths))
+        return dataset
+
+
+class _CsvColumns(DatasetMixin):
+    """Rows of an ``arrayfiles.CsvFile`` reduced to some of their columns.
+
+    With ``names``, the rows are dicts of the columns at ``positions`` named ``names``,
+    otherwise lists of them.
+    """
+
+    def __init__(self,
+                 csv_file: Any,
+                 delimiter: str,
+                 positions: List[int],
+                 names: List[str] = None) -> None:
+        self._file = csv_file
+        self._delimiter = delimiter
+        self._positions = positions
+        self._names = names
+
+    def _project(self, row: List[str]) -> Union[List[str], Dict[str, str]]:
+        if self._names is None:
+            return [row[p] for p in self._positions]
+        # Missing columns are None as in csv.DictReader.
+        return {name: row[p] if p < len(row) else None for name, p in zip(self._names, self._positions)}
+
+    def __iter__(self) -> Iterator[Union[List[str], Dict[str, str]]]:
+        f = self._file
+        with io.open(f._path, encoding=f._encoding) as fp:
+            if self._names is not None:
+                fp.readline()
+            for row in csv.reader(fp, delimiter=self._delimiter):
+                if self._names is not None and not row:
+                    # csv.DictReader skips blank lines.
+                    continue
+                yield self._project(row)
+
+    def get_example(self, i: int) -> Union[List[str], Dict[str, str]]:
+        return self._project(next(csv.reader([self._file.getline(i)], delimiter=self._delimiter)))
+
+    def get_examples(self, indices: Sequence[int]) -> List[Union[List[str], Dict[str, str]]]:
+        rows = csv.reader(_read_lines(self._file, indices), delimiter=self._delimiter)
+        return [self._project(row) for row in rows]
+
+    def __len__(self) -> int:
+        return len(self._file)
+
 
 class CsvDataset(Dataset):
     """Dataset of a CSV file.
@@ -47,6 +172,54 @@ class CsvDataset(Dataset):
                  encoding: str = 'utf-8',
                  delimiter: str = ',',
                  header: bool = False) -> None:
+        import arrayfiles
+
+        self._path = path
+        self._encoding = encoding
+        self._delimiter = delimiter
+        self._header = header
 
         super().__init__(
             arrayfiles.CsvFile(path=path, encoding=encoding, delimiter=delimiter, header=header))
+
+    def _fieldnames(self) -> List[str]:
+        with io.open(self._path, encoding=self._encoding) as f:
+            return next(csv.reader(f, delimiter=self._delimiter), [])
+
+    def _project(self, fields: List[Union[int, str]]) -> Dataset:
+        import arrayfiles
+
+        source = self._dataset
+        csv_file = source._dataset if isinstance(source, profiling.ProfiledSource) else source
+        if not isinstance(csv_file, arrayfiles.CsvFile):
+            return super().select(fields)
+
+        if self._header:
+            names = self._fieldnames()
+            positions = []
+            for field in fields:
+                if field not in names:
+                    raise KeyError(field)
+                positions.append(names.index(field))
+            columns = _CsvColumns(csv_file, self._delimiter, positions, fields)
+        else:
+            columns = _CsvColumns(csv_file, self._delimiter, list(fields))
+        if source is not csv_file:
+            # Under lineflow.profile, the columns are counted as reads of the file.
+            columns = source.rewrap(columns)
+        return Dataset(columns)
+
+    def select(self, fields: Sequence[Union[int, str]]) -> Dataset:
+        """Keeps only the given columns, picked from each parsed row before any dict is built."""
+        return self._project(list(fields))
+
+    def drop(self, fields: Sequence[Union[int, str]]) -> Dataset:
+        """Removes the given columns, see ``select``."""
+        if self._header:
+            columns = self._fieldnames()
+        else:
+            columns = range(len(self._fieldnames()))
+            n = len(columns)
+            fields = [i % n for i in fields if -n <= i < n]
+        dropped = set(fields)
+        return self._project([c for c in columns if c not in dropped])
@@ -1,5 +1,5 @@
 from functools import wraps
-from typing import Callable, Dict, List, Tuple, Union
+from typing import Any, Callable, Dict, List, Tuple, Union
 
 
 class MapFunction:
@@ -13,17 +13,19 @@ class MapFunction:
         self._queue.append(key)
 
     def __call__(self, x: Union[Tuple, List, Dict]) -> Union[Tuple, List, Dict]:
-        for key in self._queue:
-            if isinstance(x, tuple):
-                x = list(x)
-                x[key] = self._func(x[key])
-                x = tuple(x)
-            elif isinstance(x, (dict, list)):
-                x[key] = self._func(x[key])
-            else:
-                raise TypeError('Passed argument should be tuple, list or dict',
-                                f'but {type(x)} is passed.')
-        return x
+        # The type is checked once per record, and a tuple is copied once for all the keys.
+        func = self._func
+        if isinstance(x, tuple):
+            x = list(x)
+            for key in self._queue:
+                x[key] = func(x[key])
+            return tuple(x)
+        if isinstance(x, (dict, list)):
+            for key in self._queue:
+                x[key] = func(x[key])
+            return x
+        raise TypeError('Passed argument should be tuple, list or dict',
+                        f'but {type(x)} is passed.')
 
 
 def apply(key: Union[int, str]) -> Callable[[Callable], Callable]:
@@ -50,14 +52,84 @@ def apply_all(*ignores: List[Union[int, str]]) -> Callable[[Callable], Callable]
         @wraps(func)
         def wrapper(x):
             if isinstance(x, tuple):
-                x = tuple(func(item) if i not in ignores else item for i, item in enumerate(x))
+                if ignores:
+                    x = tuple(func(item) if i not in ignores else item for i, item in enumerate(x))
+                else:
+                    x = tuple(map(func, x))
             elif isinstance(x, list):
-                x = [func(item) if i not in ignores else item for i, item in enumerate(x)]
+                if ignores:
+                    x = [func(item) if i not in ignores else item for i, item in enumerate(x)]
+                else:
+                    x = list(map(func, x))
             elif isinstance(x, dict):
-                x = {k: func(v) if k not in ignores else v for k, v in x.items()}
+                if ignores:
+                    x = {k: func(v) if k not in ignores else v for k, v in x.items()}
+                else:
+                    x = {k: func(v) for k, v in x.items()}
             else:
                 raise TypeError('Passed argument should be tuple, list or dict',
                                 f'but {type(x)} is passed.')
             return x
         return wrapper
     return decorator
+
+
+def _replace_fields(records: List[Union[Tuple, List, Dict]],
+                    keys: List[Union[int, str]],
+                    columns: List[List[Any]]) -> List[Union[Tuple, List, Dict]]:
+    if not records:
+        return records
+    if isinstance(records[0], tuple):
+        rebuilt = []
+        for x, values in zip(records, zip(*columns)):
+            x = list(x)
+            for key, value in zip(keys, values):
+                x[key] = value
+            rebuilt.append(tuple(x))
+        return rebuilt
+    if not isinstance(records[0], (dict, list)):
+        raise TypeError('Passed records should be tuples, lists or dicts',
+                        f'but {type(records[0])} is passed.')
+    for key, column in zip(keys, columns):
+        for x, value in zip(records, column):
+            x[key] = value
+    return records
+
+
+def apply_batch(*keys: List[Union[int, str]]) -> Callable[[Callable], Callable]:
+    """Applies a function to whole columns of a batch of records.
+
+    The decorated function takes the list of the values of a field and returns the list of their
+    new values, e.g. a tokenizer encoding many texts in one call. It is called once per key.
+    As with ``apply``, tuples are rebuilt while lists and dicts are updated in place.
+    """
+
+    def decorator(func: Callable[[List[Any]], List[Any]]) -> Callable[[List[Any]], List[Any]]:
+        @wraps(func)
+        def wrapper(records):
+            records = list(records)
+            columns = [func([x[key] for x in records]) for key in keys]
+            return _replace_fields(records, keys, columns)
+        return wrapper
+    return decorator
+
+
+def apply_all_batch(*ignores: List[Union[int, str]]) -> Callable[[Callable], Callable]:
+    """Batch counterpart of ``apply_all``: the function is called once per field with its column.
+
+    The fields are those of the first record.
+    """
+
+    def decorator(func: Callable[[List[Any]], List[Any]]) -> Callable[[List[Any]], List[Any]]:
+        @wraps(func)
+        def wrapper(records):
+            records = list(records)
+            if not records:
+                return records
+            first = records[0]
+            fields = first.keys() if isinstance(first, dict) else range(len(first))
+            keys = [key for key in fields if key not in ignores]
+            columns = [func([x[key] for x in records]) for key in keys]
+            return _replace_fields(records, keys, columns)
+        return wrapper
+    return decorator
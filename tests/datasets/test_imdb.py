@@ -1,3 +1,5 @@
+import os
+import pickle
 import shutil
 import tempfile
 from unittest import TestCase, mock
@@ -5,7 +7,8 @@ from unittest import TestCase, mock
 import pytest
 
 from lineflow import download
-from lineflow.datasets.imdb import Imdb, _imdb_loader, get_imdb
+from lineflow.core import MapDataset
+from lineflow.datasets.imdb import Imdb, PackedImdbFile, _imdb_loader, _pack_imdb, get_imdb, get_imdb_packed
 
 
 class ImdbTestCase(TestCase):
@@ -54,6 +57,59 @@ class ImdbTestCase(TestCase):
         test = Imdb(split='test')
         self.assertEqual(len(test), 25_000)
 
+    def test_reads_packed_file_without_loading_raw_data(self):
+        review_path = os.path.join(self.temp_dir, 'pos', '0_9.txt')
+        os.makedirs(os.path.dirname(review_path), exist_ok=True)
+        with open(review_path, 'w', encoding='utf-8') as f:
+            f.write('good movie')
+        with mock.patch('lineflow.datasets.imdb.cached_get_imdb', return_value={'train': [review_path]}):
+            packed_path = get_imdb_packed('train')
+
+        with mock.patch('lineflow.datasets.imdb.cached_get_imdb', side_effect=AssertionError):
+            self.assertEqual(get_imdb_packed('train'), packed_path)
+            data = Imdb(split='train')
+        self.assertIsInstance(data, MapDataset)
+        self.assertListEqual(data.all(), [('good movie', 0)])
+        self.assertListEqual(data.labels.tolist(), [0])
+
     def test_raises_value_error_with_invalid_split(self):
         with self.assertRaises(ValueError):
             Imdb(split='invalid_split')
+
+
+class PackedImdbFileTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.texts = {'pos': ['good movie', 'très bien'], 'neg': ['bad movie']}
+        self.paths = []
+        for label, texts in self.texts.items():
+            os.makedirs(os.path.join(self.temp_dir, label))
+            for i, text in enumerate(texts):
+                path = os.path.join(self.temp_dir, label, f'{i}_1.txt')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                self.paths.append(path)
+        self.packed_path = os.path.join(self.temp_dir, 'imdb.packed')
+        _pack_imdb(self.paths, self.packed_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_reads_packed_examples(self):
+        data = PackedImdbFile(self.packed_path)
+        expected = [('good movie', 0), ('très bien', 0), ('bad movie', 1)]
+        self.assertEqual(len(data), 3)
+        self.assertListEqual(list(data), expected)
+        self.assertListEqual(data[::-1], expected[::-1])
+        self.assertListEqual(data.labels.tolist(), [0, 0, 1])
+
+    def test_can_be_pickled(self):
+        data = pickle.loads(pickle.dumps(PackedImdbFile(self.packed_path)))
+        self.assertEqual(data[1], ('très bien', 0))
+
+    def test_raises_value_error_with_invalid_file(self):
+        with open(self.paths[0], 'wb') as f:
+            f.write(b'\0' * 32)
+        with self.assertRaises(ValueError):
+            PackedImdbFile(self.paths[0])
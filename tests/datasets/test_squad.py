@@ -1,3 +1,6 @@
+import json
+import os
+import pickle
 import shutil
 import tempfile
 from unittest import TestCase, mock
@@ -5,7 +8,7 @@ from unittest import TestCase, mock
 import pytest
 
 from lineflow import download
-from lineflow.datasets.squad import Squad, get_squad
+from lineflow.datasets.squad import Squad, SquadQuestions, cached_get_squad, get_squad
 
 
 class SquadTestCase(TestCase):
@@ -74,3 +77,52 @@ class SquadTestCase(TestCase):
     def test_raises_value_error_with_invalid_version(self):
         with self.assertRaises(ValueError):
             Squad(version=3)
+
+
+class NormalizedSquadTestCase(TestCase):
+
+    def setUp(self):
+        self.default_cache_root = download.get_cache_root()
+        self.temp_dir = tempfile.mkdtemp()
+        download.set_cache_root(os.path.join(self.temp_dir, 'cache'))
+
+        data = {'data': [
+            {'title': 'A', 'paragraphs': [
+                {'context': 'a' * 100, 'qas': [{'id': str(i), 'question': f'q{i}?', 'answers': []}
+                                               for i in range(3)]},
+                {'context': 'b' * 100, 'qas': [{'id': '3', 'question': 'q3?', 'answers': []}]}]},
+            {'title': 'B', 'paragraphs': [
+                {'context': 'c' * 100, 'qas': [{'id': '4', 'question': 'q4?', 'answers': []}]}]}]}
+        self.path = os.path.join(self.temp_dir, 'squad.json')
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        patcher = mock.patch('lineflow.datasets.squad.download.cached_download', return_value=self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cached_get_squad.cache_clear()
+        download.set_cache_root(self.default_cache_root)
+        shutil.rmtree(self.temp_dir)
+
+    def test_joins_contexts_lazily(self):
+        raw = get_squad(version=1, normalized=True)
+        self.assertListEqual(raw['dev']['contexts'], ['a' * 100, 'b' * 100, 'c' * 100])
+        self.assertListEqual(raw['dev']['titles'], ['A', 'A', 'B'])
+        self.assertListEqual([qa['context_id'] for qa in raw['dev']['qas']], [0, 0, 0, 1, 2])
+
+        expected = get_squad(version=1)['dev']
+        data = SquadQuestions(**raw['dev'])
+        self.assertEqual(len(data), len(expected))
+        self.assertListEqual(list(data), expected)
+        self.assertListEqual(list(data[3]), list(expected[3]))
+        self.assertNotIn('context', raw['dev']['qas'][0])
+
+        data = pickle.loads(pickle.dumps(data))
+        self.assertEqual(data[4]['context'], 'c' * 100)
+
+    def test_loads_normalized_split(self):
+        data = Squad(split='train', normalized=True)
+        self.assertIsInstance(data._dataset, SquadQuestions)
+        self.assertEqual(data[2]['title'], 'A')
+        self.assertEqual(data.select(['id', 'context'])[3], {'id': '3', 'context': 'b' * 100})
@@ -1,10 +1,11 @@
 import itertools
+import pickle
 from unittest import TestCase
 from unittest.mock import Mock, patch
 
 import lineflow
 from lineflow import Dataset
-from lineflow.core import ConcatDataset, DatasetMixin, IterableDataset, ZipDataset
+from lineflow.core import ConcatDataset, DatasetMixin, IterableDataset, MapDataset, WindowDataset, ZipDataset
 
 
 class DatasetMixinMixinTestCase(TestCase):
@@ -94,6 +95,49 @@ class ConcatDatasetTestCase(TestCase):
             self.data[len(self.data)]
             self.data[-1]
 
+    def test_discovers_lengths_lazily(self):
+        class Shard(Dataset):
+            def __len__(self):
+                counts.append(self)
+                return super(Shard, self).__len__()
+
+        counts = []
+        data = ConcatDataset(*[Shard(range(i * 10, i * 10 + 10)) for i in range(10)])
+        self.assertEqual(data[15], 15)
+        self.assertEqual(len(counts), 2)
+        self.assertListEqual(data.get_examples([29, 3]), [29, 3])
+        self.assertEqual(len(counts), 3)
+        self.assertEqual(len(data), 100)
+        self.assertEqual(len(counts), 10)
+        with self.assertRaises(IndexError):
+            ConcatDataset(*[Shard(range(3))] * 2)[6]
+
+    def test_uses_given_lengths(self):
+        class Shard(list):
+            def __len__(self):
+                raise AssertionError('len should not be called')
+
+        data = ConcatDataset(Shard([0, 1]), Shard([2, 3, 4]), lengths=[2, 3])
+        self.assertEqual(len(data), 5)
+        self.assertListEqual(data[:], [0, 1, 2, 3, 4])
+        with self.assertRaises(ValueError):
+            ConcatDataset([0], [1], lengths=[1])
+
+    def test_remembers_current_child(self):
+        self.assertEqual(self.data[150], 50)
+        self.assertEqual(self.data._current, 1)
+        for i in range(150, 200):
+            self.assertEqual(self.data[i], i - 100)
+        self.assertEqual(self.data[-1], 99)
+        self.assertEqual(self.data._current, 4)
+
+    def test_get_examples(self):
+        data = ConcatDataset([0, 1], [], Dataset(range(2, 5)), (5,))
+        indices = [4, 0, 5, 2, 2, 1, 3]
+        self.assertListEqual(data.get_examples(indices), indices)
+        self.assertListEqual(data.get_examples([]), [])
+        self.assertListEqual(data[::2], [0, 2, 4])
+
     def test_returns_length_lazily(self):
         self.assertIsNone(self.data._length)
         self.assertEqual(len(self.data), len(self.base) * self.n)
@@ -124,11 +168,28 @@ class ZipDatasetTestCase(TestCase):
             self.data[len(self.data)]
             self.data[-1]
 
+    def test_get_examples(self):
+        self.assertListEqual(self.data.get_examples([3, 1]), [(3,) * self.n, (1,) * self.n])
+
     def test_returns_lengths_lazily(self):
         self.assertIsNone(self.data._length)
         self.assertEqual(len(self.data), len(self.base))
         self.assertEqual(self.data._length, len(self.data))
 
+    def test_get_columns(self):
+        data = ZipDataset(self.base, [str(x) for x in self.base])
+        self.assertTupleEqual(data[5], (5, '5'))
+        self.assertTupleEqual(data.get_columns([3, 1]), ([3, 1], ['3', '1']))
+        batches = list(data.iter_columns(30))
+        self.assertListEqual([len(xs) for xs, _ in batches], [30, 30, 30, 10])
+        self.assertTupleEqual(batches[-1], (list(self.base[90:]), [str(x) for x in self.base[90:]]))
+
+    def test_checks_aligned_lengths_once(self):
+        data = lineflow.zip(self.base, list(self.base), aligned=True)
+        self.assertEqual(data._length, len(self.base))
+        with self.assertRaises(ValueError):
+            ZipDataset(self.base, range(10), aligned=True)
+
 
 class IterableDatasetTestCase(TestCase):
 
@@ -167,6 +228,36 @@ class IterableDatasetTestCase(TestCase):
         self.assertIsInstance(single_sample, int)
 
 
+class WindowDatasetTestCase(TestCase):
+
+    def test_supports_random_access_without_materializing(self):
+        for n in [0, 1, 2, 5, 10, 11]:
+            for window_size, shift in [(3, None), (3, 1), (3, 2), (4, 3), (2, 5), (20, None)]:
+                with self.subTest(n=n, window_size=window_size, shift=shift):
+                    data = Dataset(list(range(n))).window(window_size, shift)
+                    expected = lineflow.window(range(n), window_size, shift)
+                    self.assertEqual(len(data), len(expected))
+                    self.assertListEqual([data[i] for i in range(len(data))], expected)
+                    self.assertListEqual(data.get_examples(range(len(data))[::-1]), expected[::-1])
+                    self.assertFalse(data._computed)
+                    self.assertListEqual(list(data), expected)
+
+    def test_supports_slicing_and_negative_index(self):
+        data = Dataset(range(10)).map(lambda x: x * 2).window(3, 2)
+        self.assertTupleEqual(data[-1], (16, 18))
+        self.assertIsInstance(data[1:3], Dataset)
+        self.assertListEqual(data[1:3].all(), [(4, 6, 8), (8, 10, 12)])
+        with self.assertRaises(IndexError):
+            data[len(data)]
+
+    def test_materializes_over_lazy_parent(self):
+        data = Dataset(range(10)).filter(lambda x: x % 2).window(2)
+        self.assertIsInstance(data, WindowDataset)
+        self.assertEqual(len(data), 3)
+        self.assertTrue(data._computed)
+        self.assertTupleEqual(data[2], (9,))
+
+
 class DatasetTestCase(TestCase):
 
     def setUp(self):
@@ -185,6 +276,27 @@ class DatasetTestCase(TestCase):
     def test_dunder_len(self):
         self.assertEqual(len(self.data), len(self.base))
 
+    def test_get_examples(self):
+        data = self.data.map(lambda x: x + 1).map(str)
+        self.assertListEqual(data.get_examples([5, 0, 5]), ['6', '1', '6'])
+        self.assertListEqual(Dataset([1, 2]).get_examples([1]), [2])
+
+    def test_slices_a_subclass_overriding_get_example(self):
+        class UpperDataset(Dataset):
+            def get_example(self, i):
+                return super(UpperDataset, self).get_example(i).upper()
+
+        data = UpperDataset(['a', 'b', 'c'])
+        self.assertListEqual(data[0:2], ['A', 'B'])
+        self.assertListEqual(data.__getitems__([2, 0]), ['C', 'A'])
+
+    def test_dunder_getitems(self):
+        self.assertListEqual(self.data.__getitems__([-1, 0, 10]), [99, 0, 10])
+        self.assertListEqual(self.data.__getitems__([]), [])
+        for indices in ([0, 100], [-101]):
+            with self.subTest(indices=indices), self.assertRaises(IndexError):
+                self.data.__getitems__(indices)
+
     def test_dunder_add(self):
         data = self.data + self.data + self.data
         expected = list(self.base) * 3
@@ -230,6 +342,91 @@ class DatasetTestCase(TestCase):
         self.assertSequenceEqual(
             data, [x + 100 for x in self.base])
 
+    def test_fuses_consecutive_maps(self):
+        def f(x): return x + 1
+
+        def g(x): return x * 2
+
+        data = self.data.map(f).map(g).map(f)
+        self.assertIs(data._source, self.data)
+        self.assertTupleEqual(data._map_funcs, (f, g, f))
+        self.assertEqual(data[10], (10 + 1) * 2 + 1)
+        self.assertListEqual(data.all(), [(x + 1) * 2 + 1 for x in self.base])
+
+        filtered = data.filter(lambda x: x % 3 == 0).map(g)
+        self.assertIs(filtered._source, filtered._dataset)
+
+    def test_pickles_fused_maps(self):
+        data = pickle.loads(pickle.dumps(self.data.map(str).map(len).map(abs)))
+        self.assertEqual(data[10], 2)
+        self.assertListEqual(data.all(), [len(str(x)) for x in self.base])
+
+    def test_filter_independent_of_maps_runs_before_them(self):
+        calls = []
+
+        @lineflow.apply('text')
+        def f(x):
+            calls.append(x)
+            return x.upper()
+
+        data = Dataset([{'id': i, 'text': str(i)} for i in self.base])
+        data = data.map(f).filter(lambda x: x['id'] % 10 == 0, independent=True)
+        self.assertIsInstance(data, MapDataset)
+        self.assertListEqual(data.all(), [{'id': i, 'text': str(i)} for i in range(0, 100, 10)])
+        self.assertEqual(len(calls), 10)
+
+    def test_filter_independent_of_maps_over_a_plain_source(self):
+        calls = []
+
+        def f(x):
+            calls.append(x)
+            return x * 2
+
+        data = MapDataset(list(self.base), f).filter(lambda x: x % 10 == 0, independent=True)
+        self.assertIsInstance(data, MapDataset)
+        self.assertListEqual(data.all(), [i * 2 for i in range(0, 100, 10)])
+        self.assertEqual(len(calls), 10)
+
+    def test_select_and_drop(self):
+        records = Dataset([{'a': i, 'b': str(i), 'c': [i]} for i in range(3)])
+        self.assertListEqual(records.select(['c', 'a']).all(), [{'c': [i], 'a': i} for i in range(3)])
+        self.assertListEqual(records.drop(['c']).all(), [{'a': i, 'b': str(i)} for i in range(3)])
+        with self.assertRaises(KeyError):
+            records.select(['d']).first()
+
+        pairs = Dataset([(i, str(i), [i]) for i in range(3)])
+        self.assertListEqual(pairs.select([2, 0]).all(), [([i], i) for i in range(3)])
+        self.assertListEqual(pairs.drop([-1]).all(), [(i, str(i)) for i in range(3)])
+        self.assertListEqual(Dataset([[0, 1]]).select([1]).all(), [[1]])
+        self.assertEqual(pairs.select([0]).explain().splitlines()[0], 'MapDataset(select([0]))')
+
+    def test_explain(self):
+        data = self.data.map(str).map(len).filter(bool).map(abs)
+        self.assertEqual(
+            data.explain(),
+            'MapDataset(abs)\n'
+            '  FilterDataset(bool)\n'
+            '    MapDataset(str, len)\n'
+            '      Dataset(range)')
+
+    def test_checks_bounds_only_at_outer_dataset(self):
+        class CountingDataset(Dataset):
+            checks = 0
+
+            def __getitem__(self, index):
+                CountingDataset.checks += 1
+                return super(CountingDataset, self).__getitem__(index)
+
+        inner = CountingDataset(self.base)
+        data = lineflow.zip(inner.map(str), inner + inner)
+        self.assertTupleEqual(data[-1], ('99', 99))
+        self.assertListEqual(data[:2], [('0', 0), ('1', 1)])
+        self.assertEqual(CountingDataset.checks, 0)
+        with self.assertRaises(IndexError):
+            data[len(data)]
+        with self.assertRaises(IndexError):
+            data[-len(data) - 1]
+
     def test_all(self):
         self.assertListEqual(self.data.all(), list(self.base))
 
@@ -349,6 +546,70 @@ class DatasetTestCase(TestCase):
         self.assertIsInstance(data, lineflow.core.CacheDataset)
 
 
+class ResumableIteratorTestCase(TestCase):
+
+    def setUp(self):
+        self.data = Dataset(list(range(20)))
+
+    def assertResumes(self, data):
+        # Only iter_from is used, since len would evaluate the lazy stages.
+        lazy = isinstance(data, IterableDataset) and not data._computed
+        expected = list(data.iter_from())
+        it = data.iter_from()
+        for k in range(len(expected) + 1):
+            state = pickle.loads(pickle.dumps(it.state_dict()))
+            self.assertListEqual(list(data.iter_from(state)), expected[k:])
+            next(it, None)
+        if lazy:
+            self.assertFalse(data._computed)
+
+    def test_resumes_random_access_datasets(self):
+        self.assertResumes(self.data)
+        self.assertResumes(self.data.map(lambda x: x * 2))
+        self.assertResumes(self.data + self.data)
+        self.assertResumes(lineflow.zip(self.data, self.data))
+
+    def test_resumes_lazy_stages(self):
+        self.assertResumes(self.data.filter(lambda x: x % 3))
+        self.assertResumes(self.data.flat_map(lambda x: ([x] * (x % 3))))
+        self.assertResumes(self.data.flat_map(lambda x: (y for y in range(x % 4))))
+        for window_size, shift in [(3, None), (3, 1), (3, 2), (4, 3), (2, 5), (30, None)]:
+            self.assertResumes(self.data.window(window_size, shift))
+        self.assertResumes(Dataset([]).window(3))
+
+    def test_resumes_pipelines_of_lazy_stages(self):
+        self.assertResumes(self.data.filter(lambda x: x % 3).map(str).window(2))
+        self.assertResumes(self.data.filter(lambda x: x % 2) + self.data)
+        self.assertResumes(lineflow.zip(self.data.filter(lambda x: x % 2), self.data.window(2, 1)))
+        self.assertResumes(IterableDataset(iter(range(10))))
+
+    def test_resumes_lazy_zips_to_the_end(self):
+        data = lineflow.zip(self.data.filter(lambda x: x % 2), self.data)
+        self.assertListEqual(list(data.iter_from()), [(x, i) for i, x in enumerate(range(1, 20, 2))])
+
+    def test_resumes_without_replaying(self):
+        seen = []
+
+        def predicate(x):
+            seen.append(x)
+            return x % 2
+
+        data = self.data.filter(predicate)
+        it = data.iter_from()
+        for _ in range(5):
+            next(it)
+        state = it.state_dict()
+        del seen[:]
+        self.assertEqual(next(data.iter_from(state)), 11)
+        self.assertListEqual(seen, [10, 11])
+
+    def test_resumes_computed_lazy_stages_by_index(self):
+        data = self.data.filter(lambda x: x % 2)
+        data[0]
+        self.assertTrue(data._computed)
+        self.assertResumes(data)
+
+
 class LineflowConcatTestCase(TestCase):
 
     def setUp(self):
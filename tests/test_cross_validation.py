@@ -35,6 +35,12 @@ class TestSubDataset(unittest.TestCase):
         self.assertEqual(subset[1], 4)
         self.assertEqual(subset[2], 2)
 
+    def test_get_examples(self):
+        original = [1, 2, 3, 4, 5]
+        subset = SubDataset(original, 1, 4, [2, 0, 3, 1, 4])
+        self.assertListEqual(subset.get_examples([2, 0, 0]), [2, 1, 1])
+        self.assertListEqual(subset[::-1], [2, 4, 1])
+
     def test_permuted_sub_dataset_len_mismatch(self):
         original = [1, 2, 3, 4, 5]
         with self.assertRaises(ValueError):
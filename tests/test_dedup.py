@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from lineflow import Dataset, download
+from lineflow.dedup import DedupDataset, MinHash
+
+
+class MinHashTestCase(TestCase):
+
+    def test_estimates_similarity(self):
+        minhash = MinHash(num_perm=128, ngram=1)
+        a = minhash.signature(' '.join(map(str, range(100))))
+        b = minhash.signature(' '.join(map(str, range(10, 110))))
+        c = minhash.signature(' '.join(map(str, range(1000, 1100))))
+        # The Jaccard similarity of a and b is 90 / 110.
+        self.assertAlmostEqual(sum(x == y for x, y in zip(a, b)) / 128, 90 / 110, delta=0.15)
+        self.assertLess(sum(x == y for x, y in zip(a, c)) / 128, 0.1)
+        self.assertEqual(minhash.signature('0 1 2'), MinHash(num_perm=128, ngram=1).signature('2 1 0'))
+
+
+class DedupDatasetTestCase(TestCase):
+
+    def setUp(self):
+        self.default_cache_root = download.get_cache_root()
+        self.temp_dir = tempfile.mkdtemp()
+        download.set_cache_root(self.temp_dir)
+        self.examples = [str(i % 37) for i in range(200)]
+
+    def tearDown(self):
+        download.set_cache_root(self.default_cache_root)
+        shutil.rmtree(self.temp_dir)
+
+    def test_removes_exact_duplicates(self):
+        data = Dataset(self.examples).dedup()
+        self.assertIsInstance(data, DedupDataset)
+        self.assertIsNone(data.removed)
+        self.assertListEqual(list(data), [str(i) for i in range(37)])
+        self.assertEqual(data.removed, 163)
+
+    def test_removes_exact_duplicates_by_key(self):
+        data = Dataset([{'id': i % 3, 'text': i} for i in range(10)]).dedup(key=lambda x: x['id'])
+        self.assertListEqual([x['text'] for x in data], [0, 1, 2])
+
+    def test_removes_exact_duplicates_with_partitions(self):
+        data = Dataset(self.examples).dedup(num_partitions=4)
+        self.assertListEqual(list(data), [str(i) for i in range(37)])
+        self.assertEqual(data.removed, 163)
+        self.assertListEqual(os.listdir(os.path.join(self.temp_dir, 'tmp')), [])
+
+    def test_removes_near_duplicates(self):
+        words = [f'word{i}' for i in range(60)]
+        texts = [' '.join(words),
+                 ' '.join(words[:-1] + ['other']),
+                 ' '.join(reversed(words)),
+                 ' '.join(words)]
+        data = Dataset(texts).dedup(mode='minhash')
+        self.assertListEqual(list(data), [texts[0], texts[2]])
+        self.assertEqual(data.removed, 2)
+
+        # With unigrams, a reordered text has the same shingles.
+        data = Dataset(texts).dedup(mode='minhash', ngram=1)
+        self.assertListEqual(list(data), [texts[0]])
+
+    def test_rejects_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Dataset(self.examples).dedup(mode='fuzzy')
+        with self.assertRaises(ValueError):
+            Dataset(self.examples).dedup(mode='minhash', bands=7)
+        with self.assertRaises(ValueError):
+            Dataset(self.examples).dedup(mode='minhash', num_partitions=2)
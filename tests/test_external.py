@@ -0,0 +1,154 @@
+import gc
+import os
+import pickle
+import shutil
+import tempfile
+from operator import itemgetter
+from random import Random
+from unittest import TestCase, mock
+
+from lineflow import Dataset, download, external
+from lineflow.core import CacheDataset
+from lineflow.external import GroupByDataset, JoinDataset
+
+
+class ExternalTestCase(TestCase):
+
+    def setUp(self):
+        self.default_cache_root = download.get_cache_root()
+        self.temp_dir = tempfile.mkdtemp()
+        download.set_cache_root(self.temp_dir)
+
+    def tearDown(self):
+        download.set_cache_root(self.default_cache_root)
+        shutil.rmtree(self.temp_dir)
+
+    def assertSpillsCleanedUp(self):
+        self.assertListEqual(os.listdir(os.path.join(self.temp_dir, 'tmp')), [])
+
+
+class JoinDatasetTestCase(ExternalTestCase):
+
+    def setUp(self):
+        super(JoinDatasetTestCase, self).setUp()
+        self.left = Dataset([{'id': i, 'prediction': i * 10} for i in range(50)])
+        self.right = Dataset([{'qid': i, 'answer': i} for i in range(25, 75)] + [{'qid': 30, 'answer': -1}])
+
+    def expected(self, how):
+        pairs = []
+        for x in self.left:
+            ys = [y for y in self.right if y['qid'] == x['id']]
+            if ys:
+                pairs.extend((x, y) for y in ys)
+            elif how in ('left', 'outer'):
+                pairs.append((x, None))
+        if how in ('right', 'outer'):
+            ids = {x['id'] for x in self.left}
+            pairs.extend((None, y) for y in self.right if y['qid'] not in ids)
+        return pairs
+
+    def test_joins_in_memory(self):
+        for how in ('inner', 'left', 'right', 'outer'):
+            with self.subTest(how=how):
+                data = self.left.join(self.right, lambda x: x['id'], lambda y: y['qid'], how=how)
+                self.assertIsInstance(data, JoinDataset)
+                self.assertListEqual(list(iter(data)), self.expected(how))
+                self.assertFalse(data._computed)
+
+    def test_joins_with_spill(self):
+        for how in ('inner', 'left', 'right', 'outer'):
+            with self.subTest(how=how):
+                data = self.left.join(self.right, lambda x: x['id'], lambda y: y['qid'], how=how,
+                                      memory_limit=3)
+                key = repr
+                self.assertListEqual(sorted(data, key=key), sorted(self.expected(how), key=key))
+                self.assertEqual(len(data), len(self.expected(how)))
+                self.assertSpillsCleanedUp()
+
+    def test_joins_skewed_keys_without_partitioning_them_again(self):
+        left = Dataset([{'id': i % 3, 'l': i} for i in range(12)])
+        right = Dataset([{'qid': 0, 'r': i} for i in range(40)] + [{'qid': 1, 'r': 40}, {'qid': 5, 'r': 41}])
+        for how in ('inner', 'left', 'right', 'outer'):
+            with self.subTest(how=how):
+                self.left, self.right = left, right
+                with mock.patch('lineflow.external._Partitions', wraps=external._Partitions) as partitions:
+                    data = list(left.join(right, lambda x: x['id'], lambda y: y['qid'], how=how,
+                                          memory_limit=7))
+                # The partition of the hot key is joined from disk block by block.
+                self.assertLessEqual(partitions.call_count, 2)
+                self.assertListEqual(sorted(data, key=repr), sorted(self.expected(how), key=repr))
+                self.assertSpillsCleanedUp()
+
+    def test_iterates_again(self):
+        data = self.left.join(self.right, lambda x: x['id'], lambda y: y['qid'], memory_limit=3)
+        self.assertListEqual(list(data), list(data))
+
+    def test_rejects_unknown_join_types(self):
+        with self.assertRaises(ValueError):
+            self.left.join(self.right, lambda x: x['id'], how='cross')
+
+
+class GroupByDatasetTestCase(ExternalTestCase):
+
+    def test_groups_in_memory(self):
+        data = Dataset(list(range(20))).group_by(lambda x: x % 3)
+        self.assertIsInstance(data, GroupByDataset)
+        self.assertListEqual(list(data), [(k, list(range(k, 20, 3))) for k in range(3)])
+
+    def test_groups_with_spill(self):
+        data = Dataset(list(range(200))).group_by(lambda x: x % 7, memory_limit=10)
+        self.assertListEqual(sorted(data), [(k, list(range(k, 200, 7))) for k in range(7)])
+        self.assertSpillsCleanedUp()
+
+    def test_keeps_a_skewed_group_together(self):
+        data = Dataset(list(range(100))).group_by(lambda x: 0, memory_limit=10)
+        with mock.patch('lineflow.external._Partitions', wraps=external._Partitions) as partitions:
+            self.assertListEqual(list(data), [(0, list(range(100)))])
+        partitions.assert_called_once()
+
+    def test_chains(self):
+        data = Dataset(list(range(10))).group_by(lambda x: x % 2).map(lambda g: (g[0], sum(g[1])))
+        self.assertListEqual(list(data), [(0, 20), (1, 25)])
+        self.assertIn('GroupByDataset', data.explain())
+
+
+class SortDatasetTestCase(ExternalTestCase):
+
+    def setUp(self):
+        super(SortDatasetTestCase, self).setUp()
+        random = Random(0)
+        self.examples = [(random.randrange(20), i) for i in range(100)]
+
+    def test_sorts_in_memory(self):
+        data = Dataset(self.examples).sort_by(itemgetter(0))
+        self.assertIsInstance(data, CacheDataset)
+        self.assertListEqual(list(data), sorted(self.examples, key=itemgetter(0)))
+
+    def test_sorts_with_runs_on_disk(self):
+        for reverse in (False, True):
+            with self.subTest(reverse=reverse):
+                data = Dataset(self.examples).sort_by(itemgetter(0), memory_limit=7, reverse=reverse)
+                # The sort is stable.
+                self.assertListEqual(list(data), sorted(self.examples, key=itemgetter(0), reverse=reverse))
+                self.assertEqual(data[50], sorted(self.examples, key=itemgetter(0), reverse=reverse)[50])
+        with self.assertRaises(TypeError):
+            pickle.dumps(data)
+        store_dirs = os.listdir(os.path.join(self.temp_dir, 'tmp'))
+        del data
+        gc.collect()
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir, 'tmp'))), len(store_dirs) - 1)
+
+    def test_sorts_exact_multiples_of_the_limit(self):
+        data = Dataset(self.examples).sort_by(itemgetter(0), memory_limit=10)
+        self.assertListEqual(list(data), sorted(self.examples, key=itemgetter(0)))
+
+    def test_caches_at_path(self):
+        path = os.path.join(self.temp_dir, 'sorted')
+        data = Dataset(self.examples).sort_by(itemgetter(0), memory_limit=30, path=path)
+        self.assertListEqual(list(data), sorted(self.examples, key=itemgetter(0)))
+
+        with mock.patch('lineflow.external._merge_sort') as merge_sort:
+            data = Dataset(self.examples).sort_by(itemgetter(0), path=path)
+        merge_sort.assert_not_called()
+        self.assertListEqual(list(data), sorted(self.examples, key=itemgetter(0)))
+        self.assertListEqual(list(pickle.loads(pickle.dumps(data))), list(data))
@@ -0,0 +1,129 @@
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from lineflow import Dataset, TextDataset
+from lineflow.hashing import HashTable, KeyIndexedDataset, key_hash
+
+
+class HashTableTestCase(TestCase):
+
+    def test_inserts_and_finds(self):
+        table = HashTable()
+        for i in range(100):
+            table.insert(key_hash(i), i)
+        table.insert(key_hash(5), 500)
+        self.assertEqual(len(table), 101)
+        self.assertGreaterEqual(table._capacity, 202)
+        self.assertListEqual(list(table.find(key_hash(5))), [5, 500])
+        self.assertListEqual(list(table.find(key_hash(100))), [])
+        self.assertIn(key_hash(99), table)
+
+    def test_add(self):
+        table = HashTable()
+        self.assertTrue(table.add(1))
+        self.assertFalse(table.add(1))
+        self.assertTrue(table.add(-1))
+        self.assertEqual(len(table), 2)
+
+    def test_collisions(self):
+        table = HashTable(8)
+        # Same slot, different hashes.
+        table.insert(1, 10)
+        table.insert(9, 90)
+        self.assertListEqual(list(table.find(9)), [90])
+        self.assertListEqual(list(table.find(17)), [])
+
+    def test_key_hash_is_stable(self):
+        self.assertEqual(key_hash('id'), key_hash('id'))
+        self.assertNotEqual(key_hash('1'), key_hash(1))
+        self.assertNotEqual(key_hash(b'1'), key_hash('1'))
+
+    def test_key_hash_of_equal_numbers(self):
+        self.assertEqual(key_hash(1), key_hash(1.0))
+        self.assertEqual(key_hash(1), key_hash(True))
+        self.assertEqual(key_hash((0, 'a')), key_hash((0.0, 'a')))
+        self.assertNotEqual(key_hash(1), key_hash(1.5))
+        self.assertNotEqual(key_hash((1, 2)), key_hash((12,)))
+
+
+class KeyIndexedDatasetTestCase(TestCase):
+
+    def setUp(self):
+        self.records = [{'id': f'q{i}', 'text': str(i)} for i in range(50)]
+        self.data = Dataset(self.records)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_lookup(self):
+        data = self.data.index_by(lambda x: x['id'])
+        self.assertIsInstance(data, KeyIndexedDataset)
+        self.assertEqual(data.lookup('q7'), self.records[7])
+        self.assertEqual(data.position('q49'), 49)
+        self.assertListEqual(data.lookup_many(['q3', 'q1']), [self.records[3], self.records[1]])
+        with self.assertRaises(KeyError):
+            data.lookup('q50')
+        self.assertEqual(data[3], self.records[3])
+
+    def test_looks_up_equal_numbers(self):
+        data = Dataset([{'id': i} for i in range(10)]).index_by(lambda x: x['id'])
+        self.assertEqual(data.position(3.0), 3)
+        self.assertEqual(data.position(True), 1)
+
+    def test_returns_first_of_duplicated_keys(self):
+        data = Dataset(['a', 'b', 'a']).index_by(str.upper)
+        self.assertEqual(data.position('A'), 0)
+
+    def test_verifies_keys_on_hash_collision(self):
+        with mock.patch('lineflow.hashing.key_hash', return_value=0):
+            data = self.data.index_by(lambda x: x['id'])
+            self.assertEqual(data.lookup('q30'), self.records[30])
+            with self.assertRaises(KeyError):
+                data.lookup('q50')
+
+    def test_persists_index(self):
+        path = os.path.join(self.temp_dir, 'id.index')
+        self.data.index_by(lambda x: x['id'], path)
+        self.assertTrue(os.path.exists(path))
+
+        with mock.patch('lineflow.hashing.HashTable.insert') as insert_mock:
+            data = self.data.index_by(lambda x: x['id'], path)
+        insert_mock.assert_not_called()
+        self.assertIsInstance(data._table._slots, memoryview)
+        self.assertEqual(data.lookup('q11'), self.records[11])
+
+        with mock.patch('builtins.print'):
+            data = Dataset(self.records[:10]).index_by(lambda x: x['id'], path)
+        with self.assertRaises(KeyError):
+            data.lookup('q11')
+
+    def test_rebuilds_index_of_changed_data(self):
+        path = os.path.join(self.temp_dir, 'id.index')
+        self.data.index_by(lambda x: x['id'], path)
+        records = [{'id': f'r{i}', 'text': str(i)} for i in range(50)]
+        with mock.patch('builtins.print'):
+            data = Dataset(records).index_by(lambda x: x['id'], path)
+        self.assertEqual(data.lookup('r11'), records[11])
+
+        text_path = os.path.join(self.temp_dir, 'ids.txt')
+        # The same size and a lazy filter: only the modification time tells the files apart.
+        for mtime, ids in ((1, 'a\nb\n'), (2, 'b\na\n')):
+            with open(text_path, 'w') as f:
+                f.write(ids)
+            os.utime(text_path, (mtime, mtime))
+            with mock.patch('builtins.print'):
+                data = TextDataset(text_path).map(str.strip).filter(bool).index_by(str, path)
+            self.assertEqual(data.position('a'), ids.split().index('a'))
+
+    def test_pickles_tables(self):
+        path = os.path.join(self.temp_dir, 'table')
+        table = HashTable()
+        table.insert(key_hash('a'), 1)
+        table.save(path)
+        for table in (table, HashTable.load(path)):
+            table = pickle.loads(pickle.dumps(table))
+            self.assertListEqual(list(table.find(key_hash('a'))), [1])
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+import lineflow.datasets
+
+
+def _imported_modules(statement):
+    code = f'import sys\n{statement}\nprint(" ".join(sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE)
+    return set(output.stdout.decode('utf-8').split())
+
+
+class LazyImportTestCase(TestCase):
+
+    def test_does_not_import_heavy_dependencies(self):
+        modules = _imported_modules('import lineflow, lineflow.datasets')
+        for name in ('gdown', 'requests', 'bs4', 'arrayfiles', 'lineflow.datasets.imdb'):
+            with self.subTest(name=name):
+                self.assertNotIn(name, modules)
+
+    def test_imports_dataset_module_on_access(self):
+        modules = _imported_modules('import lineflow.datasets; lineflow.datasets.Squad')
+        self.assertIn('lineflow.datasets.squad', modules)
+        self.assertNotIn('lineflow.datasets.imdb', modules)
+        self.assertNotIn('gdown', modules)
+
+    def test_resolves_all_attributes(self):
+        for name in lineflow.datasets.__all__:
+            with self.subTest(name=name):
+                self.assertIn(name, dir(lineflow.datasets))
+                self.assertTrue(callable(getattr(lineflow.datasets, name)))
+
+    def test_raises_attribute_error_with_unknown_name(self):
+        with self.assertRaises(AttributeError):
+            lineflow.datasets.UnknownDataset
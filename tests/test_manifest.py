@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from lineflow import TextDataset
+from lineflow.manifest import Manifest, build_manifest, main
+
+
+class ManifestTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.contents = [b'a\nb\n', b'', b'c\nd\ne', 'ｆ\n'.encode('utf-8')]
+        self.paths = []
+        for i, content in enumerate(self.contents):
+            path = os.path.join(self.temp_dir, 'shards', f'{i}.txt')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.paths.append(path)
+        self.manifest_path = os.path.join(self.temp_dir, 'corpus.manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_builds_manifest(self):
+        manifest = build_manifest(self.paths, self.manifest_path)
+        self.assertListEqual(manifest.lengths, [2, 0, 3, 1])
+        self.assertEqual(len(manifest), 6)
+        self.assertEqual(manifest.shards[3]['bytes'], 4)
+        self.assertEqual(manifest.shards[0]['sha256'], hashlib.sha256(self.contents[0]).hexdigest())
+
+        with open(self.manifest_path) as f:
+            data = json.load(f)
+        self.assertEqual(data['shards'][0]['path'], os.path.join('shards', '0.txt'))
+
+        loaded = Manifest.load(self.manifest_path)
+        self.assertListEqual(loaded.paths, self.paths)
+        self.assertListEqual(loaded.lengths, manifest.lengths)
+
+    def test_locate(self):
+        manifest = Manifest.build(self.paths, checksum=False)
+        self.assertNotIn('sha256', manifest.shards[0])
+        self.assertTupleEqual(manifest.locate(0), (0, 0))
+        self.assertTupleEqual(manifest.locate(2), (2, 0))
+        self.assertTupleEqual(manifest.locate(5), (3, 0))
+        with self.assertRaises(IndexError):
+            manifest.locate(6)
+
+    def test_verify(self):
+        manifest = Manifest.build(self.paths)
+        manifest.verify(0, checksum=True)
+        with open(self.paths[0], 'wb') as f:
+            f.write(b'x\ny\n')
+        manifest.verify(0)
+        with self.assertRaises(ValueError):
+            manifest.verify(0, checksum=True)
+        with open(self.paths[0], 'wb') as f:
+            f.write(b'x\n')
+        with self.assertRaises(ValueError):
+            manifest.verify(0)
+
+    def test_raises_value_error_with_unsupported_version(self):
+        with open(self.manifest_path, 'w') as f:
+            json.dump({'version': 0, 'shards': []}, f)
+        with self.assertRaises(ValueError):
+            Manifest.load(self.manifest_path)
+
+    def test_main(self):
+        with mock.patch('builtins.print'):
+            main(['-o', self.manifest_path, '--no-checksum'] + self.paths)
+        self.assertListEqual(Manifest.load(self.manifest_path).lengths, [2, 0, 3, 1])
+
+    def test_text_dataset_from_manifest(self):
+        build_manifest(self.paths, self.manifest_path)
+        data = TextDataset.from_manifest(self.manifest_path)
+        shards = data._dataset._datasets
+        self.assertEqual(len(data), 6)
+        self.assertEqual(data[4], 'e')
+        self.assertTrue(all(shard._file is None for i, shard in enumerate(shards) if i != 2))
+        self.assertListEqual(data.all(), ['a', 'b', 'c', 'd', 'e', 'ｆ'])
+        self.assertListEqual(data.get_examples([5, 0, 1]), ['ｆ', 'a', 'b'])
+        self.assertListEqual(data.map(str.upper).take(3), ['A', 'B', 'C'])
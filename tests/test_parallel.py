@@ -0,0 +1,65 @@
+import io
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import lineflow
+from lineflow import Dataset
+from lineflow.parallel import evaluate
+
+
+class EvaluateTestCase(TestCase):
+
+    def setUp(self):
+        self.base = list(range(100))
+        self.data = Dataset(self.base)
+        self.temp_dir = tempfile.mkdtemp()
+        patcher = patch('builtins.print')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_evaluates_random_access_pipelines(self):
+        data = (self.data + self.data).map(lambda x: x * 2)
+        self.assertListEqual(evaluate(data, 3, chunk_size=7), data.all())
+
+    def test_evaluates_filter_and_flat_map_by_chunks(self):
+        data = self.data.filter(lambda x: x % 3 == 0)
+        self.assertListEqual(evaluate(data, 2, chunk_size=9), [x for x in self.base if x % 3 == 0])
+        data = self.data.flat_map(lambda x: [x] * (x % 3))
+        self.assertListEqual(evaluate(data, 2, chunk_size=9), [x for x in self.base for _ in range(x % 3)])
+
+    def test_evaluates_sequential_pipelines_in_process(self):
+        data = self.data.filter(bool).map(str)
+        with patch('lineflow.parallel.multiprocessing') as multiprocessing_mock:
+            self.assertListEqual(evaluate(data, 2), [str(x) for x in self.base if x])
+        multiprocessing_mock.get_context.assert_not_called()
+
+    def test_reuses_evaluated_chunks(self):
+        partial_dir = os.path.join(self.temp_dir, 'partial')
+        os.makedirs(partial_dir)
+        with io.open(os.path.join(partial_dir, f'{0:012d}-{50:012d}.pkl'), 'wb') as f:
+            pickle.dump(['done'] * 50, f)
+
+        examples = evaluate(self.data.map(lambda x: -x), 2, chunk_size=50, partial_dir=partial_dir)
+        self.assertListEqual(examples, ['done'] * 50 + [-x for x in self.base[50:]])
+        self.assertEqual(len(os.listdir(partial_dir)), 2)
+
+    def test_raises_value_error_with_invalid_num_workers(self):
+        with self.assertRaises(ValueError):
+            evaluate(self.data, 0)
+
+    def test_all_and_save(self):
+        data = self.data.map(lambda x: x + 1)
+        self.assertListEqual(data.all(num_workers=2), [x + 1 for x in self.base])
+
+        filename = os.path.join(self.temp_dir, 'cache.pkl')
+        cache = data.save(filename, num_workers=2)
+        self.assertListEqual(cache.all(), [x + 1 for x in self.base])
+        self.assertListEqual(lineflow.load(filename).all(), [x + 1 for x in self.base])
+        self.assertFalse(os.path.exists(f'{filename}.partial'))
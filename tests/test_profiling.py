@@ -0,0 +1,144 @@
+import pickle
+import tempfile
+from unittest import TestCase
+
+import lineflow
+from lineflow import CsvDataset, Dataset, TextDataset, profiling
+from lineflow.core import MapDataset
+
+
+def is_even(x):
+    return x % 2 == 0
+
+
+def twice(x):
+    return [x, x]
+
+
+class ProfileTestCase(TestCase):
+
+    def setUp(self):
+        self.base = list(range(100))
+
+    def test_records_each_stage(self):
+        with lineflow.profile() as profiler:
+            data = Dataset(self.base) \
+                .map(lambda x: x + 1) \
+                .filter(lambda x: x % 2 == 0) \
+                .flat_map(lambda x: [x, x]) \
+                .window(2)
+        self.assertListEqual(data.all(), [(x, x) for x in range(2, 101, 2)])
+
+        stats = data.stats()
+        self.assertListEqual([s.name.split('(')[0] for s in stats],
+                             ['source', 'map', 'filter', 'flat_map', 'window'])
+        self.assertListEqual(stats, profiler.stages)
+
+        source, map_, filter_, flat_map, window = stats
+        self.assertEqual(source.items_out, 100)
+        self.assertEqual((map_.calls, map_.items_in, map_.items_out), (100, 100, 100))
+        self.assertEqual((filter_.items_in, filter_.items_out), (100, 50))
+        self.assertEqual(filter_.selectivity, .5)
+        self.assertEqual((flat_map.items_in, flat_map.items_out), (50, 100))
+        self.assertEqual((window.items_in, window.items_out), (100, 50))
+        self.assertGreater(map_.time, 0)
+        self.assertIn('filter', profiler.report())
+
+    def test_counts_random_access(self):
+        with lineflow.profile():
+            data = Dataset(self.base).map(str)
+        data[10]
+        data[:5]
+        source, map_ = data.stats()
+        self.assertEqual(source.calls, 6)
+        self.assertEqual(source.bytes_read, 0)
+        self.assertEqual(map_.calls, 6)
+
+    def test_records_bytes_read_from_text(self):
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8') as fp:
+            fp.write('abc\nあい\n')
+            fp.flush()
+            with lineflow.profile():
+                data = TextDataset(fp.name)
+            self.assertListEqual(data.all(), ['abc', 'あい'])
+        source, = data.stats()
+        self.assertEqual(source.name, 'source(TextFile)')
+        self.assertEqual(source.bytes_read, 9)
+
+    def test_records_sources_of_concat_and_zip(self):
+        with lineflow.profile():
+            data = lineflow.zip(self.base, Dataset(self.base) + self.base)
+        data.all()
+        names = [s.name for s in data.stats()]
+        self.assertListEqual(names, ['source(list)'] * 3)
+
+    def test_pickles_profiled_pipelines(self):
+        with lineflow.profile():
+            data = Dataset(self.base).map(str).map(int)
+            filtered = data.filter(is_even).flat_map(twice)
+        data = pickle.loads(pickle.dumps(data))
+        self.assertListEqual(data.all(), self.base)
+        self.assertListEqual([s.calls for s in data.stats()], [100, 100, 100])
+
+        predicate = pickle.loads(pickle.dumps(filtered._parent._predicate))
+        self.assertIs(profiling.unwrap(predicate), is_even)
+        self.assertTrue(predicate(2))
+        self.assertEqual((predicate.stats.calls, predicate.stats.items_out), (1, 1))
+        self.assertListEqual(pickle.loads(pickle.dumps(filtered._map_func))(1), [1, 1])
+
+    def test_pushes_down_independent_filters(self):
+        with lineflow.profile() as profiler:
+            data = Dataset(self.base).map(str).filter(lambda x: int(x) % 10 == 0, independent=True)
+        self.assertIsInstance(data, MapDataset)
+        self.assertListEqual(data.all(), [str(x) for x in range(0, 100, 10)])
+        self.assertCountEqual(data.stats(), profiler.stages)
+        source, filter_, map_ = data.stats()
+        self.assertEqual((source.items_out, filter_.items_out, map_.calls), (100, 10, 10))
+
+        with lineflow.profile() as profiler:
+            data = MapDataset(self.base, str).filter(lambda x: x % 10 == 0, independent=True)
+        self.assertListEqual(data.all(), [str(x) for x in range(0, 100, 10)])
+        self.assertListEqual([s.name.split('(')[0] for s in data.stats()], ['source', 'filter', 'map'])
+
+    def test_pushes_down_csv_projections(self):
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8') as fp:
+            fp.write('a,b\n1,2\n3,4\n')
+            fp.flush()
+            with lineflow.profile():
+                data = CsvDataset(fp.name, header=True).select(['b'])
+            self.assertNotIsInstance(data, MapDataset)
+            self.assertListEqual(data.all(), [{'b': '2'}, {'b': '4'}])
+        source, = data.stats()
+        self.assertEqual(source.name, 'source(CsvFile)')
+        self.assertEqual(source.items_out, 2)
+
+    def test_samples_timing(self):
+        with lineflow.profile(sample_rate=.1):
+            data = Dataset(self.base).map(str)
+        data.all()
+        _, map_ = data.stats()
+        self.assertEqual(map_.calls, 100)
+        self.assertEqual(map_.sampled, 10)
+
+    def test_does_not_instrument_outside_block(self):
+        def f(x): return x
+
+        data = Dataset(self.base).map(f)
+        self.assertIs(data._map_func, f)
+        self.assertIs(data._dataset._dataset, self.base)
+        self.assertListEqual(data.stats(), [])
+        self.assertIsNone(profiling.get_profiler())
+
+    def test_restores_previous_profiler(self):
+        with lineflow.profile() as outer:
+            with lineflow.profile() as inner:
+                self.assertIs(profiling.get_profiler(), inner)
+            self.assertIs(profiling.get_profiler(), outer)
+            self.assertIsInstance(Dataset(self.base).map(str), MapDataset)
+        self.assertEqual(len(outer.stages), 2)
+
+    def test_raises_value_error_with_invalid_sample_rate(self):
+        for rate in (0, 1.5):
+            with self.subTest(rate=rate), self.assertRaises(ValueError):
+                with lineflow.profile(sample_rate=rate):
+                    pass
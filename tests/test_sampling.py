@@ -0,0 +1,197 @@
+import os
+import random
+import shutil
+import tempfile
+from collections import Counter
+from unittest import TestCase, mock
+
+import lineflow
+from lineflow import Dataset
+from lineflow.sampling import (AliasTable, BalancedSampler, InterleaveDataset, LabelArray, RandomSampler,
+                               SampledDataset, WeightedSampler, temperature_weights)
+
+
+class AliasTableTestCase(TestCase):
+
+    def test_draws_by_weights(self):
+        table = AliasTable([1, 0, 3, 6])
+        rng = random.Random(0)
+        counts = Counter(table.draw(rng) for _ in range(20000))
+        self.assertEqual(counts[1], 0)
+        for i, p in ((0, 0.1), (2, 0.3), (3, 0.6)):
+            self.assertAlmostEqual(counts[i] / 20000, p, delta=0.02)
+
+    def test_rejects_invalid_weights(self):
+        for weights in ([], [0, 0], [1, -1]):
+            with self.subTest(weights=weights):
+                with self.assertRaises(ValueError):
+                    AliasTable(weights)
+
+
+class TemperatureWeightsTestCase(TestCase):
+
+    def test_scales_weights(self):
+        self.assertListEqual(temperature_weights([1, 3]), [0.25, 0.75])
+        self.assertListEqual(temperature_weights([1, 4], temperature=2), [1 / 3, 2 / 3])
+        with self.assertRaises(ValueError):
+            temperature_weights([1, 2], temperature=0)
+
+    def test_rejects_invalid_weights(self):
+        for weights in ([], [0, 0], [1, -1]):
+            for temperature in (1, 2):
+                with self.subTest(weights=weights, temperature=temperature):
+                    with self.assertRaises(ValueError):
+                        temperature_weights(weights, temperature)
+
+
+class InterleaveDatasetTestCase(TestCase):
+
+    def setUp(self):
+        self.a = Dataset([f'a{i}' for i in range(70)])
+        self.b = Dataset([f'b{i}' for i in range(10)])
+
+    def test_interleaves_by_weights(self):
+        data = lineflow.interleave([self.a, self.b], weights=[0.5, 0.5], seed=0, length=1000)
+        self.assertIsInstance(data, InterleaveDataset)
+        examples = list(data)
+        self.assertEqual(len(examples), 1000)
+        self.assertAlmostEqual(sum(x.startswith('b') for x in examples) / 1000, 0.5, delta=0.05)
+        # Each child yields its examples in order and starts over when it runs out.
+        bs = [x for x in examples if x.startswith('b')]
+        self.assertListEqual(bs, [f'b{i % 10}' for i in range(len(bs))])
+
+    def test_indexes_the_same_examples(self):
+        data = lineflow.interleave([self.a, self.b], seed=1)
+        self.assertEqual(len(data), 80)
+        self.assertListEqual([data[i] for i in range(len(data))], list(data))
+        self.assertListEqual(data.get_examples([3, 1]), [data[3], data[1]])
+
+    def test_is_deterministic_per_epoch(self):
+        data = lineflow.interleave([self.a, self.b], seed=1)
+        first = list(data)
+        self.assertListEqual(list(lineflow.interleave([self.a, self.b], seed=1)), first)
+        data.set_epoch(1)
+        self.assertNotEqual(list(data), first)
+        self.assertListEqual([data[i] for i in range(len(data))], list(data))
+        data.set_epoch(0)
+        self.assertListEqual(list(data), first)
+
+    def test_applies_temperature(self):
+        data = lineflow.interleave([self.a, self.b], temperature=1e9)
+        self.assertAlmostEqual(data.weights[0], 0.5)
+
+    def test_round_robin(self):
+        data = lineflow.interleave([Dataset([1, 2, 3]), Dataset(['a']), Dataset(['x', 'y'])], mode='round_robin')
+        expected = [1, 'a', 'x', 2, 'y', 3]
+        self.assertListEqual(list(data), expected)
+        self.assertListEqual([data[i] for i in range(len(data))], expected)
+
+        data = lineflow.interleave([Dataset([1, 2]), Dataset(['a'])], mode='round_robin', length=5)
+        self.assertListEqual(list(data), [1, 'a', 2, 1, 'a'])
+        self.assertListEqual([data[i] for i in range(5)], [1, 'a', 2, 1, 'a'])
+
+    def test_rejects_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            lineflow.interleave([self.a, self.b], weights=[1])
+        with self.assertRaises(ValueError):
+            lineflow.interleave([self.a, Dataset([])], weights=[1, 1])
+        with self.assertRaises(ValueError):
+            lineflow.interleave([self.a], mode='random')
+        with self.assertRaises(ValueError):
+            lineflow.interleave([Dataset([])], mode='round_robin', length=1)
+        with self.assertRaises(ValueError):
+            lineflow.interleave([self.a, self.b], weights=[0, 0])
+        with self.assertRaises(ValueError):
+            lineflow.interleave([self.a, self.b], weights=[1, -1], temperature=2)
+
+
+class LabelArrayTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dataset = Dataset([('b', 'x'), ('a', 'y'), ('b', 'z')])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_extracts_labels(self):
+        labels = LabelArray.from_dataset(self.dataset, lambda x: x[0])
+        self.assertListEqual(labels.classes, ['b', 'a'])
+        self.assertListEqual(list(labels.ids), [0, 1, 0])
+        self.assertListEqual(list(labels.counts), [2, 1])
+        self.assertEqual(len(labels), 3)
+
+    def test_caches_labels(self):
+        path = os.path.join(self.temp_dir, 'labels.pkl')
+        LabelArray.from_dataset(self.dataset, lambda x: x[0], path)
+        label_func = mock.Mock()
+        labels = LabelArray.from_dataset(self.dataset, label_func, path)
+        label_func.assert_not_called()
+        self.assertListEqual(list(labels.ids), [0, 1, 0])
+
+
+class SamplerTestCase(TestCase):
+
+    def test_random_sampler(self):
+        sampler = RandomSampler(10, seed=0)
+        self.assertEqual(len(sampler), 10)
+        self.assertListEqual(sorted(sampler), list(range(10)))
+        self.assertListEqual(list(sampler), list(RandomSampler(10, seed=0)))
+
+        sampler = RandomSampler(3, num_samples=100, replacement=True, seed=0)
+        self.assertEqual(len(list(sampler)), 100)
+        self.assertSetEqual(set(sampler), {0, 1, 2})
+        with self.assertRaises(ValueError):
+            RandomSampler(3, num_samples=4)
+
+    def test_changes_with_epochs(self):
+        sampler = RandomSampler(100, seed=0)
+        first = list(sampler)
+        sampler.set_epoch(1)
+        self.assertNotEqual(list(sampler), first)
+        sampler.set_epoch(0)
+        self.assertListEqual(list(sampler), first)
+
+    def test_weighted_sampler(self):
+        sampler = WeightedSampler([1, 0, 3], num_samples=10000, seed=0)
+        counts = Counter(sampler)
+        self.assertEqual(counts[1], 0)
+        self.assertAlmostEqual(counts[2] / 10000, 0.75, delta=0.02)
+
+        sampler = WeightedSampler([1, 0, 3, 2], num_samples=3, replacement=False, seed=0)
+        self.assertSetEqual(set(sampler), {0, 2, 3})
+        with self.assertRaises(ValueError):
+            WeightedSampler([1, 0, 3], replacement=False)
+
+    def test_weighted_sampler_without_replacement_with_tiny_weights(self):
+        sampler = WeightedSampler([1e-6] * 20000, num_samples=2000, replacement=False, seed=0)
+        indices = list(sampler)
+        self.assertEqual(len(set(indices)), 2000)
+        self.assertAlmostEqual(sum(i >= 18000 for i in indices) / 2000, 0.1, delta=0.03)
+
+    def test_balanced_sampler_without_replacement(self):
+        labels = LabelArray.from_dataset(Dataset([0] * 9000 + [1] * 1000), lambda x: x)
+        sampler = BalancedSampler(labels, num_samples=400, replacement=False, seed=0)
+        indices = list(sampler)
+        self.assertAlmostEqual(sum(i >= 9000 for i in indices) / 400, 0.5, delta=0.08)
+        # The examples of a class are drawn uniformly.
+        self.assertAlmostEqual(sum(i < 4500 for i in indices) / 400, 0.25, delta=0.08)
+
+    def test_balanced_sampler(self):
+        labels = LabelArray.from_dataset(Dataset([0] * 90 + [1] * 10), lambda x: x)
+        sampler = BalancedSampler(labels, num_samples=10000, seed=0)
+        self.assertAlmostEqual(sum(i >= 90 for i in sampler) / 10000, 0.5, delta=0.02)
+
+        sampler = BalancedSampler(labels, num_samples=10000, class_weights={0: 3, 1: 1}, seed=0)
+        self.assertAlmostEqual(sum(i >= 90 for i in sampler) / 10000, 0.25, delta=0.02)
+
+    def test_views_datasets(self):
+        dataset = Dataset(list(range(100))).map(lambda x: x * 2)
+        sampler = RandomSampler(100, num_samples=20, seed=0)
+        view = sampler.view(dataset)
+        self.assertIsInstance(view, SampledDataset)
+        self.assertEqual(len(view), 20)
+        self.assertListEqual(list(view), [2 * i for i in sampler])
+        self.assertListEqual(view[:3], [2 * i for i in list(sampler)[:3]])
+        view.set_epoch(1)
+        self.assertListEqual([view[i] for i in range(20)], [2 * i for i in sampler])
@@ -0,0 +1,222 @@
+import os
+import pickle
+import shutil
+import tempfile
+from array import array
+from unittest import TestCase, mock
+
+from lineflow import Dataset
+from lineflow.storage import ColumnDataset, SegmentStore, TokenBlockDataset
+
+
+class TokenBlockDatasetTestCase(TestCase):
+
+    def setUp(self):
+        self.lines = [[1, 2, 3], [], [4, 5], [6, 7, 8, 9, 10]]
+        self.tokens = list(range(1, 11))
+        self.data = Dataset(self.lines)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_splits_tokens_into_blocks(self):
+        data = self.data.token_blocks(3)
+        self.assertIsInstance(data, TokenBlockDataset)
+        self.assertEqual(len(data), 3)
+        self.assertListEqual([x.tolist() for x in data], [[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        self.assertIsInstance(data[1], memoryview)
+        self.assertListEqual(data[-1].tolist(), [7, 8, 9])
+        self.assertListEqual(data.tokens.tolist(), self.tokens)
+
+    def test_supports_stride_and_last_block(self):
+        for n in range(0, 11):
+            for block_size, stride in [(3, None), (3, 2), (4, 1), (2, 3), (12, None)]:
+                for drop_last in (True, False):
+                    with self.subTest(n=n, block_size=block_size, stride=stride, drop_last=drop_last):
+                        tokens = array('i', range(n))
+                        data = TokenBlockDataset(tokens, block_size, stride, drop_last)
+                        step = stride or block_size
+                        expected = [list(range(start, min(start + block_size, n)))
+                                    for start in range(0, n, step)]
+                        if drop_last:
+                            expected = [x for x in expected if len(x) == block_size]
+                        else:
+                            covered = 0
+                            kept = []
+                            for x in expected:
+                                if x[-1] >= covered:
+                                    kept.append(x)
+                                    covered = x[-1] + 1
+                            expected = kept
+                        self.assertListEqual([x.tolist() for x in data], expected)
+
+    def test_caches_tokens_in_file(self):
+        path = os.path.join(self.temp_dir, 'tokens.bin')
+        with mock.patch('builtins.print'):
+            data = self.data.token_blocks(4, stride=2, path=path, typecode='q')
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(data.tokens.format, 'q')
+        self.assertListEqual([x.tolist() for x in data], [[1, 2, 3, 4], [3, 4, 5, 6], [5, 6, 7, 8], [7, 8, 9, 10]])
+
+        data = self.data.map(lambda x: self.fail('the dataset is evaluated again')).token_blocks(5, path=path)
+        self.assertListEqual(data[1].tolist(), [6, 7, 8, 9, 10])
+
+        data = pickle.loads(pickle.dumps(data))
+        self.assertListEqual(data.tokens.tolist(), self.tokens)
+
+    def test_caches_tokens_in_new_directory(self):
+        path = os.path.join(self.temp_dir, 'cache', 'wiki', 'tokens.bin')
+        with mock.patch('builtins.print'):
+            data = self.data.token_blocks(5, path=path)
+        self.assertTrue(os.path.exists(path))
+        self.assertListEqual(data.tokens.tolist(), self.tokens)
+
+    def test_caches_empty_tokens(self):
+        path = os.path.join(self.temp_dir, 'tokens.bin')
+        with mock.patch('builtins.print'):
+            data = Dataset([[]]).token_blocks(2, path=path)
+        self.assertEqual(len(data), 0)
+        self.assertEqual(len(TokenBlockDataset.from_dataset([], 2, path=path).tokens), 0)
+
+    def test_pickles_in_memory_tokens(self):
+        data = TokenBlockDataset(memoryview(array('i', self.tokens)), 5)
+        data = pickle.loads(pickle.dumps(data))
+        self.assertListEqual(data[1].tolist(), [6, 7, 8, 9, 10])
+
+    def test_raises_value_error_with_invalid_block_size(self):
+        with self.assertRaises(ValueError):
+            TokenBlockDataset(array('i'), 0)
+
+
+class SegmentStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = SegmentStore(os.path.join(self.temp_dir, 'store'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_appends_segments(self):
+        self.assertEqual(len(self.store), 0)
+        self.assertEqual(len(self.store.snapshot()), 0)
+        self.assertEqual(self.store.append(range(3)), 3)
+        self.assertEqual(self.store.append([]), 0)
+        self.assertEqual(self.store.append([{'text': 'a'}, ('b', 1)]), 2)
+
+        data = self.store.snapshot()
+        self.assertEqual(len(self.store), 5)
+        self.assertListEqual(data.all(), [0, 1, 2, {'text': 'a'}, ('b', 1)])
+        self.assertEqual(data[3], {'text': 'a'})
+        self.assertListEqual(data.map(str).take(2), ['0', '1'])
+        self.assertEqual(len(os.listdir(self.store._path)), 5)
+
+    def test_keeps_snapshots_consistent(self):
+        self.store.append(range(3))
+        old = self.store.snapshot()
+        self.store.append(range(3, 5))
+        self.assertEqual(len(old), 3)
+        self.assertListEqual(old.all(), [0, 1, 2])
+        self.assertListEqual(SegmentStore(self.store._path).snapshot().all(), list(range(5)))
+
+    def test_compacts_segments(self):
+        for i in range(4):
+            self.store.append(range(i * 2, i * 2 + 2))
+        old = self.store.snapshot()
+        self.store.compact()
+
+        data = self.store.snapshot()
+        self.assertEqual(len(data._dataset._datasets), 1)
+        self.assertListEqual(data.all(), list(range(8)))
+        self.assertListEqual(old.all(), list(range(8)))
+        # The merged segments are retired until the next compact.
+        self.assertEqual(len(os.listdir(self.store._path)), 11)
+
+        self.store.append([8])
+        self.assertListEqual(self.store.snapshot().all(), list(range(9)))
+        self.store.compact()
+        self.assertListEqual(self.store.snapshot().all(), list(range(9)))
+        self.assertEqual(len(os.listdir(self.store._path)), 7)
+
+    def test_unpickles_snapshots_taken_before_compact(self):
+        for i in range(3):
+            self.store.append([i])
+        old = self.store.snapshot()
+        self.store.compact()
+        self.assertListEqual(pickle.loads(pickle.dumps(old)).all(), [0, 1, 2])
+
+    def test_pickles_snapshot(self):
+        self.store.append(['a', 'b'])
+        data = pickle.loads(pickle.dumps(self.store.snapshot()))
+        self.assertListEqual(data.all(), ['a', 'b'])
+
+
+class ColumnDatasetTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'columns')
+        self.records = [{'sentence': f'sentence {i} ✓' if i % 2 else f'sentence {i}',
+                         'label': i % 3,
+                         'score': i / 2} for i in range(10)]
+        patcher = mock.patch('builtins.print')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_stores_records_as_columns(self):
+        data = Dataset(self.records).save_columns(self.path)
+        self.assertIsInstance(data, ColumnDataset)
+        self.assertEqual(len(data), 10)
+        self.assertListEqual(list(data), self.records)
+        self.assertDictEqual(data[-1], self.records[-1])
+        self.assertListEqual(data.get_examples([3, 1]), [self.records[3], self.records[1]])
+
+        self.assertEqual(data.column('label').format, 'q')
+        self.assertListEqual(data.column('label').tolist(), [x['label'] for x in self.records])
+        self.assertListEqual(data.column('score').tolist(), [x['score'] for x in self.records])
+        self.assertListEqual(data.column('sentence'), [x['sentence'] for x in self.records])
+        with self.assertRaises(KeyError):
+            data.column('invalid')
+
+        data = Dataset([]).map(lambda x: self.fail('evaluated again')).save_columns(self.path)
+        self.assertListEqual(pickle.loads(pickle.dumps(data)).all(), self.records)
+
+    def test_select_and_drop(self):
+        data = ColumnDataset.build(self.records, self.path)
+        self.assertListEqual(data.select(['label', 'sentence']).all(),
+                             [{'label': x['label'], 'sentence': x['sentence']} for x in self.records])
+        self.assertListEqual(data.drop(['sentence']).take(2), [{'label': 0, 'score': 0.0}, {'label': 1, 'score': 0.5}])
+        self.assertEqual(len(data[0]), 3)
+
+    def test_stores_tuples_with_schema(self):
+        records = [(1., 'a'), (2.5, 'b'), (3., 'c')]
+        data = ColumnDataset.build(records, self.path, schema={0: 'float', 1: 'str'})
+        self.assertListEqual(data.all(), [(1.0, 'a'), (2.5, 'b'), (3.0, 'c')])
+        self.assertTupleEqual(data.select([1])[0], ('a',))
+        self.assertListEqual(ColumnDataset.build([], os.path.join(self.temp_dir, 'empty')).all(), [])
+
+    def test_promotes_mixed_numbers(self):
+        data = ColumnDataset.build([[1, 'a'], [2.5, 'b']], self.path)
+        self.assertListEqual(data.all(), [[1.0, 'a'], [2.5, 'b']])
+
+    def test_validates_values_against_schema(self):
+        for records, schema in (([(1, 'a'), (2.5, 'b')], {0: 'int', 1: 'str'}),
+                                ([(1.5, 'a'), (2, 'b')], {0: 'float', 1: 'str'}),
+                                ([(True, 'a')], {0: 'int', 1: 'str'}),
+                                ([(1, 2)], {0: 'int', 1: 'str'})):
+            with self.subTest(records=records), self.assertRaisesRegex(TypeError, 'Field [01]'):
+                ColumnDataset.build(records, self.path, schema=schema)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_raises_type_error_with_unsupported_values(self):
+        with self.assertRaises(TypeError):
+            ColumnDataset.build([{'a': None}], self.path)
+        with self.assertRaises(TypeError):
+            ColumnDataset.build([{'a': 'x'}, {'a': 1}], self.path)
+        with self.assertRaises(TypeError):
+            ColumnDataset.build([{'a': 1}, {'a': 'x'}], self.path)
+        self.assertFalse(os.path.exists(self.path))
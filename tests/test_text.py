@@ -1,5 +1,6 @@
 import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
 import arrayfiles
 
@@ -49,6 +50,17 @@ class TextDatasetTestCase(TestCase):
         self.assertIsInstance(data, lineflow.core.MapDataset)
         self.assertIsInstance(data._dataset, TextDataset)
 
+    def test_get_examples_reads_runs_of_lines(self):
+        lines = ['a', 'ｂ', '', 'c d', 'e', 'last']
+        with tempfile.NamedTemporaryFile() as fp:
+            fp.write('\n'.join(lines).encode('utf-8'))
+            fp.flush()
+            data = TextDataset(fp.name)
+            indices = [1, 2, 3, 0, 5, 4, 5]
+            self.assertListEqual(data.get_examples(indices), [lines[i] for i in indices])
+            self.assertListEqual(data[:], lines)
+            self.assertListEqual(data.map(len).get_examples([3, 4]), [3, 1])
+
     def test_zips_multiple_files(self):
         fp = self.fp
         lines = self.lines
@@ -63,6 +75,26 @@ class TextDatasetTestCase(TestCase):
         self.assertIsInstance(data._dataset, lineflow.core.ZipDataset)
         self.assertIsInstance(data.map(lambda x: x)._dataset, TextDataset)
 
+    def test_concats_multiple_files_with_known_lengths(self):
+        fp = self.fp
+        lines = self.lines
+
+        data = TextDataset([fp.name, fp.name], mode='concat', lengths=[len(lines)] * 2)
+        self.assertListEqual(data._dataset._ends, [len(lines), len(lines) * 2])
+        self.assertListEqual(data[:], lines + lines)
+
+    def test_opens_concatenated_files_on_first_read(self):
+        fp = self.fp
+        lines = self.lines
+
+        with patch('arrayfiles.TextFile', wraps=arrayfiles.TextFile) as text_file:
+            data = TextDataset([fp.name, fp.name], mode='concat', lengths=[len(lines)] * 2)
+            text_file.assert_not_called()
+            self.assertEqual(data[1], lines[1])
+            text_file.assert_called_once()
+            self.assertEqual(data[-1], lines[-1])
+            self.assertEqual(text_file.call_count, 2)
+
     def test_concats_multiple_files(self):
         fp = self.fp
         lines = self.lines
@@ -112,3 +144,23 @@ class CsvDatasetTestCase(TestCase):
         data = CsvDataset(self.fp.name)
         self.assertIsInstance(data._dataset, arrayfiles.CsvFile)
         self.assertSequenceEqual(data, [line.split(',') for line in self.lines])
+
+    def test_selects_columns_when_reading(self):
+        data = CsvDataset(self.fp.name, header=True)
+        header = self.lines[0].split(',')
+        rows = [dict(zip(header, line.split(','))) for line in self.lines[1:]]
+
+        selected = data.select(['ja'])
+        self.assertNotIsInstance(selected, lineflow.core.MapDataset)
+        self.assertListEqual(list(selected), [{'ja': row['ja']} for row in rows])
+        self.assertDictEqual(selected[1], {'ja': rows[1]['ja']})
+        self.assertListEqual(selected.get_examples([1, 0]), [{'ja': rows[1]['ja']}, {'ja': rows[0]['ja']}])
+        self.assertListEqual(data.drop(['ja']).all(), [{'en': row['en']} for row in rows])
+        with self.assertRaises(KeyError):
+            data.select(['de'])
+
+        data = CsvDataset(self.fp.name)
+        expected = [line.split(',')[1:] for line in self.lines]
+        self.assertListEqual(data.select([1]).all(), expected)
+        self.assertListEqual(data.drop([0]).all(), expected)
+        self.assertListEqual(data.select([-1])[1:], expected[1:])
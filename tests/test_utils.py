@@ -3,6 +3,15 @@ import unittest
 from lineflow import utils
 
 
+def to_str_field(x):
+    return str(x)
+
+
+@utils.apply_all_batch('a')
+def to_str_column(column):
+    return [str(x) for x in column]
+
+
 class ApplyTestCase(unittest.TestCase):
 
     def test_apply_tuple(self):
@@ -103,3 +112,85 @@ class ApplyAllTestCase(unittest.TestCase):
     def test_raises_value_error_with_map_function(self):
         with self.assertRaises(ValueError):
             utils.apply_all()(utils.MapFunction(0, str))
+
+
+class StackedApplyTestCase(unittest.TestCase):
+
+    def test_calls_func_in_key_order(self):
+        calls = []
+
+        @utils.apply(2)
+        @utils.apply(-3)
+        @utils.apply(2)
+        def record(x):
+            calls.append(x)
+            return x * 2
+
+        self.assertTupleEqual(record((1, 2, 3)), (2, 2, 12))
+        self.assertListEqual(calls, [3, 1, 6])
+        self.assertTupleEqual(record((1, 2, 3, 4)), (1, 4, 12, 4))
+
+    def test_keeps_errors_of_invalid_keys(self):
+        to_str = utils.apply(3)(str)
+        with self.assertRaises(IndexError):
+            to_str((0, 1))
+        with self.assertRaises(TypeError):
+            utils.apply('a')(str)((0, 1))
+
+    def test_updates_lists_and_dicts_in_place(self):
+        x = {'a': 0, 'b': 1}
+        self.assertIs(utils.apply('a')(str)(x), x)
+        self.assertDictEqual(x, {'a': '0', 'b': 1})
+
+    def test_applies_appended_keys(self):
+        to_str = utils.apply(0)(str)
+        self.assertTupleEqual(to_str((0, 1)), ('0', 1))
+        utils.apply(1)(to_str)
+        self.assertTupleEqual(to_str((0, 1)), ('0', '1'))
+        self.assertListEqual(to_str([0, 1]), ['0', '1'])
+
+    def test_pickles_map_function(self):
+        import pickle
+
+        to_str = utils.apply(1)(to_str_field)
+        to_str((0, 1))
+        self.assertTupleEqual(pickle.loads(pickle.dumps(to_str))((0, 1)), (0, '1'))
+
+    def test_apply_all_with_various_lengths(self):
+        to_str = utils.apply_all(0)(str)
+        self.assertTupleEqual(to_str((0, 1)), (0, '1'))
+        self.assertTupleEqual(to_str((0, 1, 2)), (0, '1', '2'))
+        self.assertTupleEqual(to_str(()), ())
+        self.assertListEqual(to_str([0, 1]), [0, '1'])
+
+    def test_apply_with_ragged_tuples(self):
+        to_str = utils.apply(0)(str)
+        for n in range(1, 20):
+            self.assertTupleEqual(to_str(tuple(range(n))), ('0',) + tuple(range(1, n)))
+
+
+class ApplyBatchTestCase(unittest.TestCase):
+
+    def test_apply_batch(self):
+        calls = []
+
+        @utils.apply_batch(0, 2)
+        def to_str(column):
+            calls.append(column)
+            return [str(x) for x in column]
+
+        self.assertListEqual(to_str([(0, 1, 2), (3, 4, 5)]), [('0', 1, '2'), ('3', 4, '5')])
+        self.assertListEqual(calls, [[0, 3], [2, 5]])
+        self.assertListEqual(to_str([]), [])
+
+        records = [{'a': 0, 'b': 1}]
+        self.assertListEqual(utils.apply_batch('b')(lambda xs: [x + 1 for x in xs])(records),
+                             [{'a': 0, 'b': 2}])
+        with self.assertRaises(TypeError):
+            to_str([b'invalid'])
+
+    def test_apply_all_batch(self):
+        self.assertListEqual(to_str_column([{'a': 0, 'b': 1}, {'a': 2, 'b': 3}]),
+                             [{'a': 0, 'b': '1'}, {'a': 2, 'b': '3'}])
+        to_str = utils.apply_all_batch()(lambda column: [str(x) for x in column])
+        self.assertListEqual(to_str([[0, 1], [2, 3]]), [['0', '1'], ['2', '3']])